@@ -2,28 +2,51 @@ import logging
 from typing import List, Optional
 from langchain_core.tools import BaseTool
 from langchain.agents import create_agent, AgentState
-from langchain.agents.middleware import (
-    ModelRetryMiddleware,
-    PIIMiddleware
-)
+from langchain.agents.middleware import PIIMiddleware
 from app.agents.middleware.content_filter_middleware import ContentFilterMiddleware
 from app.agents.middleware.sanitize_middleware import ThinkSanitizerMiddleware
+from app.agents.middleware.provider_failover_middleware import ProviderFailoverMiddleware
+from app.agents.middleware.thread_compaction_middleware import ThreadCompactionMiddleware
+from app.agents.middleware.checkpoint_gc_middleware import CheckpointGCMiddleware
+from app.agents.middleware.user_context_middleware import UserContextMiddleware
+from app.agents.checkpoints import CheckpointPruner
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from app.services.llms.manager import LLMManager
+from app.services.memory.controller import MemoryController
 from app.agents.config import AgentConfig
+from app.config.settings import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
         
 def build_graph_agent(
     llm_manager : LLMManager,
     tools : Optional[List[BaseTool]],
     config : AgentConfig,
-    checkpointer: Optional[AsyncPostgresSaver] = None
+    checkpointer: Optional[AsyncPostgresSaver] = None,
+    checkpoint_pruner: Optional[CheckpointPruner] = None,
+    memory_ctrl: Optional[MemoryController] = None,
 ) :
     llm = llm_manager.get_llm(temperature = 0.3)
     lc_tools : List[BaseTool] = tools if isinstance(tools, list) else [tools]
     logger.info(f"Building agent with {len(lc_tools)} tools")
 
+    history_middleware = []
+    if settings.THREAD_COMPACTION_ENABLED:
+        history_middleware.append(
+            ThreadCompactionMiddleware(
+                llm_manager.get_llm(temperature=0),
+                trigger_tokens=settings.THREAD_COMPACTION_TRIGGER_TOKENS,
+                keep_messages=settings.THREAD_COMPACTION_KEEP_MESSAGES,
+            )
+        )
+    if checkpoint_pruner is not None:
+        history_middleware.append(CheckpointGCMiddleware(checkpoint_pruner))
+    if memory_ctrl is not None and memory_ctrl.context_cache is not None:
+        history_middleware.append(
+            UserContextMiddleware(memory_ctrl, wait_timeout=settings.MEMORY_CONTEXT_WAIT_TIMEOUT)
+        )
+
     graph = create_agent(
         name=config.agent_name,
         model=llm,
@@ -33,6 +56,7 @@ def build_graph_agent(
             ContentFilterMiddleware(
                 banned_keywords=["hack", "exploit", "malware"]
             ),
+            *history_middleware,
             PIIMiddleware(
                 "credit_card", strategy="mask"
             ),
@@ -46,10 +70,10 @@ def build_graph_agent(
                 "ip", strategy="hash"
             ),
             ThinkSanitizerMiddleware(),
-            ModelRetryMiddleware(
-                max_retries=3,
-                backoff_factor=2.0,
-                initial_delay=1.0,
+            ProviderFailoverMiddleware(
+                llm_manager,
+                timeout=settings.LLM_CALL_TIMEOUT,
+                temperature=0.3,
             )
         ],
 
@@ -0,0 +1,385 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.channels.core.mailbox import ThreadLock, ThreadLockTimeout
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_writes", "checkpoint_blobs")
+
+# Checkpoints are ordered by id (uuid6, time ordered); only the newest `keep`
+# per thread/namespace survive, with their pending writes. Each statement
+# returns (rows deleted, bytes of row data deleted).
+_SUPERSEDED = """
+    SELECT checkpoint_ns, checkpoint_id FROM (
+        SELECT checkpoint_ns, checkpoint_id,
+               row_number() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+        FROM checkpoints WHERE thread_id = %(thread)s
+    ) ranked WHERE rn > %(keep)s
+"""
+
+_DELETE_WRITES_SQL = f"""
+    WITH deleted AS (
+        DELETE FROM checkpoint_writes w USING ({_SUPERSEDED}) d
+        WHERE w.thread_id = %(thread)s AND w.checkpoint_ns = d.checkpoint_ns AND w.checkpoint_id = d.checkpoint_id
+        RETURNING pg_column_size(w.*) AS size
+    )
+    SELECT count(*), coalesce(sum(size), 0) FROM deleted
+"""
+
+_DELETE_CHECKPOINTS_SQL = f"""
+    WITH deleted AS (
+        DELETE FROM checkpoints c USING ({_SUPERSEDED}) d
+        WHERE c.thread_id = %(thread)s AND c.checkpoint_ns = d.checkpoint_ns AND c.checkpoint_id = d.checkpoint_id
+        RETURNING pg_column_size(c.*) AS size
+    )
+    SELECT count(*), coalesce(sum(size), 0) FROM deleted
+"""
+
+# channel values (the message history) no remaining checkpoint points at
+_DELETE_BLOBS_SQL = """
+    WITH deleted AS (
+        DELETE FROM checkpoint_blobs b
+        WHERE b.thread_id = %(thread)s AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'channel_versions') v
+            WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+              AND v.key = b.channel AND v.value = b.version
+        )
+        RETURNING pg_column_size(b.*) AS size
+    )
+    SELECT count(*), coalesce(sum(size), 0) FROM deleted
+"""
+
+# threads with more than `keep` checkpoints, in thread_id order after a keyset cursor
+_OVERGROWN_THREADS_SQL = """
+    SELECT thread_id FROM checkpoints
+    WHERE thread_id > %(after)s
+    GROUP BY thread_id
+    HAVING count(*) > %(keep)s
+    ORDER BY thread_id
+    LIMIT %(limit)s
+"""
+
+# threads whose newest checkpoint is older than the cutoff (`ts` is an ISO UTC timestamp)
+_IDLE_THREADS_SQL = """
+    SELECT thread_id FROM checkpoints
+    WHERE thread_id > %(after)s
+    GROUP BY thread_id
+    HAVING max(checkpoint ->> 'ts') < %(cutoff)s
+    ORDER BY thread_id
+    LIMIT %(limit)s
+"""
+
+_RECHECK_IDLE_SQL = """
+    SELECT thread_id FROM checkpoints
+    WHERE thread_id = ANY(%(threads)s)
+    GROUP BY thread_id
+    HAVING max(checkpoint ->> 'ts') < %(cutoff)s
+"""
+
+_DELETE_THREADS_SQL = """
+    WITH deleted AS (
+        DELETE FROM {table} t WHERE t.thread_id = ANY(%(threads)s)
+        RETURNING pg_column_size(t.*) AS size
+    )
+    SELECT count(*), coalesce(sum(size), 0) FROM deleted
+"""
+
+
+async def _limit_locks(conn, lock_timeout: float) -> None:
+    """Fail fast instead of queueing behind (and in front of) chat traffic."""
+    await conn.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'")
+
+
+async def _count(conn, sql: str, params: Dict[str, Any]) -> Tuple[int, int]:
+    cur = await conn.execute(sql, params)
+    rows, size = await cur.fetchone()
+    return int(rows), int(size)
+
+
+class CheckpointPruner:
+    """
+    Garbage-collects superseded LangGraph checkpoints.
+
+    The saver writes a checkpoint (and a new copy of the message history)
+    for every step, and keeps them all. Threads that ran are `mark()`ed;
+    every `interval` seconds up to `batch_size` of them are pruned, one
+    short transaction per thread, holding the thread lock so a running
+    agent never sees its checkpoint or blobs disappear.
+    """
+
+    def __init__(
+        self,
+        pool_factory: Callable[[], Awaitable[Any]],
+        lock: ThreadLock,
+        keep: int = 2,
+        batch_size: int = 50,
+        interval: float = 60.0,
+        lock_timeout: float = 2.0,
+    ):
+        self.pool_factory = pool_factory
+        self.lock = lock
+        self.keep = max(keep, 1)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lock_timeout = lock_timeout
+        self._marked: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.pruned_threads = 0
+        self.deleted_checkpoints = 0
+        self.deleted_writes = 0
+        self.deleted_blobs = 0
+        self.bytes_reclaimed = 0
+
+    def mark(self, thread_id: str) -> None:
+        self._marked.add(thread_id)
+
+    async def prune_thread(self, thread_id: str, wait: bool = True) -> Dict[str, int]:
+        """With `wait=False` a thread that is running raises ThreadLockTimeout instead of queueing."""
+        params = {"thread": thread_id, "keep": self.keep}
+        async with (self.lock.hold(thread_id) if wait else self.lock.hold(thread_id, timeout=0)):
+            pool = await self.pool_factory()
+            async with pool.connection() as conn, conn.transaction():
+                await _limit_locks(conn, self.lock_timeout)
+                writes, writes_size = await _count(conn, _DELETE_WRITES_SQL, params)
+                checkpoints, checkpoints_size = await _count(conn, _DELETE_CHECKPOINTS_SQL, params)
+                blobs, blobs_size = await _count(conn, _DELETE_BLOBS_SQL, params)
+        size = writes_size + checkpoints_size + blobs_size
+        self.pruned_threads += 1
+        self.deleted_checkpoints += checkpoints
+        self.deleted_writes += writes
+        self.deleted_blobs += blobs
+        self.bytes_reclaimed += size
+        return {"checkpoints": checkpoints, "writes": writes, "blobs": blobs, "bytes": size}
+
+    async def prune_marked(self) -> int:
+        """Prune one batch of marked threads; failed ones stay marked for the next pass."""
+        batch: List[str] = [self._marked.pop() for _ in range(min(self.batch_size, len(self._marked)))]
+        for thread_id in batch:
+            try:
+                await self.prune_thread(thread_id)
+            except Exception as e:
+                logger.warning(f"Could not prune checkpoints of thread {thread_id}: {e}")
+                self._marked.add(thread_id)
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.prune_marked()
+            except Exception as e:
+                logger.error(f"Checkpoint pruning failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="checkpoint-pruner")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "marked_threads": len(self._marked),
+            "pruned_threads": self.pruned_threads,
+            "deleted_checkpoints": self.deleted_checkpoints,
+            "deleted_writes": self.deleted_writes,
+            "deleted_blobs": self.deleted_blobs,
+            "bytes_reclaimed": self.bytes_reclaimed,
+        }
+
+
+@dataclass
+class RetentionReport:
+    started_at: str
+    pruned_threads: int = 0
+    deleted_idle_threads: int = 0
+    deleted_rows: int = 0
+    bytes_reclaimed: int = 0  # row data deleted; disk space is reused after VACUUM
+    table_bytes_before: Dict[str, int] = field(default_factory=dict)
+    table_bytes_after: Dict[str, int] = field(default_factory=dict)
+    failed_batches: int = 0
+    busy_threads: int = 0  # running when reached; pruned by a later run
+    skipped: bool = False
+    duration_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class CheckpointRetention:
+    """
+    Retention sweep over the whole checkpointer:
+
+    1. threads with more than `keep` checkpoints are pruned to the newest
+       `keep` (same per-thread transaction as `CheckpointPruner`); threads
+       an agent is running on are skipped, not waited for;
+    2. threads idle for more than `idle_days` are deleted, `batch_size`
+       threads per transaction;
+    3. optionally a plain `VACUUM (ANALYZE)`, which doesn't block reads or
+       writes, so the freed space is reused.
+
+    Every transaction is short and sets `lock_timeout`; a batch that can't
+    get its locks is skipped and picked up by the next run. A cluster-wide
+    advisory lock keeps replicas from sweeping at the same time.
+    """
+
+    JOB_LOCK_ID = 0x636B7074  # "ckpt"
+
+    def __init__(
+        self,
+        pool_factory: Callable[[], Awaitable[Any]],
+        pruner: CheckpointPruner,
+        idle_days: Optional[float] = 90.0,
+        batch_size: int = 200,
+        lock_timeout: float = 2.0,
+        vacuum: bool = True,
+        interval: float = 21600.0,
+    ):
+        self.pool_factory = pool_factory
+        self.pruner = pruner
+        self.idle_days = idle_days
+        self.batch_size = batch_size
+        self.lock_timeout = lock_timeout
+        self.vacuum = vacuum
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_report: Optional[RetentionReport] = None
+
+    async def table_sizes(self) -> Dict[str, int]:
+        pool = await self.pool_factory()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT t, coalesce(pg_total_relation_size(to_regclass(t)), 0) FROM unnest(%s::text[]) AS t",
+                (list(CHECKPOINT_TABLES),),
+            )
+            return {name: int(size) for name, size in await cur.fetchall()}
+
+    async def _next_threads(self, sql: str, after: str, **params) -> List[str]:
+        pool = await self.pool_factory()
+        async with pool.connection() as conn:
+            cur = await conn.execute(sql, {"after": after, "limit": self.batch_size, **params})
+            return [row[0] for row in await cur.fetchall()]
+
+    async def _prune_overgrown(self, report: RetentionReport) -> None:
+        after = ""
+        while True:
+            threads = await self._next_threads(_OVERGROWN_THREADS_SQL, after, keep=self.pruner.keep)
+            if not threads:
+                return
+            for thread_id in threads:
+                try:
+                    result = await self.pruner.prune_thread(thread_id, wait=False)
+                except ThreadLockTimeout:
+                    report.busy_threads += 1
+                    continue
+                except Exception as e:
+                    report.failed_batches += 1
+                    logger.warning(f"Retention: could not prune thread {thread_id}: {e}")
+                    continue
+                report.pruned_threads += 1
+                report.deleted_rows += result["checkpoints"] + result["writes"] + result["blobs"]
+                report.bytes_reclaimed += result["bytes"]
+            after = threads[-1]
+
+    async def _delete_idle_batch(self, threads: List[str], cutoff: str) -> Tuple[int, int, int]:
+        pool = await self.pool_factory()
+        async with pool.connection() as conn, conn.transaction():
+            await _limit_locks(conn, self.lock_timeout)
+            # a thread may have woken up since it was listed
+            cur = await conn.execute(_RECHECK_IDLE_SQL, {"threads": threads, "cutoff": cutoff})
+            idle = [row[0] for row in await cur.fetchall()]
+            rows = size = 0
+            if idle:
+                for table in CHECKPOINT_TABLES:
+                    deleted, deleted_size = await _count(conn, _DELETE_THREADS_SQL.format(table=table), {"threads": idle})
+                    rows += deleted
+                    size += deleted_size
+        return len(idle), rows, size
+
+    async def _delete_idle(self, report: RetentionReport) -> None:
+        if not self.idle_days:
+            return
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.idle_days)).isoformat()
+        after = ""
+        while True:
+            threads = await self._next_threads(_IDLE_THREADS_SQL, after, cutoff=cutoff)
+            if not threads:
+                return
+            try:
+                deleted, rows, size = await self._delete_idle_batch(threads, cutoff)
+            except Exception as e:
+                report.failed_batches += 1
+                logger.warning(f"Retention: could not delete idle threads {threads[0]}..{threads[-1]}: {e}")
+            else:
+                report.deleted_idle_threads += deleted
+                report.deleted_rows += rows
+                report.bytes_reclaimed += size
+            after = threads[-1]
+
+    async def _vacuum(self) -> None:
+        pool = await self.pool_factory()
+        async with pool.connection() as conn:
+            for table in CHECKPOINT_TABLES:
+                await conn.execute(f"VACUUM (ANALYZE) {table}")
+
+    async def run_once(self) -> RetentionReport:
+        """One full sweep. Returns a report with `skipped=True` if another sweep holds the job lock."""
+        start = time.perf_counter()
+        report = RetentionReport(started_at=datetime.now(timezone.utc).isoformat())
+        pool = await self.pool_factory()
+        async with pool.connection() as lock_conn:
+            cur = await lock_conn.execute("SELECT pg_try_advisory_lock(%s)", (self.JOB_LOCK_ID,))
+            if not (await cur.fetchone())[0]:
+                report.skipped = True
+                logger.info("Checkpoint retention already running elsewhere, skipping")
+                return report
+            try:
+                report.table_bytes_before = await self.table_sizes()
+                await self._prune_overgrown(report)
+                await self._delete_idle(report)
+                if self.vacuum:
+                    await self._vacuum()
+                report.table_bytes_after = await self.table_sizes()
+            finally:
+                await lock_conn.execute("SELECT pg_advisory_unlock(%s)", (self.JOB_LOCK_ID,))
+
+        report.duration_seconds = round(time.perf_counter() - start, 3)
+        self.last_report = report
+        logger.info(
+            f"Checkpoint retention: pruned {report.pruned_threads} threads, deleted "
+            f"{report.deleted_idle_threads} idle threads, {report.deleted_rows} rows, "
+            f"~{report.bytes_reclaimed} bytes in {report.duration_seconds}s"
+        )
+        return report
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Checkpoint retention failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="checkpoint-retention")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "last_report": self.last_report.to_dict() if self.last_report else None,
+        }
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from app.services.llms.manager import LLMManager
+from app.agents.config import AgentConfig
+from app.agents.builder import build_graph_agent
+from app.agents.checkpoints import CheckpointPruner
+from app.services.memory.controller import MemoryController
+
+logger = logging.getLogger(__name__)
+
+GraphKey = Tuple[str, str]
+
+class GraphRegistry:
+    """
+    Per-worker cache of compiled agent graphs.
+
+    Graphs are keyed by (agent config, llm provider) so a provider switch
+    or a different AgentConfig gets its own graph, while every chat request
+    for the same pair reuses the compiled one (a graph built before any
+    provider was selected is kept under "unknown"). Call `invalidate()`
+    whenever the agent config or the tool set changes; it only affects
+    this worker's registry.
+    """
+
+    def __init__(
+        self,
+        llm_manager: LLMManager,
+        tools_factory: Callable[[], List[BaseTool]],
+        checkpointer: Optional[AsyncPostgresSaver] = None,
+        checkpoint_pruner: Optional[CheckpointPruner] = None,
+        memory_ctrl: Optional[MemoryController] = None,
+    ):
+        self.llm_manager = llm_manager
+        self.tools_factory = tools_factory
+        self.checkpointer = checkpointer
+        self.checkpoint_pruner = checkpoint_pruner
+        self.memory_ctrl = memory_ctrl
+
+        self._tools: Optional[List[BaseTool]] = None
+        self._graphs: Dict[GraphKey, Any] = {}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def config_key(config: AgentConfig) -> str:
+        return hashlib.sha256(config.model_dump_json().encode("utf-8")).hexdigest()[:16]
+
+    def _get_tools(self) -> List[BaseTool]:
+        if self._tools is None:
+            self._tools = self.tools_factory()
+            logger.info(f"Registering tools: {[t.name for t in self._tools]}")
+        return self._tools
+
+    def _key(self, config_key: str) -> GraphKey:
+        return config_key, self.llm_manager.active_provider or "unknown"
+
+    def _lookup(self, config_key: str) -> Optional[Any]:
+        return self._graphs.get(self._key(config_key))
+
+    async def get(self, config: Optional[AgentConfig] = None):
+        """Return the compiled graph for `config`, building it on first use."""
+        config = config or AgentConfig()
+        config_key = self.config_key(config)
+
+        graph = self._lookup(config_key)
+        if graph is not None:
+            return graph
+
+        async with self._lock:
+            graph = self._lookup(config_key)
+            if graph is not None:
+                return graph
+
+            tools = self._get_tools()
+            graph = await asyncio.to_thread(
+                build_graph_agent,
+                self.llm_manager,
+                tools,
+                config,
+                self.checkpointer,
+                self.checkpoint_pruner,
+                self.memory_ctrl,
+            )
+            key = self._key(config_key)
+            self._graphs[key] = graph
+            logger.info(f"Built agent graph for config={config_key} provider={key[1]}")
+            return graph
+
+    async def warmup(self, configs: Optional[List[AgentConfig]] = None) -> None:
+        for config in configs or [AgentConfig()]:
+            await self.get(config)
+
+    def invalidate(self, config: Optional[AgentConfig] = None, *, tools: bool = False) -> int:
+        """
+        Drop cached graphs.
+
+        Args:
+            config: Only drop graphs built for this config. Drops all when None.
+            tools: Also rebuild the tool set on the next build.
+
+        Returns:
+            Number of graphs dropped.
+        """
+        if tools:
+            self._tools = None
+
+        if config is None or tools:
+            dropped = len(self._graphs)
+            self._graphs.clear()
+        else:
+            config_key = self.config_key(config)
+            keys = [k for k in self._graphs if k[0] == config_key]
+            for k in keys:
+                del self._graphs[k]
+            dropped = len(keys)
+
+        logger.info(f"Invalidated {dropped} agent graph(s)")
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "graphs": [{"config": c, "provider": p} for c, p in self._graphs],
+            "tools_loaded": self._tools is not None,
+        }
@@ -0,0 +1,19 @@
+import logging
+from langchain.agents.middleware import AgentMiddleware
+from langgraph.config import get_config
+from app.agents.checkpoints import CheckpointPruner
+
+logger = logging.getLogger(__name__)
+
+class CheckpointGCMiddleware(AgentMiddleware):
+    """Marks the thread of every finished run for background checkpoint pruning."""
+
+    def __init__(self, pruner: CheckpointPruner):
+        super().__init__()
+        self.pruner = pruner
+
+    def after_agent(self, state, runtime):
+        thread_id = get_config().get("configurable", {}).get("thread_id")
+        if thread_id:
+            self.pruner.mark(str(thread_id))
+        return None
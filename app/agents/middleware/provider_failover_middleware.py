@@ -0,0 +1,136 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from langchain.agents.middleware import AgentMiddleware
+from langgraph.errors import GraphBubbleUp
+from app.services.llms.manager import LLMManager
+
+logger = logging.getLogger(__name__)
+
+class ProviderFailoverMiddleware(AgentMiddleware):
+    """
+    Routes every model call to the first provider whose circuit breaker is
+    closed, in LLM_PRIORITY_LIST order. A call that errors or exceeds
+    `timeout` is recorded against that provider's breaker and the request
+    immediately moves on to the next provider, so provider incidents cost
+    at most one timeout per call instead of a stack of retry backoffs.
+
+    A half-open trial is handed back to its breaker whenever the call ends
+    without an outcome (cancelled by a client disconnect or a timeout
+    higher up, or interrupted by the graph).
+    """
+
+    def __init__(self, llm_manager: LLMManager, timeout: float = 30.0, **model_kwargs):
+        super().__init__()
+        self.llm_manager = llm_manager
+        self.timeout = timeout
+        self.model_kwargs = model_kwargs
+        self._models: Dict[str, Any] = {}
+
+    def _get_model(self, provider: str):
+        if provider not in self._models:
+            self._models[provider] = self.llm_manager.get_provider_llm(provider, **self.model_kwargs)
+        return self._models[provider]
+
+    def _candidates(self) -> Iterator[Tuple[str, Any, bool]]:
+        """Yield (provider, model, is_trial) lazily so half-open trials are only taken when used."""
+        for provider in self.llm_manager.failover_providers():
+            breaker = self.llm_manager.get_breaker(provider)
+            if not breaker.allow_request():
+                continue
+            try:
+                model = self._get_model(provider)
+            except Exception as e:
+                breaker.release_trial()
+                logger.error(f"Could not init LLM provider {provider}: {e}")
+                continue
+            yield provider, model, breaker.state == breaker.HALF_OPEN
+
+    def _record(self, provider: str, start: float, error: Optional[Exception] = None) -> None:
+        breaker = self.llm_manager.get_breaker(provider)
+        latency = time.perf_counter() - start
+        if error is None:
+            breaker.record_success(latency)
+        else:
+            breaker.record_failure(latency)
+            logger.warning(f"LLM provider {provider} failed after {latency:.1f}s, failing over → {error!r}")
+
+    def _call_with_timeout(self, call: Callable[[], Any]) -> Any:
+        """A sync call can't be cancelled: run it on a daemon thread and stop waiting after `timeout`."""
+        result: Dict[str, Any] = {}
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                result["value"] = context.run(call)
+            except BaseException as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=run, name="llm-call", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            raise TimeoutError(f"model call took longer than {self.timeout}s")
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def wrap_model_call(self, request, handler):
+        last_exception: Optional[Exception] = None
+        for provider, model, trial in self._candidates():
+            start = time.perf_counter()
+            try:
+                response = self._call_with_timeout(lambda: handler(request.override(model=model)))
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                self._record(provider, start, e)
+                last_exception = e
+                continue
+            else:
+                self._record(provider, start)
+                return response
+            finally:
+                if trial:
+                    # no-op once an outcome was recorded; otherwise the call was
+                    # cancelled or interrupted and the next one may try
+                    self.llm_manager.get_breaker(provider).release_trial()
+
+        if last_exception is not None:
+            raise last_exception
+
+        logger.warning("All LLM circuits open, calling the graph's default model")
+        return self._call_with_timeout(lambda: handler(request))
+
+    async def awrap_model_call(self, request, handler):
+        last_exception: Optional[Exception] = None
+        for provider, model, trial in self._candidates():
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    handler(request.override(model=model)),
+                    timeout=self.timeout,
+                )
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                self._record(provider, start, e)
+                last_exception = e
+                continue
+            else:
+                self._record(provider, start)
+                return response
+            finally:
+                if trial:
+                    # no-op once an outcome was recorded; otherwise the call was
+                    # cancelled or interrupted and the next one may try
+                    self.llm_manager.get_breaker(provider).release_trial()
+
+        if last_exception is not None:
+            raise last_exception
+
+        logger.warning("All LLM circuits open, calling the graph's default model")
+        return await asyncio.wait_for(handler(request), timeout=self.timeout)
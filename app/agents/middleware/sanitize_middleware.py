@@ -17,3 +17,46 @@ class ThinkSanitizerMiddleware(AgentMiddleware):
             last.content = cleaned
 
         return None
+
+
+class ThinkStreamFilter:
+    """
+    Incremental counterpart of ThinkSanitizerMiddleware for streamed tokens:
+    drops <think>...</think> spans even when tags are split across chunks.
+    """
+
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._thinking = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        out = []
+        while self._buffer:
+            tag = self.CLOSE if self._thinking else self.OPEN
+            idx = self._buffer.find(tag)
+            if idx >= 0:
+                if not self._thinking:
+                    out.append(self._buffer[:idx])
+                self._buffer = self._buffer[idx + len(tag):]
+                self._thinking = not self._thinking
+                continue
+
+            # hold back a possible partial tag at the end of the buffer
+            keep = 0
+            for n in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+                if tag.startswith(self._buffer[-n:]):
+                    keep = n
+                    break
+            if not self._thinking:
+                out.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return "".join(out)
+
+    def flush(self) -> str:
+        rest = "" if self._thinking else self._buffer
+        self._buffer = ""
+        return rest
@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Dict, Optional
+from langchain.agents.middleware import SummarizationMiddleware
+
+logger = logging.getLogger(__name__)
+
+_stats = {"compactions": 0, "failures": 0, "tokens_before": 0, "tokens_after": 0}
+
+class ThreadCompactionMiddleware(SummarizationMiddleware):
+    """
+    Keeps long-lived threads (thread_id = user_id) inside a token budget.
+
+    Once the thread's messages pass `trigger_tokens`, everything but the last
+    `keep_messages` is folded into one rolling summary message (the previous
+    summary included) and removed from the graph state, so later turns load
+    and send only the summary plus recent turns. If the summary call fails the
+    turn goes ahead uncompacted and compaction is retried on the next turn.
+    """
+
+    def __init__(self, model, trigger_tokens: int = 6000, keep_messages: int = 12, **kwargs):
+        super().__init__(
+            model,
+            trigger=("tokens", trigger_tokens),
+            keep=("messages", keep_messages),
+            **kwargs,
+        )
+
+    def _record(self, state, update: Optional[Dict[str, Any]]) -> None:
+        if not update:
+            return
+        before = self.token_counter(state["messages"])
+        after = self.token_counter(update["messages"][1:])
+        _stats["compactions"] += 1
+        _stats["tokens_before"] += before
+        _stats["tokens_after"] += after
+        logger.info(f"Compacted thread history from ~{before} to ~{after} tokens")
+
+    def before_model(self, state, runtime):
+        try:
+            update = super().before_model(state, runtime)
+        except Exception as e:
+            _stats["failures"] += 1
+            logger.warning(f"Thread compaction failed, continuing with full history: {e}")
+            return None
+        self._record(state, update)
+        return update
+
+    async def abefore_model(self, state, runtime):
+        try:
+            update = await super().abefore_model(state, runtime)
+        except Exception as e:
+            _stats["failures"] += 1
+            logger.warning(f"Thread compaction failed, continuing with full history: {e}")
+            return None
+        self._record(state, update)
+        return update
+
+
+def compaction_stats() -> Dict[str, Any]:
+    """Compactions in this process and the prompt tokens they saved."""
+    saved = _stats["tokens_before"] - _stats["tokens_after"]
+    return {**_stats, "tokens_saved": saved}
@@ -0,0 +1,57 @@
+import logging
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.config import get_config
+from app.services.memory.controller import MemoryController
+
+logger = logging.getLogger(__name__)
+
+def _user_id() -> str | None:
+    user_id = get_config().get("configurable", {}).get("user_id")
+    return str(user_id) if user_id else None
+
+def _last_human_text(messages) -> str | None:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.text or None
+    return None
+
+class UserContextMiddleware(AgentMiddleware):
+    """
+    Puts the user's memory context into the system prompt, so the model
+    doesn't spend a tool round trip on `read_profile` at the start of a turn.
+
+    The context load starts when the run starts (earlier if the endpoint
+    already called `prefetch_user_context`) and runs alongside the checkpoint
+    load and the other pre-model hooks. Each model call waits at most
+    `wait_timeout` seconds for it and otherwise goes ahead without; the load
+    finishes in the background and is cached for the user's next turn.
+    """
+
+    def __init__(self, memory_ctrl: MemoryController, wait_timeout: float = 1.0):
+        super().__init__()
+        self.memory_ctrl = memory_ctrl
+        self.wait_timeout = wait_timeout
+
+    async def abefore_agent(self, state, runtime):
+        user_id = _user_id()
+        if user_id:
+            self.memory_ctrl.prefetch_user_context(user_id, _last_human_text(state.get("messages", [])))
+        return None
+
+    async def awrap_model_call(self, request, handler):
+        user_id = _user_id()
+        context = None
+        if user_id:
+            try:
+                context = await self.memory_ctrl.user_context(
+                    user_id, timeout=self.wait_timeout, query=_last_human_text(request.messages)
+                )
+            except Exception as e:
+                logger.warning(f"User context unavailable for {user_id}: {e}")
+        if not context:
+            return await handler(request)
+
+        base = request.system_message.text if request.system_message is not None else ""
+        prompt = f"{base}\n\n{context}\n(Already loaded from memory; no need to call read_profile.)".lstrip()
+        return await handler(request.override(system_message=SystemMessage(content=prompt)))
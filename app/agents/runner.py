@@ -1,10 +1,65 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 from langchain_core.messages import HumanMessage
+from app.agents.middleware.sanitize_middleware import ThinkStreamFilter
 from app.channels.core.models import InternalMessage, InternalResponse, ChannelType
 
 logger = logging.getLogger(__name__)
 
+# create_agent's node that calls the chat model; other LLM calls (tools, memory) are not streamed
+AGENT_MODEL_NODE = "model"
+
+ERROR_TEXT = "I apologize, but I encountered an internal error. Please try again later."
+
+def _channel_value(message: InternalMessage) -> str:
+    return message.channel.value if isinstance(message.channel, ChannelType) else str(message.channel)
+
+def _agent_inputs(
+        message: InternalMessage,
+        session_context: Optional[Dict[str, Any]] = None,
+):
+    inputs = {"messages": [HumanMessage(content=message.text)]}
+
+    user_id = message.user_id
+    thread_id = session_context.get("thread_id", user_id) if session_context else user_id
+
+    config = {
+        "configurable": {
+            "thread_id" : thread_id,
+            "user_id" : user_id,
+            "channel_id" : _channel_value(message)
+        }
+    }
+    return inputs, config
+
+def _build_response(result: Dict[str, Any], message: InternalMessage, config: Dict[str, Any]) -> InternalResponse:
+    ai_messages = result.get("messages", [])
+    last_messages = ai_messages[-1] if ai_messages else None
+    output_text = last_messages.text if last_messages and hasattr(last_messages, "text") else(
+        last_messages.content if last_messages else "No response generated."
+    )
+
+    return InternalResponse(
+        text=str(output_text),
+        metadata={
+            "agent_name": "CustomerServiceAgent (LangGraph)",
+            "thread_id": config["configurable"]["thread_id"],
+            "user_id": message.user_id,
+            "channel": _channel_value(message),
+            "ingress_metadata": message.metadata,
+        }
+    )
+
+def _log_agent_error(message: InternalMessage) -> None:
+    logger.exception(
+        "Error running agent",
+        extra={
+            "user_id": message.user_id,
+            "channel": getattr(message.channel, "value", str(message.channel)),
+            "text": message.text,
+        },
+    )
+
 async def run_agent(
         graph,
         message : InternalMessage,
@@ -12,49 +67,77 @@ async def run_agent(
 
 ) -> InternalResponse:
     try:
-        human_messages = HumanMessage(content=message.text)
-        inputs = {"messages": [human_messages]}
-
-        user_id = message.user_id
-        thread_id = session_context.get("thread_id", user_id) if session_context else user_id
-
-        config = {
-            "configurable": {
-                "thread_id" : thread_id,
-                "user_id" : user_id,
-                "channel_id" : message.channel.value if isinstance(message.channel, ChannelType) else str(message.channel)
-            }
-        }
-
+        inputs, config = _agent_inputs(message, session_context)
         result = await graph.ainvoke(inputs, config)
+        return _build_response(result, message, config)
 
-        ai_messages = result.get("messages", [])
-        last_messages = ai_messages[-1] if ai_messages else None
-        output_text = last_messages.text if last_messages and hasattr(last_messages, "text") else(
-            last_messages.content if last_messages else "No response generated."
-        )
-
+    except Exception as e:
+        _log_agent_error(message)
         return InternalResponse(
-            text=str(output_text),
-            metadata={
-                "agent_name": "CustomerServiceAgent (LangGraph)",
-                "thread_id": thread_id,
-                "user_id": user_id,
-                "channel": message.channel.value if isinstance(message.channel, ChannelType) else str(message.channel),
-                "ingress_metadata": message.metadata,
-            }
+            text=ERROR_TEXT,
+            metadata={"error": str(e)}
         )
 
+async def stream_agent(
+        graph,
+        message : InternalMessage,
+        session_context: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the agent and yield progress events as they happen:
+
+        {"event": "token", "data": {"text": ..., "run_id": ...}}
+        {"event": "tool_start", "data": {"name": ..., "run_id": ...}}
+        {"event": "tool_end", "data": {"name": ..., "run_id": ...}}
+        {"event": "done", "data": InternalResponse}
+        {"event": "error", "data": InternalResponse}
+
+    Token deltas come from the agent's model node only. A new `run_id` means
+    a new model call (next step after a tool, or a provider failover retry).
+    The final `done` response is the sanitized full answer, same as `run_agent`.
+    """
+    inputs, config = _agent_inputs(message, session_context)
+    filters: Dict[str, ThinkStreamFilter] = {}
+    result = None
+
+    try:
+        async for event in graph.astream_events(inputs, config, version="v2"):
+            kind = event["event"]
+            run_id = event.get("run_id")
+
+            if kind == "on_chat_model_stream":
+                if event.get("metadata", {}).get("langgraph_node") != AGENT_MODEL_NODE:
+                    continue
+                chunk = event["data"].get("chunk")
+                text = chunk.text if chunk is not None else ""
+                if not text:
+                    continue
+                text = filters.setdefault(run_id, ThinkStreamFilter()).feed(text)
+                if text:
+                    yield {"event": "token", "data": {"text": text, "run_id": run_id}}
+
+            elif kind == "on_chat_model_end":
+                think_filter = filters.pop(run_id, None)
+                tail = think_filter.flush() if think_filter else ""
+                if tail:
+                    yield {"event": "token", "data": {"text": tail, "run_id": run_id}}
+
+            elif kind == "on_tool_start":
+                yield {"event": "tool_start", "data": {"name": event.get("name"), "run_id": run_id}}
+
+            elif kind == "on_tool_end":
+                yield {"event": "tool_end", "data": {"name": event.get("name"), "run_id": run_id}}
+
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                result = event["data"].get("output")
+
+        if not isinstance(result, dict):
+            # output of the root run was not captured; read the final state instead
+            snapshot = await graph.aget_state(config)
+            result = snapshot.values
+
+        yield {"event": "done", "data": _build_response(result, message, config)}
+
     except Exception as e:
-        logger.exception(
-            "Error running agent",
-            extra={
-                "user_id": message.user_id,
-                "channel": getattr(message.channel, "value", str(message.channel)),
-                "text": message.text,
-            },
-        )
-        return InternalResponse(
-            text="I apologize, but I encountered an internal error. Please try again later.",
-            metadata={"error": str(e)}
-        )    
\ No newline at end of file
+        _log_agent_error(message)
+        yield {"event": "error", "data": InternalResponse(text=ERROR_TEXT, metadata={"error": str(e)})}
@@ -30,7 +30,7 @@ def create_memory_tools(controller:MemoryController) -> List[BaseTool]:
             user_id = config.get("configurable", {}).get("user_id")
             if not user_id:
                 return ToolException("Error: No user_id found in context.")
-            return await controller.summarize_user_context(user_id)
+            return await controller.user_context(user_id)
         except Exception as e:
             logger.error(f"Error reading profile: {e}")
             return ToolException(f"Error reading profile: {e}")
@@ -57,7 +57,7 @@ def create_memory_tools(controller:MemoryController) -> List[BaseTool]:
             user_id = config.get("configurable", {}).get("user_id")
             if not user_id:
                 return ToolException("Error: No user_id found in context.")
-            await controller.add_memory(user_id, preference, type="preference")
+            await controller.queue_memory(user_id, preference, type="preference")
             return "Preference saved successfully."
         except Exception as e:
             logger.error(f"Error saving preference: {e}")
@@ -85,7 +85,7 @@ def create_memory_tools(controller:MemoryController) -> List[BaseTool]:
             user_id = config.get("configurable", {}).get("user_id")
             if not user_id:
                 return ToolException("Error: No user_id found in context.")
-            await controller.add_memory(user_id, memory, type="memory")
+            await controller.queue_memory(user_id, memory, type="memory")
             return "Memory saved successfully."
         except Exception as e:
             logger.error(f"Error saving memory: {e}")
@@ -119,14 +119,16 @@ def create_memory_tools(controller:MemoryController) -> List[BaseTool]:
             return ToolException(f"Error deleting memory: {e}")
 
     @tool()
-    async def get_memory( config: RunnableConfig) -> str:
+    async def get_memory(config: RunnableConfig, query: str = "") -> str:
         """
             Get One Memory Item
 
-            Fetches one of the stored memory items associated with the user.
+            Fetches the stored memory item most relevant to `query`
+            (or the first one stored when no query is given).
 
             Args:
                 config (RunnableConfig): Contains user_id metadata.
+                query (str): What the memory should be about, e.g. "alamat pengiriman".
 
             Returns:
                 str: A memory item's text or a "not found" message if none exists.
@@ -139,7 +141,7 @@ def create_memory_tools(controller:MemoryController) -> List[BaseTool]:
             if not user_id:
                 return ToolException("Error: No user_id found in context.")
             
-            items = await controller.get_memory(user_id)
+            items = await controller.get_memory(user_id, query=query or None, limit=1)
             found = next((m for m in items), None)
             return str(found) if found else "Memory not found."
         except Exception as e:
@@ -10,7 +10,7 @@ def create_order_lookup_tools(controller: ShopifyController) -> List[BaseTool]:
     """Create tools for looking up orders in Shopify."""
     
     @tool()
-    def order_lookup(
+    async def order_lookup(
         order_id: str,
     ) -> str:
         """
@@ -32,7 +32,7 @@ def create_order_lookup_tools(controller: ShopifyController) -> List[BaseTool]:
         """
         try:
             logger.info(f"Tool order_lookup called with order_id: {order_id}")
-            response = controller.order_lookup(order_id)
+            response = await controller.aorder_lookup(order_id)
             logger.info(f"Tool order_lookup returning order: {response}")
             results = []
             for r in response:
@@ -4,7 +4,7 @@ from langchain_core.tools import BaseTool
 from app.services.datastore.datastore import LightRAGClient
 from app.services.shopify.controllers import ShopifyController
 from app.services.memory.controller import MemoryController
-from app.services.escalations.controller import escalation_service
+from app.services.escalations.controller import EscalationService
 from app.agents.tools.escalate_to_human import create_escalation_tools
 from app.agents.tools.knowledge_base_tools import create_search_tool
 from app.agents.tools.memory_tools import create_memory_tools
@@ -14,7 +14,12 @@ from app.agents.tools.shopify_shop_info import create_shopify_shop_info_tools
 
 logger = logging.getLogger(__name__)
 
-def get_tools(rag_client: LightRAGClient, memory_ctrl: MemoryController, shopify_ctrl: ShopifyController) -> List[BaseTool]:
+def get_tools(
+    rag_client: LightRAGClient,
+    memory_ctrl: MemoryController,
+    shopify_ctrl: ShopifyController,
+    escalation_service: EscalationService,
+) -> List[BaseTool]:
     """
     Get all available tools for the agent.
     
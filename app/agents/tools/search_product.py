@@ -10,7 +10,7 @@ def create_search_product_tools(controller: ShopifyController) -> List[BaseTool]
     """Create tools for searching products in Shopify."""
     
     @tool()
-    def search_product(
+    async def search_product(
         query: str,
     ) -> str:
         """
@@ -32,7 +32,7 @@ def create_search_product_tools(controller: ShopifyController) -> List[BaseTool]
         """
         try:
             logger.info(f"Tool search_product called with query: {query}")
-            response = controller.search_products(query)
+            response = await controller.asearch_products(query)
             logger.info(f"Tool search_product returning {len(response) if response else 0} results")
             results = []
             for r in response:
@@ -10,7 +10,7 @@ def create_shopify_shop_info_tools(controller: ShopifyController) -> List[BaseTo
     """Create tools for retrieving Shopify store information."""
     
     @tool()
-    def get_shop_info() -> str:
+    async def get_shop_info() -> str:
         """
             Get Shopify Store Information
 
@@ -25,7 +25,7 @@ def create_shopify_shop_info_tools(controller: ShopifyController) -> List[BaseTo
         """
         try:
             logger.info("Tool get_shop_info called")
-            response = controller.get_shop_info()
+            response = await controller.aget_shop_info()
             logger.info(f"Tool get_shop_info returning shop info: {response}")
             res_json = response.model_dump_json()
             logger.info(f"Tool get_shop_info returning shop info: {res_json}")
@@ -1,18 +1,35 @@
+import asyncio
 import logging
 from functools import lru_cache
-from typing import List
+import httpx
+from typing import List, Optional
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader
 from app.config.settings import get_settings, Settings
 from app.services.llms.manager import LLMManager
 from app.services.datastore.datastore import lightrag_client, LightRAGClient
+from app.services.datastore.semantic_cache import SemanticCache, PostgresKBVersion
 from app.services.memory.controller import MemoryController
+from app.services.memory.context_cache import UserContextCache
+from app.services.memory.write_queue import MemoryWriteQueue, MemoryWriteStore, PostgresMemoryWriteStore
+from app.services.escalations.controller import EscalationService
+from app.services.escalations.outbox import EscalationOutbox, PostgresEscalationOutbox, WebhookDispatcher
+from app.services.escalations.store import EscalationStore, PostgresEscalationStore
 from app.services.shopify.controllers import ShopifyController
+from app.services.shopify.cache import CacheBackend, FileCacheBackend, PostgresCacheBackend
+from app.services.shopify.catalog import ProductCatalog
+from app.services.shopify.client import ShopifyClient
 from app.agents.tools import get_tools
 from app.agents.config import AgentConfig
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg_pool import AsyncConnectionPool
-from app.agents.builder import build_graph_agent
+from app.agents.graph_registry import GraphRegistry
+from app.agents.checkpoints import CheckpointPruner, CheckpointRetention
+from app.api.rate_limit import PostgresRateLimitBackend, RateLimitBackend, UserRateLimiter
+from app.channels.core.idempotency import IdempotencyBackend, IdempotencyStore, PostgresIdempotencyBackend
+from app.channels.core.mailbox import PostgresThreadLock, ThreadLock, ThreadMailbox
+from app.channels.core.queue import InboundQueue, MemoryInboundQueue, PostgresInboundQueue
+from app.channels.web.session import WebSessions
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -35,27 +52,67 @@ async def verify_api_key(api_key:str = Security(api_key_header)):
 def get_settings() -> Settings:
     return settings
 
+# lazily created singletons; the lifespan warms them up concurrently, so
+# creation is guarded against two callers building the same thing
 _pg_pool = None
-async def get_pg_pool() -> AsyncPostgresSaver:
+_pg_pool_lock = asyncio.Lock()
+
+async def get_pg_pool() -> AsyncConnectionPool:
     global _pg_pool
     if _pg_pool is None:
-        _pg_pool = AsyncConnectionPool(
-            conninfo=settings.POSTGRES_URI, 
-            max_size=20,
-            kwargs={"autocommit": True},
-            open=False
-        )
-        await _pg_pool.open()
+        async with _pg_pool_lock:
+            if _pg_pool is None:
+                pool = AsyncConnectionPool(
+                    conninfo=settings.POSTGRES_URI, 
+                    max_size=20,
+                    kwargs={"autocommit": True},
+                    open=False
+                )
+                await pool.open()
+                _pg_pool = pool
     return _pg_pool
 
+_thread_lock_pool = None
+_thread_lock_pool_lock = asyncio.Lock()
+
+async def get_thread_lock_pool() -> AsyncConnectionPool:
+    # thread locks hold a session for a whole agent run; keep them off the main pool
+    global _thread_lock_pool
+    if _thread_lock_pool is None:
+        async with _thread_lock_pool_lock:
+            if _thread_lock_pool is None:
+                pool = AsyncConnectionPool(
+                    conninfo=settings.POSTGRES_URI,
+                    min_size=1,
+                    max_size=settings.THREAD_LOCK_POOL_SIZE,
+                    kwargs={"autocommit": True},
+                    open=False
+                )
+                await pool.open()
+                _thread_lock_pool = pool
+    return _thread_lock_pool
+
+async def close_pg_pool() -> None:
+    global _pg_pool, _thread_lock_pool
+    if _thread_lock_pool is not None:
+        pool, _thread_lock_pool = _thread_lock_pool, None
+        await pool.close()
+    if _pg_pool is not None:
+        pool, _pg_pool = _pg_pool, None
+        await pool.close()
+
 _checkpointer : AsyncPostgresSaver | None = None
+_checkpointer_lock = asyncio.Lock()
 
 async def get_checkpointer() -> AsyncPostgresSaver:
     global _checkpointer
     if _checkpointer is None:
-        pool = await get_pg_pool()
-        _checkpointer = AsyncPostgresSaver(pool)
-        await _checkpointer.setup()
+        async with _checkpointer_lock:
+            if _checkpointer is None:
+                pool = await get_pg_pool()
+                checkpointer = AsyncPostgresSaver(pool)
+                await checkpointer.setup()
+                _checkpointer = checkpointer
     return _checkpointer
 
 @lru_cache()
@@ -63,39 +120,219 @@ def get_llm_manager() -> LLMManager:
     return LLMManager()
 
 _memory_controller : MemoryController | None = None
+_memory_controller_lock = asyncio.Lock()
 
 async def get_memory_controller() -> MemoryController:
     global _memory_controller
     if _memory_controller is None:
-        _memory_controller = await MemoryController.create()
+        async with _memory_controller_lock:
+            if _memory_controller is None:
+                controller = await MemoryController.create()
+                if settings.MEMORY_CONTEXT_PREFETCH_ENABLED:
+                    controller.context_cache = UserContextCache(
+                        controller.summarize_user_context,
+                        ttl=settings.MEMORY_CONTEXT_TTL,
+                        max_entries=settings.MEMORY_CONTEXT_MAX_ENTRIES,
+                    )
+                if settings.MEMORY_WRITE_BEHIND_ENABLED:
+                    controller.write_queue = get_memory_write_queue()
+                _memory_controller = controller
 
     return _memory_controller
 
+@lru_cache()
+def get_memory_write_queue() -> MemoryWriteQueue:
+    # created before the controller so the lifespan can start it without waiting on mem0
+    async def flush(user_id: str, texts: List[str], type: str, tags: List[str] | None):
+        controller = await get_memory_controller()
+        await controller.add_memory_group(user_id, texts, type=type, tags=tags)
+
+    store = MemoryWriteStore()
+    if settings.MEMORY_WRITE_BEHIND_BACKEND == "postgres":
+        store = PostgresMemoryWriteStore(pool_factory=get_pg_pool)
+    return MemoryWriteQueue(
+        flush,
+        store=store,
+        batch_size=settings.MEMORY_WRITE_BEHIND_BATCH_SIZE,
+        interval=settings.MEMORY_WRITE_BEHIND_INTERVAL,
+        max_attempts=settings.MEMORY_WRITE_BEHIND_MAX_ATTEMPTS,
+    )
+
+def get_semantic_cache() -> SemanticCache | None:
+    provider = settings.SEMANTIC_CACHE_EMBEDDING_PROVIDER.lower()
+    try:
+        embeddings = get_llm_manager().get_embeddings(provider)
+    except Exception as e:
+        logger.warning(f"Semantic answer cache disabled: {e}")
+        return None
+
+    return SemanticCache(
+        embed=embeddings.aembed_query,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl=settings.SEMANTIC_CACHE_TTL,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        version=PostgresKBVersion(pool_factory=get_pg_pool),
+        version_check_interval=settings.SEMANTIC_CACHE_VERSION_CHECK_INTERVAL,
+    )
+
 @lru_cache()
 def get_lightrag_client() -> LightRAGClient:
+    if settings.SEMANTIC_CACHE_ENABLED and lightrag_client.answer_cache is None:
+        lightrag_client.answer_cache = get_semantic_cache()
     return lightrag_client
 
+def get_shopify_cache_backend() -> CacheBackend:
+    if settings.SHOPIFY_CACHE_BACKEND == "postgres":
+        return PostgresCacheBackend(pool_factory=get_pg_pool)
+    if settings.SHOPIFY_CACHE_BACKEND == "file":
+        return FileCacheBackend(settings.SHOPIFY_CACHE_FILE_PATH)
+    return CacheBackend()
+
 @lru_cache()
 def get_shopify_controller() -> ShopifyController:
-    return ShopifyController()
+    client = ShopifyClient()
+    catalog = None
+    if settings.SHOPIFY_CATALOG_ENABLED:
+        catalog = ProductCatalog(
+            client,
+            settings.SHOPIFY_CATALOG_DB_PATH,
+            sync_interval=settings.SHOPIFY_CATALOG_SYNC_INTERVAL,
+            full_sync_interval=settings.SHOPIFY_CATALOG_FULL_SYNC_INTERVAL,
+            refresh_interval=settings.SHOPIFY_CATALOG_REFRESH_INTERVAL,
+        )
+    return ShopifyController(
+        client=client,
+        cache_backend=get_shopify_cache_backend(),
+        catalog=catalog,
+    )
 
-async def get_agent_graph():
-    """
-    Builds the agent graph. 
-    Note: We don't cache the graph WITH the checkpointer if checkingpointer relies on open cursors.
-    But PostgresSaver(pool) should be thread safe and reusable.
-    """
+@lru_cache()
+def get_inbound_queue() -> InboundQueue:
+    options = dict(
+        max_attempts=settings.INBOUND_QUEUE_MAX_ATTEMPTS,
+        visibility_timeout=settings.INBOUND_QUEUE_VISIBILITY_TIMEOUT,
+    )
+    if settings.INBOUND_QUEUE_BACKEND == "postgres":
+        return PostgresInboundQueue(pool_factory=get_pg_pool, **options)
+    return MemoryInboundQueue(**options)
 
-    llm_mgr = get_llm_manager()
-    rag_client = get_lightrag_client()
-    memory_ctrl = await get_memory_controller()
+@lru_cache()
+def get_thread_lock() -> ThreadLock:
+    if settings.THREAD_LOCK_BACKEND == "postgres":
+        return PostgresThreadLock(
+            pool_factory=get_thread_lock_pool,
+            acquire_timeout=settings.THREAD_LOCK_TIMEOUT,
+            max_held=settings.THREAD_LOCK_POOL_SIZE,
+        )
+    return ThreadLock(acquire_timeout=settings.THREAD_LOCK_TIMEOUT)
 
-    shopify_ctrl = get_shopify_controller()
+@lru_cache()
+def get_thread_mailbox() -> ThreadMailbox:
+    return ThreadMailbox(
+        get_thread_lock(),
+        window=settings.MAILBOX_DEBOUNCE_WINDOW,
+        max_wait=settings.MAILBOX_MAX_WAIT,
+    )
 
-    tools = get_tools(rag_client, memory_ctrl, shopify_ctrl)
-    logger.info(f"Registering tools: {[t.name for t in tools]}")
-    config = AgentConfig()
-    
-    checkpointer = await get_checkpointer()
-    
-    return build_graph_agent(llm_mgr, tools, config, checkpointer=checkpointer)
\ No newline at end of file
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    backend = IdempotencyBackend()
+    if settings.IDEMPOTENCY_BACKEND == "postgres":
+        backend = PostgresIdempotencyBackend(pool_factory=get_pg_pool)
+    return IdempotencyStore(
+        backend=backend,
+        ttl=settings.IDEMPOTENCY_TTL,
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    )
+
+@lru_cache()
+def get_user_rate_limiter() -> UserRateLimiter:
+    backend = RateLimitBackend()
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        backend = PostgresRateLimitBackend(pool_factory=get_pg_pool)
+    return UserRateLimiter(backend=backend, limit=settings.RATE_LIMIT_PER_USER)
+
+@lru_cache()
+def get_web_sessions() -> Optional[WebSessions]:
+    if not settings.WEB_SESSION_SECRET:
+        return None
+    return WebSessions(settings.WEB_SESSION_SECRET, ttl=settings.WEB_SESSION_TTL)
+
+@lru_cache()
+def get_escalation_service() -> EscalationService:
+    if settings.ESCALATION_BACKEND == "postgres":
+        outbox = PostgresEscalationOutbox(pool_factory=get_pg_pool, max_attempts=settings.ESCALATION_WEBHOOK_MAX_ATTEMPTS)
+        store = PostgresEscalationStore(pool_factory=get_pg_pool, outbox=outbox)
+    else:
+        store = EscalationStore(outbox=EscalationOutbox(max_attempts=settings.ESCALATION_WEBHOOK_MAX_ATTEMPTS))
+    return EscalationService(
+        store=store,
+        cache_size=settings.ESCALATION_CACHE_SIZE,
+        cache_ttl=settings.ESCALATION_CACHE_TTL,
+        webhooks=settings.ESCALATION_WEBHOOK_URLS,
+    )
+
+@lru_cache()
+def get_escalation_dispatcher() -> WebhookDispatcher:
+    return WebhookDispatcher(
+        get_escalation_service().store.outbox,
+        client_factory=lambda: httpx.AsyncClient(
+            timeout=settings.ESCALATION_WEBHOOK_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        ),
+        poll_interval=settings.ESCALATION_WEBHOOK_POLL_INTERVAL,
+    )
+
+@lru_cache()
+def get_checkpoint_pruner() -> CheckpointPruner:
+    return CheckpointPruner(
+        pool_factory=get_pg_pool,
+        lock=get_thread_lock(),
+        keep=settings.CHECKPOINT_GC_KEEP,
+        batch_size=settings.CHECKPOINT_GC_BATCH_SIZE,
+        interval=settings.CHECKPOINT_GC_INTERVAL,
+        lock_timeout=settings.CHECKPOINT_RETENTION_LOCK_TIMEOUT,
+    )
+
+@lru_cache()
+def get_checkpoint_retention() -> CheckpointRetention:
+    return CheckpointRetention(
+        pool_factory=get_pg_pool,
+        pruner=get_checkpoint_pruner(),
+        idle_days=settings.CHECKPOINT_RETENTION_IDLE_DAYS,
+        batch_size=settings.CHECKPOINT_RETENTION_BATCH_SIZE,
+        lock_timeout=settings.CHECKPOINT_RETENTION_LOCK_TIMEOUT,
+        vacuum=settings.CHECKPOINT_RETENTION_VACUUM,
+        interval=settings.CHECKPOINT_RETENTION_INTERVAL,
+    )
+
+_graph_registry: GraphRegistry | None = None
+_graph_registry_lock = asyncio.Lock()
+
+async def get_graph_registry() -> GraphRegistry:
+    global _graph_registry
+    if _graph_registry is None:
+        async with _graph_registry_lock:
+            if _graph_registry is None:
+                rag_client = get_lightrag_client()
+                memory_ctrl, checkpointer = await asyncio.gather(get_memory_controller(), get_checkpointer())
+                shopify_ctrl = get_shopify_controller()
+                escalation_service = get_escalation_service()
+
+                _graph_registry = GraphRegistry(
+                    llm_manager=get_llm_manager(),
+                    tools_factory=lambda: get_tools(rag_client, memory_ctrl, shopify_ctrl, escalation_service),
+                    checkpointer=checkpointer,
+                    checkpoint_pruner=get_checkpoint_pruner() if settings.CHECKPOINT_GC_ENABLED else None,
+                    memory_ctrl=memory_ctrl,
+                )
+    return _graph_registry
+
+async def get_agent_graph():
+    """
+    Returns the compiled agent graph for this worker.
+    Graphs are built once (at startup via lifespan) and reused; PostgresSaver(pool)
+    is safe to share across requests. Use `GraphRegistry.invalidate()` to rebuild.
+    """
+    registry = await get_graph_registry()
+    return await registry.get(AgentConfig())
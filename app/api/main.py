@@ -1,18 +1,29 @@
+import asyncio
 import logging
-from typing import Dict, Any
-from fastapi import FastAPI, Depends, HTTPException, Request
+import math
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from slowapi import  _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.config.settings import get_settings
 from app.api import deps
-from app.api.rate_limit import limiter
-from app.channels.core.models import ChannelType
+from app.api.rate_limit import RateLimitResult, is_allowlisted_source, limiter
+from app.api.router import admin
+from app.api.startup import StartupWarmup
+from app.api.streaming import sse_response
+from app.channels.core.models import ChannelType, InternalMessage, InternalResponse
+from app.channels.core.idempotency import IdempotencyStore
+from app.channels.core.mailbox import ThreadLockTimeout
+from app.channels.core.queue import InboundWorkerPool
 from app.channels.web.adapter import WebAdapter
+from app.channels.web.session import WebSessionError
 from app.channels.telegram.adapter import TelegramAdapter
 from app.channels.whatsapp.adapter import WhatsAppAdapter
-from app.agents.runner import run_agent
+from app.agents.runner import run_agent, stream_agent
 from pythonjsonlogger import json
 
 logger = logging.getLogger()
@@ -31,28 +42,178 @@ if logger.hasHandlers():
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+warmup = StartupWarmup(timeout=settings.STARTUP_WARMUP_TIMEOUT)
+
+BUSY_TEXT = "Still working on your previous message. Please try again in a moment."
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    llm_manager = deps.get_llm_manager()
+    rag_client = deps.get_lightrag_client()
+    shopify_ctrl = deps.get_shopify_controller()
+
+    async def check_postgres():
+        pool = await deps.get_pg_pool()
+        async with pool.connection() as conn:
+            await conn.execute("SELECT 1")
+
+    async def probe_llm():
+        statuses = await llm_manager.health.probe_all()
+        if statuses and not any(s.healthy for s in statuses.values()):
+            raise RuntimeError("no LLM provider passed the health probe")
+
+    async def check_llm():
+        # reads the health monitor's cache, no provider call
+        if not any(llm_manager.health.is_healthy(p) for p in llm_manager.failover_providers()):
+            raise RuntimeError("no healthy LLM provider")
+
+    async def start_catalog():
+        if shopify_ctrl.catalog is not None:
+            shopify_ctrl.catalog.start()
+
+    async def build_graph():
+        # built once per worker so chat requests don't pay for it
+        registry = await deps.get_graph_registry()
+        await registry.warmup()
+
+    async def check_graph():
+        # registry lookup; a graph that failed at boot is built here, shielded so a
+        # build slower than the probe timeout still finishes for the next probe
+        registry = await deps.get_graph_registry()
+        await asyncio.shield(registry.get())
+
+    # everything the first chat request would otherwise set up lazily, in parallel
+    warmup.add("postgres", check_postgres, check=check_postgres)
+    # critical components carry a live check so /ready recovers once they come up
+    warmup.add("checkpointer", deps.get_checkpointer, after=["postgres"], check=deps.get_checkpointer)
+    warmup.add("memory", deps.get_memory_controller, critical=False)
+    warmup.add("llm", probe_llm, check=check_llm)
+    warmup.add("lightrag", rag_client.open, critical=False)
+    warmup.add("shopify_catalog", start_catalog, critical=False)
+    inbound_queue = deps.get_inbound_queue()
+    warmup.add("inbound_queue", inbound_queue.stats, after=["postgres"], check=inbound_queue.stats)
+    warmup.add("agent_graph", build_graph, after=["llm", "checkpointer", "memory"], check=check_graph)
+    await warmup.run()
+    llm_manager.health.start(initial_delay=llm_manager.health.interval)
+
+    inbound_workers.start()
+    escalation_webhooks = deps.get_escalation_dispatcher()
+    escalation_webhooks.start()
+    checkpoint_pruner = deps.get_checkpoint_pruner()
+    if settings.CHECKPOINT_GC_ENABLED:
+        checkpoint_pruner.start()
+    checkpoint_retention = deps.get_checkpoint_retention()
+    if settings.CHECKPOINT_RETENTION_ENABLED:
+        checkpoint_retention.start()
+    memory_writes = deps.get_memory_write_queue()
+    if settings.MEMORY_WRITE_BEHIND_ENABLED:
+        memory_writes.start()
+    yield
+
+    await inbound_workers.stop()
+    await escalation_webhooks.stop()
+    await checkpoint_pruner.stop()
+    await checkpoint_retention.stop()
+    # flushes saved memories still waiting in the queue
+    await memory_writes.stop()
+    for adapter in adapters.values():
+        await adapter.aclose()
+    await llm_manager.health.stop()
+    await shopify_ctrl.aclose()
+    await rag_client.aclose()
+    # last: the workers above may still have been using it
+    await deps.close_pg_pool()
+
 app = FastAPI(
     title="Urban Vibe Store AI Assistant API",
     description="API for the Urban Vibe Store AI Assistant powered by LangGraph.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+# API-key protected; /admin/ itself is the Streamlit dashboard behind nginx
+app.include_router(admin.router, prefix="/v1/admin", tags=["admin"])
 
 adapters = {
-    ChannelType.WEB: WebAdapter(),
+    ChannelType.WEB: WebAdapter(sessions=deps.get_web_sessions()),
     ChannelType.TELEGRAM: TelegramAdapter(),
     ChannelType.WHATSAPP: WhatsAppAdapter(),
 }
 
+async def prefetch_user_context(message: InternalMessage) -> None:
+    """Start loading the user's memory context so it's ready by the first model call."""
+    if not settings.MEMORY_CONTEXT_PREFETCH_ENABLED:
+        return
+    try:
+        (await deps.get_memory_controller()).prefetch_user_context(message.user_id, message.text)
+    except Exception as e:
+        logger.warning(f"Could not prefetch user context for {message.user_id}: {e}")
+
+async def process_inbound_message(message: InternalMessage) -> InternalResponse:
+    """Inbound worker handler: run the agent for a queued webhook message."""
+    await prefetch_user_context(message)
+    graph = await deps.get_agent_graph()
+    internal_response = await run_agent(graph, message)
+    logger.info(f"Agent response: {internal_response}")
+    return internal_response
+
+async def deliver_inbound_reply(message: InternalMessage, internal_response: InternalResponse, skip_chunks: int) -> None:
+    """
+    Inbound worker delivery: wait for the provider to accept the reply. A
+    failed (or, on shutdown, aborted) delivery fails the job, which the
+    queue retries from the first unsent chunk or dead-letters.
+    """
+    await adapters[message.channel].deliver(internal_response, skip_chunks=skip_chunks)
+
+inbound_workers = InboundWorkerPool(
+    deps.get_inbound_queue(),
+    handler=process_inbound_message,
+    deliver=deliver_inbound_reply,
+    concurrency=settings.INBOUND_WORKER_CONCURRENCY,
+    poll_interval=settings.INBOUND_QUEUE_POLL_INTERVAL,
+    mailbox=deps.get_thread_mailbox(),
+)
+
+async def claim_message(message: InternalMessage) -> Tuple[bool, Optional[str]]:
+    """
+    Record the channel message id before any agent work. Returns
+    (is_new, dedup_key); messages without a provider id are always new.
+    """
+    if not message.message_id:
+        return True, None
+    key = IdempotencyStore.make_key(message.channel.value, message.message_id)
+    return await deps.get_idempotency_store().claim(key), key
+
+async def check_rate_limit(message: InternalMessage) -> RateLimitResult:
+    """Per user+channel limit, shared by every worker (see RATE_LIMIT_PER_USER)."""
+    result = await deps.get_user_rate_limiter().check(message.channel.value, message.user_id)
+    if not result.allowed:
+        logger.warning(f"Rate limited {message.channel.value} user {message.user_id}")
+    return result
+
+def rate_limit_exceeded(result: RateLimitResult) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many messages, slow down",
+        headers={"Retry-After": str(math.ceil(result.retry_after))},
+    )
+
 @app.get("/health", response_model=Dict[str, str])
 def health_check():
     return {"status": "healthy"}  
+
+@app.get("/ready")
+async def readiness_check():
+    """Per-component readiness; 503 until every critical component is up."""
+    await warmup.check()
+    report = warmup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
   
 @app.post("/v1/chat/{channel_name}")
-@limiter.limit("10/minute")
+@limiter.limit(settings.RATE_LIMIT_PER_IP, exempt_when=is_allowlisted_source)
 async def chat_endpoint(
     request: Request,
     channel_name: ChannelType,
@@ -66,13 +227,53 @@ async def chat_endpoint(
 
     try:
         internal_message = adapter.from_request(payload)
+    except WebSessionError as e:
+        raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
         logger.error(f"Error parsing request for channel {channel_name}: {e}")
         raise HTTPException(status_code=400, detail="Invalid request format")
+
+    if adapter.queued_replies and not internal_message.text:
+        return adapter.to_response(InternalResponse(text=""))
+
+    is_new, dedup_key = await claim_message(internal_message)
+    if not is_new:
+        if adapter.queued_replies:
+            return adapter.to_response(InternalResponse(text=""))
+        raise HTTPException(status_code=409, detail="Duplicate message")
+
+    limit = await check_rate_limit(internal_message)
+    if not limit.allowed:
+        if adapter.queued_replies:
+            # the provider would only redeliver; drop the message
+            return adapter.to_response(InternalResponse(text=""))
+        if dedup_key:
+            await deps.get_idempotency_store().release(dedup_key)
+        raise rate_limit_exceeded(limit)
+
+    if adapter.queued_replies:
+        # ack the webhook once the message is durably queued; provider retries of
+        # slow webhooks would otherwise start duplicate agent runs
+        try:
+            await deps.get_inbound_queue().enqueue(internal_message)
+        except Exception as e:
+            logger.error(f"Error queueing message for channel {channel_name}: {e}")
+            if dedup_key:
+                await deps.get_idempotency_store().release(dedup_key)
+            raise HTTPException(status_code=503, detail="Could not queue message")
+        return adapter.to_response(InternalResponse(text=""))
     
+    await prefetch_user_context(internal_message)
     try:
-        internal_response = await run_agent(graph, internal_message)
+        async with deps.get_thread_lock().hold(internal_message.user_id):
+            internal_response = await run_agent(graph, internal_message)
         logger.info(f"Agent response: {internal_response}")
+    except ThreadLockTimeout as e:
+        logger.warning(f"Thread busy for channel {channel_name}: {e}")
+        if dedup_key:
+            # nothing ran; let the client's retry through
+            await deps.get_idempotency_store().release(dedup_key)
+        raise HTTPException(status_code=503, detail=BUSY_TEXT)
     except Exception as e:
         logger.error(f"Error processing message for channel {channel_name}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -84,3 +285,151 @@ async def chat_endpoint(
         raise HTTPException(status_code=500, detail="Failed to send response")
     
     return adapter.to_response(internal_response)
+
+
+@app.post("/v1/chat/{channel_name}/stream")
+@limiter.limit(settings.RATE_LIMIT_PER_IP, exempt_when=is_allowlisted_source)
+async def chat_stream_endpoint(
+    request: Request,
+    channel_name: ChannelType,
+    payload: Dict[str, Any],
+    graph = Depends(deps.get_agent_graph),
+):
+    """
+    Server-Sent Events version of the chat endpoint. Emits `token`,
+    `tool_start` and `tool_end` events while the agent runs, then `done`
+    (or `error`) with the same body the non-streaming endpoint returns.
+    """
+    if channel_name not in adapters:
+        raise HTTPException(status_code=400, detail="Unsupported channel")
+
+    adapter = adapters[channel_name]
+    if adapter.queued_replies:
+        # webhook channels go through the inbound queue (chat_endpoint)
+        raise HTTPException(status_code=400, detail="Streaming is only supported for web chat")
+
+    try:
+        internal_message = adapter.from_request(payload)
+    except WebSessionError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error parsing request for channel {channel_name}: {e}")
+        raise HTTPException(status_code=400, detail="Invalid request format")
+
+    is_new, dedup_key = await claim_message(internal_message)
+    if not is_new:
+        raise HTTPException(status_code=409, detail="Duplicate message")
+
+    limit = await check_rate_limit(internal_message)
+    if not limit.allowed:
+        if dedup_key:
+            await deps.get_idempotency_store().release(dedup_key)
+        raise rate_limit_exceeded(limit)
+
+    await prefetch_user_context(internal_message)
+
+    async def events():
+        try:
+            async with deps.get_thread_lock().hold(internal_message.user_id):
+                async for event in stream_agent(graph, internal_message):
+                    if event["event"] == "done":
+                        try:
+                            await adapter.send_message(event["data"])
+                        except Exception as e:
+                            logger.error(f"Error sending response for channel {channel_name}: {e}")
+                    if event["event"] in ("done", "error"):
+                        event = {"event": event["event"], "data": adapter.to_response(event["data"])}
+                    yield event
+        except ThreadLockTimeout as e:
+            logger.warning(f"Thread busy for channel {channel_name}: {e}")
+            yield {"event": "error", "data": adapter.to_response(InternalResponse(text=BUSY_TEXT))}
+
+    return sse_response(events(), heartbeat=settings.SSE_HEARTBEAT_INTERVAL)
+
+@app.post("/v1/chat/web/session")
+@limiter.limit(settings.RATE_LIMIT_PER_IP, exempt_when=is_allowlisted_source)
+async def web_session_endpoint(request: Request) -> Dict[str, Any]:
+    """Start an anonymous web chat session; send `session_token` with every web request."""
+    sessions = deps.get_web_sessions()
+    if sessions is None:
+        raise HTTPException(status_code=404, detail="Web sessions are not configured")
+    return {"session_token": sessions.issue(), "expires_in": int(sessions.ttl)}
+
+if settings.WEB_WEBSOCKET_ENABLED:
+    @app.websocket("/v1/chat/web/ws")
+    async def chat_websocket(
+        websocket: WebSocket,
+        token: str,
+        graph = Depends(deps.get_agent_graph),
+    ):
+        """
+        Bidirectional web chat for the user of session `token`. Each received
+        JSON message (`{"text": ..., "message_id": ...}`) is answered with the
+        same events as the SSE endpoint; a malformed or already seen message
+        gets an `error` event and the socket stays open. Replies pushed
+        through `WebAdapter.send_message` for this user arrive as `message`.
+        """
+        adapter: WebAdapter = adapters[ChannelType.WEB]
+        try:
+            user_id = adapter.authenticate(token)
+        except WebSessionError as e:
+            logger.warning(f"Rejected web socket: {e}")
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+
+        async with adapter.subscribe(user_id) as outbox:
+            async def pump():
+                while True:
+                    await websocket.send_json(await outbox.get())
+
+            pump_task = asyncio.create_task(pump())
+            try:
+                while True:
+                    try:
+                        payload = await websocket.receive_json()
+                        internal_message = adapter.from_request({**payload, "session_token": token})
+                        if not internal_message.text:
+                            raise ValueError("missing text")
+                    except WebSessionError as e:
+                        await outbox.put({"event": "error", "data": {"detail": str(e)}})
+                        continue
+                    except (ValueError, TypeError) as e:
+                        # ValueError covers bad JSON and pydantic's ValidationError
+                        logger.warning(f"Malformed web socket message from {user_id}: {e}")
+                        await outbox.put({"event": "error", "data": {"detail": "Invalid message format"}})
+                        continue
+
+                    # a client resending after a reconnect must not run the agent twice
+                    is_new, dedup_key = await claim_message(internal_message)
+                    if not is_new:
+                        await outbox.put({"event": "error", "data": {
+                            "detail": "Duplicate message",
+                            "message_id": internal_message.message_id,
+                        }})
+                        continue
+                    limit = await check_rate_limit(internal_message)
+                    if not limit.allowed:
+                        if dedup_key:
+                            await deps.get_idempotency_store().release(dedup_key)
+                        await outbox.put({"event": "error", "data": {
+                            "detail": "Too many messages, slow down",
+                            "retry_after": math.ceil(limit.retry_after),
+                        }})
+                        continue
+                    await prefetch_user_context(internal_message)
+                    try:
+                        async with deps.get_thread_lock().hold(user_id):
+                            async for event in stream_agent(graph, internal_message):
+                                if event["event"] in ("done", "error"):
+                                    event = {"event": event["event"], "data": adapter.to_response(event["data"])}
+                                await outbox.put(event)
+                    except ThreadLockTimeout as e:
+                        logger.warning(f"Thread busy for web socket {user_id}: {e}")
+                        if dedup_key:
+                            await deps.get_idempotency_store().release(dedup_key)
+                        await outbox.put({"event": "error", "data": adapter.to_response(InternalResponse(text=BUSY_TEXT))})
+            except WebSocketDisconnect:
+                pass
+            finally:
+                pump_task.cancel()
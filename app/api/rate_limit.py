@@ -1,4 +1,219 @@
+import asyncio
+import ipaddress
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from app.config.settings import get_settings
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def _networks(cidrs: List[str]):
+    return [ipaddress.ip_network(c, strict=False) for c in cidrs]
+
+_trusted_proxies = _networks(settings.RATE_LIMIT_TRUSTED_PROXIES)
+_allowlist = _networks(settings.RATE_LIMIT_ALLOWLIST)
+
+def _in(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in net for net in networks)
+
+def client_address(request: Request) -> str:
+    """Client IP, taken from X-Forwarded-For only when the peer is a trusted proxy (nginx)."""
+    peer = get_remote_address(request)
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and _in(peer, _trusted_proxies):
+        # right-most hop not added by one of our proxies
+        for hop in reversed([h.strip() for h in forwarded.split(",")]):
+            if not _in(hop, _trusted_proxies):
+                return hop
+    return peer
+
+def is_allowlisted_source(request: Request) -> bool:
+    """Webhook senders (e.g. Telegram's ranges) skip the per-IP limit; per-user limits still apply."""
+    return _in(client_address(request), _allowlist)
+
+# coarse per-IP guard; the real limit is per user (UserRateLimiter). Like the
+# user limiter it fails open if its storage is unreachable.
+limiter = Limiter(
+    key_func=client_address,
+    storage_uri=settings.RATE_LIMIT_PER_IP_STORAGE_URI,
+    swallow_errors=True,
+)
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """'10/minute' -> (tokens per second, burst)."""
+    count, _, period = spec.partition("/")
+    period = period.strip().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Unsupported rate limit period in '{spec}'")
+    count = float(count)
+    return count / _PERIODS[period], count
+
+
+class RateLimitBackend:
+    """
+    Token buckets in this process only (development / single worker stand-in).
+
+    Every `prune_interval` seconds buckets untouched for longer than the
+    slowest refill seen are dropped; they are full again, which is the same
+    as having no bucket.
+    """
+
+    def __init__(self, prune_interval: float = 300.0):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = asyncio.Lock()
+        self.prune_interval = prune_interval
+        self._refill_seconds = 0.0
+        self._pruned_at = time.time()
+
+    def _prune_due(self, rate: float, burst: float) -> bool:
+        self._refill_seconds = max(self._refill_seconds, burst / rate)
+        if time.time() - self._pruned_at < self.prune_interval:
+            return False
+        self._pruned_at = time.time()
+        return True
+
+    async def prune(self, idle: float) -> int:
+        """Drop buckets untouched for `idle` seconds. Returns how many were dropped."""
+        cutoff = time.time() - idle
+        async with self._lock:
+            stale = [key for key, (_, updated) in self._buckets.items() if updated < cutoff]
+            for key in stale:
+                del self._buckets[key]
+        return len(stale)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take `cost` tokens from `key`'s bucket. Returns (allowed, tokens left)."""
+        async with self._lock:
+            now = time.time()
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        if self._prune_due(rate, burst):
+            await self.prune(self._refill_seconds)
+        return allowed, tokens
+
+
+class PostgresRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in `rate_limit_buckets`, shared by every worker and replica.
+    Refill and take happen in one upsert, so concurrent requests can't
+    overspend a bucket.
+    """
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]], prune_interval: float = 300.0):
+        super().__init__(prune_interval)
+        self.pool_factory = pool_factory
+        self._ready = False
+        self._prune_task: Optional[asyncio.Task] = None
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        key TEXT PRIMARY KEY,
+                        tokens DOUBLE PRECISION NOT NULL,
+                        updated_at DOUBLE PRECISION NOT NULL,
+                        allowed BOOLEAN NOT NULL
+                    )
+                    """
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS rate_limit_buckets_updated_at ON rate_limit_buckets (updated_at)"
+                )
+            self._ready = True
+        return pool
+
+    async def prune(self, idle: float) -> int:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "DELETE FROM rate_limit_buckets WHERE updated_at < extract(epoch FROM clock_timestamp()) - %s",
+                (idle,),
+            )
+            return cur.rowcount
+
+    async def _prune_quietly(self, idle: float) -> None:
+        try:
+            pruned = await self.prune(idle)
+            if pruned:
+                logger.info(f"Pruned {pruned} idle rate limit buckets")
+        except Exception as e:
+            logger.warning(f"Could not prune rate limit buckets: {e}")
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                WITH now AS (SELECT extract(epoch FROM clock_timestamp()) AS ts)
+                INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at, allowed)
+                SELECT %(key)s, %(burst)s - %(cost)s, now.ts, %(burst)s >= %(cost)s FROM now
+                ON CONFLICT (key) DO UPDATE SET
+                    allowed = least(%(burst)s, b.tokens + (EXCLUDED.updated_at - b.updated_at) * %(rate)s) >= %(cost)s,
+                    tokens = least(%(burst)s, b.tokens + (EXCLUDED.updated_at - b.updated_at) * %(rate)s)
+                        - CASE WHEN least(%(burst)s, b.tokens + (EXCLUDED.updated_at - b.updated_at) * %(rate)s) >= %(cost)s
+                               THEN %(cost)s ELSE 0 END,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING allowed, tokens
+                """,
+                {"key": key, "rate": rate, "burst": burst, "cost": cost},
+            )
+            allowed, tokens = await cur.fetchone()
+        if self._prune_due(rate, burst) and (self._prune_task is None or self._prune_task.done()):
+            # off the request path
+            self._prune_task = asyncio.create_task(self._prune_quietly(self._refill_seconds))
+        return allowed, tokens
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+class UserRateLimiter:
+    """
+    Per-user, per-channel token bucket (e.g. "10/minute") enforced through a
+    shared backend, so the limit holds across all workers and replicas. If
+    the backend is unreachable requests are allowed (fail open).
+    """
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None, limit: str = "10/minute"):
+        self.backend = backend or RateLimitBackend()
+        self.rate, self.burst = parse_rate(limit)
+        self.limited = 0
+
+    @staticmethod
+    def key(channel: str, user_id: str) -> str:
+        return f"user:{channel}:{user_id}"
+
+    async def check(self, channel: str, user_id: str) -> RateLimitResult:
+        try:
+            allowed, tokens = await self.backend.take(self.key(channel, user_id), self.rate, self.burst)
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing {channel}:{user_id}: {e}")
+            return RateLimitResult(True)
+        if allowed:
+            return RateLimitResult(True)
+        self.limited += 1
+        return RateLimitResult(False, retry_after=(1 - tokens) / self.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit_per_second": self.rate, "burst": self.burst, "limited": self.limited}
@@ -1,9 +1,17 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
 from pydantic import BaseModel
 from app.api import deps
 from app.services.datastore.datastore import LightRAGClient
-from app.services.escalations.controller import escalation_service
+from app.services.escalations.controller import EscalationService
+from app.services.memory.controller import MemoryController
+from app.services.memory.models import MemoryBatchReport, MemoryWrite
+from app.utils.singleflight import singleflight_stats
+from app.channels.core.outbound import outbound_stats
+from app.channels.core.queue import InboundQueue, inbound_worker_stats
+from app.agents.middleware.thread_compaction_middleware import compaction_stats
+from app.agents.checkpoints import CheckpointRetention
+from app.agents.graph_registry import GraphRegistry
 
 router = APIRouter(dependencies=[Depends(deps.verify_api_key)])
 
@@ -15,6 +23,13 @@ class SearchRequest(BaseModel):
     query: str
     mode: str = "hybrid"
 
+class ImportMemoriesRequest(BaseModel):
+    memories: List[MemoryWrite]
+    infer: bool = True  # False stores each text as-is, without mem0's LLM extraction
+
+class DeleteMemoriesRequest(BaseModel):
+    memory_ids: List[str]
+
 class UpdateEscalationRequest(BaseModel):
     status: str  # pending, assigned, in_progress, resolved
     assigned_to: Optional[str] = None
@@ -73,20 +88,198 @@ async def search_documents(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================
+# Agent Graph Management Endpoints
+# ============================================
+
+@router.post("/agent/graphs/invalidate")
+async def invalidate_agent_graphs(
+    reload_tools: bool = False,
+    registry: GraphRegistry = Depends(deps.get_graph_registry),
+):
+    """
+    Drop this worker's cached agent graphs so the next chat request rebuilds them.
+    Call after changing the agent config or tools (`reload_tools=true`).
+
+    Only the worker that serves this request is affected: other gunicorn
+    workers and replicas keep their graphs. Restart the workers to roll a
+    change out everywhere.
+    """
+    dropped = registry.invalidate(tools=reload_tools)
+    return {"success": True, "invalidated": dropped}
+
+
+@router.get("/agent/graphs")
+async def list_agent_graphs(registry: GraphRegistry = Depends(deps.get_graph_registry)):
+    """List agent graphs currently cached in this worker."""
+    return registry.stats()
+
+
+@router.get("/metrics/singleflight")
+async def get_singleflight_metrics():
+    """Request-coalescing counters for this worker (calls, upstream calls, dedup ratio)."""
+    return singleflight_stats()
+
+
+@router.get("/metrics/lightrag-pool")
+async def get_lightrag_pool_metrics(client: LightRAGClient = Depends(deps.get_lightrag_client)):
+    """LightRAG HTTP connection pool utilization for this worker."""
+    return client.pool_stats()
+
+
+@router.get("/metrics/inbound-queue")
+async def get_inbound_queue_metrics(inbound_queue: InboundQueue = Depends(deps.get_inbound_queue)):
+    """Webhook queue depth and oldest job age (shared), plus this process's consumers."""
+    try:
+        queue = await inbound_queue.stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Inbound queue unavailable: {e}")
+    return {
+        "queue": queue,
+        "workers": inbound_worker_stats(),
+        "mailbox": deps.get_thread_mailbox().stats(),
+    }
+
+
+@router.get("/metrics/outbound")
+async def get_outbound_metrics():
+    """Reply delivery queues and counters per channel for this worker."""
+    return outbound_stats()
+
+
+@router.get("/metrics/idempotency")
+async def get_idempotency_metrics():
+    """Accepted vs. skipped (redelivered) channel messages on this worker."""
+    return deps.get_idempotency_store().stats()
+
+
+@router.get("/metrics/escalations")
+async def get_escalation_metrics():
+    """Escalation lookup cache effectiveness on this worker."""
+    return deps.get_escalation_service().stats()
+
+
+@router.get("/metrics/escalation-webhooks")
+async def get_escalation_webhook_metrics():
+    """Escalation webhook outbox depth, dead letters and delivery counters."""
+    return await deps.get_escalation_dispatcher().stats()
+
+
+@router.get("/metrics/memory-context")
+async def get_memory_context_metrics():
+    """Prefetched user memory context cache on this worker (hits skip the memory store)."""
+    controller = await deps.get_memory_controller()
+    if controller.context_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **controller.context_cache.stats()}
+
+
+@router.get("/metrics/memory-writes")
+async def get_memory_write_metrics():
+    """Write-behind memory queue: pending, coalesced, flushed and dropped writes."""
+    return await deps.get_memory_write_queue().stats()
+
+
+@router.get("/metrics/threads")
+async def get_thread_metrics():
+    """History compactions (prompt tokens saved) and checkpoint pruning on this worker."""
+    return {
+        "compaction": compaction_stats(),
+        "checkpoint_gc": deps.get_checkpoint_pruner().stats(),
+        "checkpoint_retention": deps.get_checkpoint_retention().stats(),
+    }
+
+
+@router.post("/checkpoints/retention")
+async def run_checkpoint_retention(retention: CheckpointRetention = Depends(deps.get_checkpoint_retention)):
+    """Run a checkpoint retention sweep now and return its report."""
+    try:
+        report = await retention.run_once()
+        return report.to_dict()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/metrics/rate-limit")
+async def get_rate_limit_metrics():
+    """Messages rejected by the per-user limit on this worker."""
+    return deps.get_user_rate_limiter().stats()
+
+
+@router.get("/metrics/semantic-cache")
+async def get_semantic_cache_metrics(client: LightRAGClient = Depends(deps.get_lightrag_client)):
+    """Knowledge-base answer cache hit ratio and size for this worker."""
+    if client.answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **client.answer_cache.stats()}
+
+
+@router.post("/lightrag/cache/invalidate")
+async def invalidate_semantic_cache(client: LightRAGClient = Depends(deps.get_lightrag_client)):
+    """Drop cached knowledge-base answers in every worker."""
+    if client.answer_cache is None:
+        return {"status": "disabled"}
+    await client.answer_cache.invalidate()
+    return {"status": "invalidated"}
+
+
+# ============================================
+# User Memory Endpoints (bulk import / cleanup)
+# ============================================
+
+@router.post("/memory/{user_id}/import", response_model=MemoryBatchReport)
+async def import_memories(
+    user_id: str,
+    request: ImportMemoriesRequest,
+    controller: MemoryController = Depends(deps.get_memory_controller),
+):
+    """Add many memories for a user; items that fail are listed in `failed`."""
+    return await controller.add_memories(user_id, request.memories, infer=request.infer)
+
+
+@router.post("/memory/{user_id}/delete", response_model=MemoryBatchReport)
+async def delete_memories(
+    user_id: str,
+    request: DeleteMemoriesRequest,
+    controller: MemoryController = Depends(deps.get_memory_controller),
+):
+    """Delete many memories of a user; ids that fail are listed in `failed`."""
+    return await controller.delete_memories(user_id, request.memory_ids)
+
+
+@router.delete("/memory/{user_id}")
+async def clear_user_memory(
+    user_id: str,
+    types: Optional[List[str]] = Query(None),
+    controller: MemoryController = Depends(deps.get_memory_controller),
+):
+    """Erase a user's memories (all of them, or only the given types)."""
+    try:
+        await controller.clear_memory(user_id, types=types)
+        return {"status": "cleared"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================
 # Escalation Management Endpoints
 # ============================================
 
 @router.get("/escalations")
-async def list_pending_escalations():
+async def list_pending_escalations(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    escalation_service: EscalationService = Depends(deps.get_escalation_service),
+):
     """
-    List all pending escalations for human agents to review.
-    Returns escalations sorted by priority and creation time.
+    List pending escalations for human agents to review, sorted by priority
+    and creation time. Pass `next_cursor` back as `cursor` for the next page.
     """
     try:
-        escalations = await escalation_service.get_pending_escalations()
+        escalations, next_cursor = await escalation_service.get_pending_escalations(limit=limit, cursor=cursor)
         return {
             "count": len(escalations),
+            "next_cursor": next_cursor,
             "escalations": [
                 {
                     "id": e.id,
@@ -98,21 +291,20 @@ async def list_pending_escalations():
                     "status": e.status,
                     "created_at": e.created_at.isoformat(),
                 }
-                for e in sorted(
-                    escalations, 
-                    key=lambda x: (
-                        {"urgent": 0, "high": 1, "medium": 2, "low": 3}.get(x.priority.value, 2),
-                        x.created_at
-                    )
-                )
+                for e in escalations
             ]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/escalations/{escalation_id}")
-async def get_escalation(escalation_id: str):
+async def get_escalation(
+    escalation_id: str,
+    escalation_service: EscalationService = Depends(deps.get_escalation_service),
+):
     """Get detailed information about a specific escalation."""
     try:
         escalation = await escalation_service.get_escalation(escalation_id)
@@ -139,7 +331,11 @@ async def get_escalation(escalation_id: str):
 
 
 @router.patch("/escalations/{escalation_id}")
-async def update_escalation(escalation_id: str, request: UpdateEscalationRequest):
+async def update_escalation(
+    escalation_id: str,
+    request: UpdateEscalationRequest,
+    escalation_service: EscalationService = Depends(deps.get_escalation_service),
+):
     """
     Update escalation status.
     Used by human agents to mark escalations as assigned, in_progress, or resolved.
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ComponentStatus:
+    name: str
+    critical: bool
+    ready: bool = False
+    detail: str = "pending"
+    seconds: Optional[float] = None
+
+
+class StartupWarmup:
+    """
+    Brings up a worker's dependencies concurrently before it takes traffic.
+
+    Each component is an async step (open a pool, create tables, build the
+    graph); steps run in parallel unless they name the components they
+    need `after`. A failed or timed-out step is recorded and startup goes
+    on: its component initialises lazily on first use, as before. The
+    worker is ready when every `critical` component is, so critical
+    components should have a `check` or a failure at boot is final.
+
+    The report is served unauthenticated: details carry the error type
+    only, the full error goes to the log.
+    """
+
+    def __init__(self, timeout: float = 60.0):
+        self.timeout = timeout
+        self.components: Dict[str, ComponentStatus] = {}
+        self._steps: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._after: Dict[str, Sequence[str]] = {}
+        self._checks: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.cold_start_seconds: Optional[float] = None
+
+    def add(
+        self,
+        name: str,
+        step: Callable[[], Awaitable[Any]],
+        *,
+        critical: bool = True,
+        after: Sequence[str] = (),
+        check: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> None:
+        """Register a step; `check` (optional) re-verifies the component on each readiness probe."""
+        self.components[name] = ComponentStatus(name=name, critical=critical)
+        self._steps[name] = step
+        self._after[name] = after
+        if check is not None:
+            self._checks[name] = check
+
+    def _record(self, name: str, ready: bool, detail: str, seconds: Optional[float] = None) -> None:
+        status = self.components[name]
+        status.ready = ready
+        status.detail = detail
+        if seconds is not None:
+            status.seconds = round(seconds, 3)
+
+    async def _run_step(self, name: str) -> None:
+        needs = [self._tasks[dep] for dep in self._after[name] if dep in self._tasks]
+        if needs:
+            await asyncio.gather(*needs, return_exceptions=True)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._steps[name](), timeout=self.timeout)
+        except Exception as e:
+            detail = self._detail(e, self.timeout)
+            self._record(name, False, detail, time.perf_counter() - start)
+            logger.error(f"Startup: {name} failed, will initialise on first use: {e!r}")
+            return
+        self._record(name, True, "ok", time.perf_counter() - start)
+
+    async def run(self) -> float:
+        """Run every step; returns the cold-start time in seconds."""
+        start = time.perf_counter()
+        self._tasks = {name: asyncio.create_task(self._run_step(name), name=f"warmup-{name}") for name in self._steps}
+        await asyncio.gather(*self._tasks.values())
+        self.cold_start_seconds = round(time.perf_counter() - start, 3)
+        logger.info(
+            f"Cold start finished in {self.cold_start_seconds}s",
+            extra={
+                "metric": "cold_start_seconds",
+                "value": self.cold_start_seconds,
+                "components": {n: c.seconds for n, c in self.components.items()},
+                "failed": [n for n, c in self.components.items() if not c.ready],
+            },
+        )
+        return self.cold_start_seconds
+
+    @staticmethod
+    def _detail(e: Exception, timeout: float) -> str:
+        if isinstance(e, asyncio.TimeoutError):
+            return f"timed out after {timeout}s"
+        return f"{type(e).__name__} (see logs)"
+
+    async def _check(self, name: str, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._checks[name](), timeout=timeout)
+        except Exception as e:
+            self._record(name, False, self._detail(e, timeout))
+            logger.warning(f"Readiness check for {name} failed: {e!r}")
+            return
+        self._record(name, True, "ok")
+
+    async def check(self, timeout: float = 2.0) -> None:
+        """Re-run the live checks (e.g. `SELECT 1`) of every component that has one."""
+        await asyncio.gather(*(self._check(name, timeout) for name in self._checks))
+
+    @property
+    def ready(self) -> bool:
+        return self.cold_start_seconds is not None and all(
+            c.ready for c in self.components.values() if c.critical
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "cold_start_seconds": self.cold_start_seconds,
+            "components": {
+                name: {"ready": c.ready, "critical": c.critical, "detail": c.detail, "seconds": c.seconds}
+                for name, c in self.components.items()
+            },
+        }
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # stop nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _with_heartbeat(events: AsyncIterator[Dict[str, Any]], interval: float) -> AsyncIterator[str]:
+    """
+    Frame events as SSE and emit a comment line whenever nothing was sent for
+    `interval` seconds (e.g. during a slow tool call) so proxies keep the
+    connection open. The producer runs in its own task so a heartbeat never
+    cancels the agent run; it is cancelled when the client disconnects.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(format_sse(event["event"], event["data"]))
+        except Exception as e:
+            logger.error(f"SSE producer failed: {e}")
+            await queue.put(format_sse("error", {"text": "stream interrupted"}))
+        finally:
+            await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if item is done:
+                break
+            yield item
+    finally:
+        producer.cancel()
+
+def sse_response(events: AsyncIterator[Dict[str, Any]], heartbeat: float = 15.0) -> StreamingResponse:
+    return StreamingResponse(
+        _with_heartbeat(events, heartbeat),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -3,6 +3,10 @@ from typing import Any
 from app.channels.core.models import InternalMessage, InternalResponse
 
 class BaseChannelAdapter(ABC):
+    # Webhook channels reply through their own API: the webhook is acknowledged
+    # as soon as the message is queued and an inbound worker runs the agent.
+    queued_replies: bool = False
+
     @abstractmethod
     def from_request(self, raw_request: Any) -> InternalMessage:
         """Convert a channel-specific request to an InternalMessage."""
@@ -17,3 +21,16 @@ class BaseChannelAdapter(ABC):
     async def send_message(self, internal_response: InternalResponse) -> Any:
         """Actively send a message to the channel API (for asynchronous replies)."""
         pass
+
+    async def deliver(self, internal_response: InternalResponse, skip_chunks: int = 0) -> Any:
+        """
+        Send and wait until the channel accepted the reply; raises if delivery
+        failed. `skip_chunks` resumes a reply whose first chunks already went
+        out (see `DeliveryError.sent`); a channel that sends in one piece has
+        nothing to skip.
+        """
+        return await self.send_message(internal_response)
+
+    async def aclose(self) -> None:
+        """Flush pending outbound work and release clients (called on shutdown)."""
+        return None
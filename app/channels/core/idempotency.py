@@ -0,0 +1,184 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyBackend:
+    """
+    Shared record of processed message keys so a redelivery that lands on
+    another worker is recognised too. The base class shares nothing.
+    """
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        """Record `key`; True if it was not seen within `ttl` seconds."""
+        return True
+
+    async def release(self, key: str) -> None:
+        return None
+
+    async def cleanup(self, ttl: float) -> int:
+        return 0
+
+
+class PostgresIdempotencyBackend(IdempotencyBackend):
+    """Row per message key in `processed_messages`; expired rows are deleted in batches."""
+
+    CLEANUP_BATCH = 5000
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]]):
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS processed_messages (
+                        key TEXT PRIMARY KEY,
+                        seen_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS processed_messages_seen_at_idx ON processed_messages (seen_at)"
+                )
+            self._ready = True
+        return pool
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            # an expired row counts as unseen and is taken over
+            cur = await conn.execute(
+                """
+                INSERT INTO processed_messages (key) VALUES (%s)
+                ON CONFLICT (key) DO UPDATE SET seen_at = now()
+                    WHERE processed_messages.seen_at < now() - make_interval(secs => %s)
+                RETURNING key
+                """,
+                (key, ttl),
+            )
+            return await cur.fetchone() is not None
+
+    async def release(self, key: str) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute("DELETE FROM processed_messages WHERE key = %s", (key,))
+
+    async def cleanup(self, ttl: float) -> int:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                DELETE FROM processed_messages WHERE key IN (
+                    SELECT key FROM processed_messages
+                    WHERE seen_at < now() - make_interval(secs => %s)
+                    LIMIT %s
+                )
+                """,
+                (ttl, self.CLEANUP_BATCH),
+            )
+            return cur.rowcount
+
+
+class IdempotencyStore:
+    """
+    Dedup for webhook redeliveries, keyed on the channel's own message id
+    (Telegram `update_id`, WhatsApp message `id`).
+
+    A bounded in-memory LRU answers repeats on the same worker without a
+    round trip; the shared backend catches repeats across workers. Keys are
+    remembered for `ttl` seconds. If the shared backend is unreachable the
+    message is processed (a duplicate reply beats a dropped one).
+    """
+
+    def __init__(
+        self,
+        backend: Optional[IdempotencyBackend] = None,
+        ttl: float = 604800.0,
+        max_entries: int = 10000,
+        cleanup_interval: float = 3600.0,
+    ):
+        self.backend = backend or IdempotencyBackend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cleanup_interval = cleanup_interval
+
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._last_cleanup = time.time()
+        self.duplicates = 0
+        self.accepted = 0
+
+    @staticmethod
+    def make_key(channel: str, message_id: str) -> str:
+        return f"{channel}:{message_id}"
+
+    def _seen_locally(self, key: str, now: float) -> bool:
+        seen_at = self._seen.get(key)
+        if seen_at is None:
+            return False
+        if now - seen_at >= self.ttl:
+            del self._seen[key]
+            return False
+        self._seen.move_to_end(key)
+        return True
+
+    def _remember(self, key: str, now: float) -> None:
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    async def claim(self, key: str) -> bool:
+        """True the first time `key` is seen; False for a redelivery."""
+        now = time.time()
+        if self._seen_locally(key, now):
+            self.duplicates += 1
+            return False
+
+        # remembered before the backend round trip so a concurrent retry on this worker is caught
+        self._remember(key, now)
+        try:
+            first = await self.backend.claim(key, self.ttl)
+        except Exception as e:
+            logger.warning(f"Idempotency backend unavailable, processing {key}: {e}")
+            first = True
+
+        if not first:
+            self.duplicates += 1
+            logger.info(f"Skipping redelivered message {key}")
+            return False
+
+        self.accepted += 1
+        await self._maybe_cleanup(now)
+        return True
+
+    async def release(self, key: str) -> None:
+        """Forget `key` so the provider's next retry is processed (e.g. queueing failed)."""
+        self._seen.pop(key, None)
+        try:
+            await self.backend.release(key)
+        except Exception as e:
+            logger.warning(f"Could not release idempotency key {key}: {e}")
+
+    async def _maybe_cleanup(self, now: float) -> None:
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        try:
+            removed = await self.backend.cleanup(self.ttl)
+            if removed:
+                logger.info(f"Removed {removed} expired idempotency keys")
+        except Exception as e:
+            logger.warning(f"Idempotency key cleanup failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_entries": len(self._seen),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.channels.core.models import InternalMessage
+from app.channels.core.queue import InboundJob, InboundQueue
+
+logger = logging.getLogger(__name__)
+
+# hold(key) without a timeout waits up to the lock's `acquire_timeout`
+_DEFAULT = object()
+
+class ThreadLockTimeout(TimeoutError):
+    """The thread stayed locked (another run in progress) past the acquire timeout."""
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+async def _acquire(primitive: Any, deadline: Optional[float]) -> None:
+    """Acquire an asyncio Lock/Semaphore by `deadline`; raises asyncio.TimeoutError."""
+    if not primitive.locked():
+        # free: take it without wait_for, which would time out a zero timeout first
+        await primitive.acquire()
+        return
+    await asyncio.wait_for(primitive.acquire(), _remaining(deadline))
+
+
+class ThreadLock:
+    """
+    Process-local mutual exclusion per conversation thread.
+
+    `hold(key, timeout)` gives up with ThreadLockTimeout after `timeout`
+    seconds (`acquire_timeout` by default, None waits for good; 0 only
+    takes a free lock).
+    """
+
+    def __init__(self, acquire_timeout: Optional[float] = None):
+        self.acquire_timeout = acquire_timeout
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+
+    def _deadline(self, timeout: Any) -> Optional[float]:
+        timeout = self.acquire_timeout if timeout is _DEFAULT else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    @asynccontextmanager
+    async def _local(self, key: str, deadline: Optional[float]) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            try:
+                await _acquire(lock, deadline)
+            except asyncio.TimeoutError:
+                raise ThreadLockTimeout(f"Thread {key} is busy")
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    def hold(self, key: str, timeout: Any = _DEFAULT):
+        """`async with lock.hold(thread_id):` runs the body with the thread locked."""
+        return self._local(key, self._deadline(timeout))
+
+
+class PostgresThreadLock(ThreadLock):
+    """
+    Session-level advisory lock per thread, so only one worker process (or
+    replica) runs the agent on a thread at a time. Waiters in the same
+    process queue on a local lock first and don't each hold a connection.
+
+    Locks are held on connections from their own pool (`pool_factory`), not
+    the one the checkpointer uses, and at most `max_held` at once per
+    process, so long agent runs can't starve the pool or each other. The
+    lock is taken with `pg_try_advisory_lock`, polled every
+    `poll_interval` seconds until the acquire timeout.
+    """
+
+    def __init__(
+        self,
+        pool_factory: Callable[[], Awaitable[Any]],
+        acquire_timeout: Optional[float] = 120.0,
+        max_held: int = 10,
+        poll_interval: float = 0.2,
+    ):
+        super().__init__(acquire_timeout=acquire_timeout)
+        self.pool_factory = pool_factory
+        self.max_held = max_held
+        self.poll_interval = poll_interval
+        self._slots = asyncio.Semaphore(max_held)
+
+    @staticmethod
+    def lock_id(key: str) -> int:
+        return int.from_bytes(hashlib.sha256(f"thread:{key}".encode()).digest()[:8], "big", signed=True)
+
+    @asynccontextmanager
+    async def _advisory(self, key: str, deadline: Optional[float]) -> AsyncIterator[None]:
+        lock_id = self.lock_id(key)
+        try:
+            await _acquire(self._slots, deadline)
+        except asyncio.TimeoutError:
+            raise ThreadLockTimeout(f"No thread lock slot free for {key} ({self.max_held} runs in progress)")
+        try:
+            pool = await self.pool_factory()
+            async with pool.connection(timeout=_remaining(deadline)) as conn:
+                while True:
+                    cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (lock_id,))
+                    if (await cur.fetchone())[0]:
+                        break
+                    remaining = _remaining(deadline)
+                    if remaining == 0:
+                        raise ThreadLockTimeout(f"Thread {key} is locked by another worker")
+                    await asyncio.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                try:
+                    yield
+                finally:
+                    await conn.execute("SELECT pg_advisory_unlock(%s)", (lock_id,))
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def _both(self, key: str, deadline: Optional[float]) -> AsyncIterator[None]:
+        async with self._local(key, deadline):
+            async with self._advisory(key, deadline):
+                yield
+
+    def hold(self, key: str, timeout: Any = _DEFAULT):
+        return self._both(key, self._deadline(timeout))
+
+
+def merge_messages(messages: List[InternalMessage]) -> InternalMessage:
+    """One InternalMessage (one HumanMessage) for a burst, texts in arrival order."""
+    if len(messages) == 1:
+        return messages[0]
+    last = messages[-1]
+    return last.model_copy(update={
+        "text": "\n".join(m.text for m in messages if m.text),
+        "attachments": [a for m in messages for a in m.attachments],
+        "metadata": {**last.metadata, "batched_message_ids": [m.message_id for m in messages]},
+    })
+
+
+class ThreadMailbox:
+    """
+    Per-thread mailbox in front of the agent run.
+
+    The consumer that claims a thread's first message takes the thread lock,
+    waits until no new message has arrived for `window` seconds (at most
+    `max_wait` after the first one), claims everything queued for that thread
+    meanwhile, and hands over one merged message. Messages arriving during
+    the run stay queued for the next batch.
+    """
+
+    def __init__(self, lock: ThreadLock, window: float = 1.5, max_wait: float = 6.0):
+        self.lock = lock
+        self.window = window
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched_messages = 0
+
+    async def _collect(self, queue: InboundQueue, jobs: List[InboundJob], thread: str) -> None:
+        """Extend `jobs` (claimed so far) in place, so a failure keeps what was claimed."""
+        deadline = jobs[0].created_at + self.max_wait
+        newest = jobs[0].created_at
+        while True:
+            delay = min(newest + self.window, deadline) - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            more = await queue.claim_thread(thread)
+            if not more:
+                return
+            jobs.extend(more)
+            newest = max(newest, max(job.created_at for job in more))
+            if time.time() >= deadline:
+                # leave any later arrivals for the next run
+                return
+
+    @asynccontextmanager
+    async def batch(self, queue: InboundQueue, first: InboundJob) -> AsyncIterator[Tuple[InternalMessage, List[InboundJob]]]:
+        thread = queue.thread_key(first.message)
+        async with self.lock.hold(thread):
+            jobs = [first]
+            if first.reply is not None:
+                # only the reply of an earlier run is left to send
+                yield first.message, jobs
+                return
+            try:
+                await self._collect(queue, jobs, thread)
+            except Exception as e:
+                logger.error(f"Could not collect burst for thread {thread}, running what was claimed: {e}")
+
+            jobs.sort(key=lambda job: job.id)
+            self.batches += 1
+            self.batched_messages += len(jobs)
+            if len(jobs) > 1:
+                logger.info(f"Batched {len(jobs)} messages for thread {thread}")
+            yield merge_messages([job.message for job in jobs]), jobs
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "messages": self.batched_messages,
+            "avg_batch_size": round(self.batched_messages / self.batches, 3) if self.batches else 0.0,
+        }
@@ -16,6 +16,8 @@ class InternalMessage(BaseModel):
     user_id: str
     channel: ChannelType
     text: str
+    # provider's id for this delivery (Telegram update_id, WhatsApp message id), used for dedup
+    message_id: Optional[str] = None
     attachments: List[Attachment] = []
     metadata: dict = {}
 
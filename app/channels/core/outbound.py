@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Pattern
+import httpx
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_dispatchers: Dict[str, "OutboundDispatcher"] = {}
+
+_BREAKS = [
+    re.compile(r"\n\s*\n"),  # paragraph
+    re.compile(r"\n"),       # line
+    re.compile(r"(?<=[.!?])\s"),  # sentence
+    re.compile(r"\s"),       # word
+]
+
+# Telegram legacy Markdown entities: ```pre```, `code`, *bold*, _italic_, [text](url)
+MARKDOWN_ENTITY = re.compile(r"```.*?```|`[^`\n]*`|\*[^*\n]+\*|_[^_\n]+_|\[[^\]\n]*\]\([^)\n]*\)", re.DOTALL)
+
+def split_message(text: str, limit: int, keep_together: Optional[Pattern] = None) -> List[str]:
+    """
+    Split `text` into chunks of at most `limit` chars, preferring natural
+    breaks. Breaks inside a `keep_together` match (e.g. a Markdown entity)
+    are skipped unless the match is longer than `limit`.
+    """
+    chunks = []
+    rest = text.strip()
+    while len(rest) > limit:
+        window = rest[:limit + 1]
+        spans = [m.span() for m in keep_together.finditer(rest)] if keep_together else []
+
+        def inside(pos: int) -> bool:
+            return any(start < pos < end for start, end in spans)
+
+        cut = None
+        for pattern in _BREAKS:
+            matches = [m for m in pattern.finditer(window) if m.start() > limit // 2 and not inside(m.start())]
+            if matches:
+                cut = matches[-1]
+                break
+        if cut is None:
+            hard = limit
+            # cut before an entity that would otherwise be split, if there is room
+            for start, end in spans:
+                if start < hard < end and start > 0:
+                    hard = start
+            chunks.append(rest[:hard])
+            rest = rest[hard:].lstrip()
+        else:
+            chunks.append(rest[:cut.start()].rstrip())
+            rest = rest[cut.end():].lstrip()
+    if rest:
+        chunks.append(rest)
+    return chunks
+
+def build_channel_client() -> httpx.AsyncClient:
+    """Long-lived pooled client for a channel's send API."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.CHANNEL_HTTP_READ_TIMEOUT,
+            connect=settings.CHANNEL_HTTP_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.CHANNEL_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.CHANNEL_HTTP_MAX_CONNECTIONS,
+        ),
+    )
+
+
+class TokenBucket:
+    """`rate` operations per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class RateLimitedError(Exception):
+    """Provider asked us to slow down; `retry_after` seconds if it said so."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeliveryError(Exception):
+    """A reply did not go out completely; its first `sent` chunks did."""
+
+    def __init__(self, message: str, sent: int = 0):
+        super().__init__(message)
+        self.sent = sent
+
+
+class DeliveryAbortedError(DeliveryError):
+    """The dispatcher shut down before the reply went out."""
+
+
+@dataclass
+class _Reply:
+    chunks: List[str]
+    future: asyncio.Future
+    sent: int = 0
+
+
+class OutboundDispatcher:
+    """
+    Background delivery of replies for one channel.
+
+    `submit()` splits the text into `chunk_size` pieces and returns at once;
+    a per-recipient task sends that recipient's chunks strictly in order,
+    pacing them with a per-recipient and a channel-wide token bucket.
+    `send` should already retry transient network errors (`network_retry`);
+    a `RateLimitedError` is retried here after the provider's delay.
+    A reply that fails fails with DeliveryError, and one still queued when
+    `aclose()` gives up with DeliveryAbortedError; both say how many chunks
+    went out, so a caller can resubmit the rest with `skip`.
+    """
+
+    MAX_RATE_LIMIT_RETRIES = 3
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str, str], Awaitable[Any]],
+        chunk_size: int = 4096,
+        keep_together: Optional[Pattern] = None,
+        rate: float = 30.0,
+        per_recipient_rate: float = 1.0,
+        per_recipient_burst: float = 3.0,
+    ):
+        self.name = name
+        self.send = send
+        self.chunk_size = chunk_size
+        self.keep_together = keep_together
+        self.per_recipient_rate = per_recipient_rate
+        self.per_recipient_burst = per_recipient_burst
+        self.global_bucket = TokenBucket(rate, burst=rate)
+
+        self._pending: Dict[str, Deque[_Reply]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+        self.sent_chunks = 0
+        self.failed_messages = 0
+        self.rate_limited = 0
+        _dispatchers[name] = self
+
+    def submit(self, recipient: str, text: str, skip: int = 0) -> asyncio.Future:
+        """
+        Queue a reply; the future resolves to the provider responses (one per
+        chunk sent). `skip` leaves out the first chunks, already delivered by
+        an earlier attempt.
+        """
+        chunks = split_message(text, self.chunk_size, self.keep_together) or [text]
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(recipient, deque()).append(_Reply(chunks, future, sent=min(skip, len(chunks))))
+        if recipient not in self._tasks:
+            self._tasks[recipient] = asyncio.create_task(
+                self._drain(recipient), name=f"{self.name}-outbound-{recipient}"
+            )
+        return future
+
+    def _bucket(self, recipient: str) -> TokenBucket:
+        if recipient not in self._buckets:
+            # forget recipients whose bucket has refilled; they need no pacing state
+            idle = [r for r, b in self._buckets.items() if r not in self._tasks and b.full]
+            for r in idle:
+                del self._buckets[r]
+            self._buckets[recipient] = TokenBucket(self.per_recipient_rate, self.per_recipient_burst)
+        return self._buckets[recipient]
+
+    async def _send_chunk(self, recipient: str, chunk: str) -> Any:
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            await self._bucket(recipient).acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await self.send(recipient, chunk)
+            except RateLimitedError as e:
+                self.rate_limited += 1
+                if attempt == self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                delay = e.retry_after or 2 ** attempt
+                logger.warning(f"{self.name} rate limited for {recipient}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def _drain(self, recipient: str) -> None:
+        queue = self._pending[recipient]
+        try:
+            while queue:
+                reply = queue.popleft()
+                results = []
+                try:
+                    while reply.sent < len(reply.chunks):
+                        results.append(await self._send_chunk(recipient, reply.chunks[reply.sent]))
+                        reply.sent += 1
+                        self.sent_chunks += 1
+                except asyncio.CancelledError:
+                    queue.appendleft(reply)
+                    raise
+                except Exception as e:
+                    self.failed_messages += 1
+                    logger.error(
+                        f"{self.name} delivery to {recipient} failed after "
+                        f"{reply.sent}/{len(reply.chunks)} chunks: {e}"
+                    )
+                    if not reply.future.done():
+                        error = DeliveryError(f"{self.name} delivery to {recipient} failed: {e}", sent=reply.sent)
+                        error.__cause__ = e
+                        reply.future.set_exception(error)
+                        reply.future.exception()  # failures are logged here; don't warn if nobody awaits
+                    continue
+                if not reply.future.done():
+                    reply.future.set_result(results)
+        finally:
+            self._tasks.pop(recipient, None)
+            if not queue:
+                self._pending.pop(recipient, None)
+
+    def _abort_pending(self, recipient: str) -> int:
+        aborted = 0
+        for reply in self._pending.pop(recipient, ()):
+            if not reply.future.done():
+                reply.future.set_exception(DeliveryAbortedError(
+                    f"{self.name} shut down before delivery to {recipient}", sent=reply.sent
+                ))
+                reply.future.exception()
+                aborted += 1
+        return aborted
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Give queued replies `timeout` seconds to go out, then abort the rest."""
+        tasks = dict(self._tasks)
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        aborted = sum(self._abort_pending(recipient) for recipient, task in tasks.items() if task in pending)
+        if aborted:
+            logger.warning(f"{self.name}: aborted {aborted} undelivered replies on shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_recipients": len(self._tasks),
+            "queued_messages": sum(len(q) for q in self._pending.values()),
+            "sent_chunks": self.sent_chunks,
+            "failed_messages": self.failed_messages,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def outbound_stats() -> Dict[str, Dict[str, Any]]:
+    """Delivery counters for every channel dispatcher in this process."""
+    return {name: dispatcher.stats() for name, dispatcher in _dispatchers.items()}
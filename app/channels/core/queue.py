@@ -0,0 +1,496 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+from app.channels.core.models import InternalMessage, InternalResponse
+from app.channels.core.outbound import DeliveryError
+if TYPE_CHECKING:
+    from app.channels.core.mailbox import ThreadMailbox
+
+logger = logging.getLogger(__name__)
+
+_pools: List["InboundWorkerPool"] = []
+
+@dataclass
+class InboundJob:
+    id: int
+    message: InternalMessage
+    attempts: int
+    created_at: float  # time.time() of this process, whatever clock stored the job
+    # set once the agent answered: a retry only (re)sends the reply, from chunk `sent_chunks`
+    reply: Optional[InternalResponse] = None
+    sent_chunks: int = 0
+
+
+class InboundQueue(ABC):
+    """
+    Durable-ish queue of inbound channel messages waiting for an agent run.
+
+    `claim()` hands a job to exactly one consumer until it is completed,
+    failed, or its visibility timeout passes (the consumer died). It skips
+    threads that already have a job in progress, so their follow-up messages
+    wait for `claim_thread()` from the consumer handling that thread.
+    Storage is up to the subclass; the base only wakes this process's
+    consumers (`notify()`/`wait()`).
+    """
+
+    def __init__(self, max_attempts: int = 3, visibility_timeout: float = 300.0):
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self._wakeup = asyncio.Event()
+
+    @staticmethod
+    def thread_key(message: InternalMessage) -> str:
+        # run_agent uses the user id as the conversation thread id
+        return message.user_id
+
+    @abstractmethod
+    async def enqueue(self, message: InternalMessage) -> int:
+        """Store a message for an agent run; returns the job id."""
+        pass
+
+    @abstractmethod
+    async def claim(self, limit: int = 1) -> List[InboundJob]:
+        """Claim up to `limit` ready jobs, at most one per thread not already in progress."""
+        pass
+
+    @abstractmethod
+    async def claim_thread(self, thread_key: str, limit: int = 50) -> List[InboundJob]:
+        """Claim ready jobs of one thread, oldest first (used to batch a burst)."""
+        pass
+
+    @abstractmethod
+    async def complete(self, job: InboundJob) -> None:
+        """Remove a job whose message was handled."""
+        pass
+
+    @abstractmethod
+    async def fail(self, job: InboundJob, error: str) -> None:
+        """Put a job back with backoff, or dead-letter it after `max_attempts`."""
+        pass
+
+    @abstractmethod
+    async def save_reply(self, job: InboundJob, reply: InternalResponse, sent_chunks: int = 0) -> None:
+        """Store the agent's reply (and how much of it went out) on a claimed job."""
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth, jobs in progress, dead jobs and the oldest waiting job's age."""
+        pass
+
+    def _backoff(self, attempts: int) -> float:
+        return min(2 ** attempts, 60)
+
+    def notify(self) -> None:
+        """Wake local consumers right away instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class MemoryInboundQueue(InboundQueue):
+    """Process-local queue for development and tests; jobs are lost on restart."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._next_id = 1
+        self._queued: Dict[int, InboundJob] = {}
+        self._available_at: Dict[int, float] = {}
+        self._claimed: Dict[int, float] = {}
+        self.dead: List[InboundJob] = []
+
+    async def enqueue(self, message: InternalMessage) -> int:
+        job = InboundJob(self._next_id, message, 0, time.time())
+        self._next_id += 1
+        self._queued[job.id] = job
+        self._available_at[job.id] = job.created_at
+        self.notify()
+        return job.id
+
+    def _claimable(self, job_id: int, now: float) -> bool:
+        claimed_at = self._claimed.get(job_id)
+        if claimed_at is not None and now - claimed_at < self.visibility_timeout:
+            return False
+        return self._available_at[job_id] <= now
+
+    def _busy_threads(self, now: float) -> set:
+        return {
+            self.thread_key(self._queued[job_id].message)
+            for job_id, claimed_at in self._claimed.items()
+            if now - claimed_at < self.visibility_timeout
+        }
+
+    async def claim(self, limit: int = 1) -> List[InboundJob]:
+        now = time.time()
+        busy = self._busy_threads(now)
+        jobs = []
+        for job_id in sorted(self._queued):
+            if len(jobs) >= limit:
+                break
+            if not self._claimable(job_id, now):
+                continue
+            thread = self.thread_key(self._queued[job_id].message)
+            if thread in busy:
+                continue
+            busy.add(thread)
+            self._claimed[job_id] = now
+            jobs.append(self._queued[job_id])
+        return jobs
+
+    async def claim_thread(self, thread_key: str, limit: int = 50) -> List[InboundJob]:
+        now = time.time()
+        jobs = []
+        for job_id in sorted(self._queued):
+            if len(jobs) >= limit:
+                break
+            job = self._queued[job_id]
+            if self.thread_key(job.message) != thread_key or not self._claimable(job_id, now):
+                continue
+            self._claimed[job_id] = now
+            jobs.append(job)
+        return jobs
+
+    async def complete(self, job: InboundJob) -> None:
+        self._queued.pop(job.id, None)
+        self._available_at.pop(job.id, None)
+        self._claimed.pop(job.id, None)
+
+    async def fail(self, job: InboundJob, error: str) -> None:
+        job.attempts += 1
+        self._claimed.pop(job.id, None)
+        if job.attempts >= self.max_attempts:
+            self._queued.pop(job.id, None)
+            self._available_at.pop(job.id, None)
+            self.dead.append(job)
+            return
+        self._available_at[job.id] = time.time() + self._backoff(job.attempts)
+
+    async def save_reply(self, job: InboundJob, reply: InternalResponse, sent_chunks: int = 0) -> None:
+        job.reply = reply
+        job.sent_chunks = sent_chunks
+
+    async def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        waiting = [j for j in self._queued.values() if j.id not in self._claimed]
+        return {
+            "backend": "memory",
+            "depth": len(waiting),
+            "in_progress": len(self._claimed),
+            "dead": len(self.dead),
+            "oldest_age_seconds": round(max((now - j.created_at for j in waiting), default=0.0), 3),
+        }
+
+
+class PostgresInboundQueue(InboundQueue):
+    """
+    `inbound_jobs` table shared by every worker and replica. Consumers claim
+    rows with `FOR UPDATE SKIP LOCKED`, so concurrent claims never block on
+    or double-deliver the same job.
+    """
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]], **kwargs):
+        super().__init__(**kwargs)
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS inbound_jobs (
+                        id BIGSERIAL PRIMARY KEY,
+                        channel TEXT NOT NULL,
+                        thread_key TEXT,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'queued',
+                        attempts INT NOT NULL DEFAULT 0,
+                        last_error TEXT,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        claimed_at TIMESTAMPTZ
+                    )
+                    """
+                )
+                await conn.execute("ALTER TABLE inbound_jobs ADD COLUMN IF NOT EXISTS thread_key TEXT")
+                await conn.execute("ALTER TABLE inbound_jobs ADD COLUMN IF NOT EXISTS reply TEXT")
+                await conn.execute(
+                    "ALTER TABLE inbound_jobs ADD COLUMN IF NOT EXISTS sent_chunks INT NOT NULL DEFAULT 0"
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS inbound_jobs_ready_idx "
+                    "ON inbound_jobs (status, available_at, id)"
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS inbound_jobs_thread_idx "
+                    "ON inbound_jobs (thread_key, status)"
+                )
+            self._ready = True
+        return pool
+
+    async def enqueue(self, message: InternalMessage) -> int:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "INSERT INTO inbound_jobs (channel, thread_key, payload) VALUES (%s, %s, %s) RETURNING id",
+                (message.channel.value, self.thread_key(message), message.model_dump_json()),
+            )
+            row = await cur.fetchone()
+        self.notify()
+        return row[0]
+
+    async def claim(self, limit: int = 1) -> List[InboundJob]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE inbound_jobs SET status = 'processing', claimed_at = now()
+                WHERE id IN (
+                    SELECT j.id FROM inbound_jobs j
+                    WHERE ((j.status = 'queued' AND j.available_at <= now())
+                        OR (j.status = 'processing' AND j.claimed_at < now() - make_interval(secs => %(vt)s)))
+                      AND NOT EXISTS (
+                        SELECT 1 FROM inbound_jobs p
+                        WHERE p.thread_key = j.thread_key AND p.id <> j.id
+                          AND p.status = 'processing'
+                          AND p.claimed_at >= now() - make_interval(secs => %(vt)s)
+                      )
+                    ORDER BY j.id
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, payload, attempts, extract(epoch FROM now() - created_at), reply, sent_chunks
+                """,
+                {"vt": self.visibility_timeout, "limit": limit},
+            )
+            rows = await cur.fetchall()
+        return self._to_jobs(rows)
+
+    async def claim_thread(self, thread_key: str, limit: int = 50) -> List[InboundJob]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE inbound_jobs SET status = 'processing', claimed_at = now()
+                WHERE id IN (
+                    SELECT id FROM inbound_jobs
+                    WHERE thread_key = %s AND status = 'queued' AND available_at <= now()
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, payload, attempts, extract(epoch FROM now() - created_at), reply, sent_chunks
+                """,
+                (thread_key, limit),
+            )
+            rows = await cur.fetchall()
+        return self._to_jobs(rows)
+
+    @staticmethod
+    def _to_jobs(rows) -> List[InboundJob]:
+        # rows carry the job's age by the database clock; the mailbox compares
+        # created_at with this host's time.time(), so rebase it on that clock
+        now = time.time()
+        return sorted(
+            (
+                InboundJob(
+                    row[0],
+                    InternalMessage.model_validate_json(row[1]),
+                    row[2],
+                    now - float(row[3]),
+                    reply=InternalResponse.model_validate_json(row[4]) if row[4] else None,
+                    sent_chunks=row[5],
+                )
+                for row in rows
+            ),
+            key=lambda job: job.id,
+        )
+
+    async def complete(self, job: InboundJob) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute("DELETE FROM inbound_jobs WHERE id = %s", (job.id,))
+
+    async def fail(self, job: InboundJob, error: str) -> None:
+        job.attempts += 1
+        dead = job.attempts >= self.max_attempts
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                UPDATE inbound_jobs
+                SET status = %s, attempts = %s, last_error = %s, claimed_at = NULL,
+                    available_at = now() + make_interval(secs => %s)
+                WHERE id = %s
+                """,
+                ("dead" if dead else "queued", job.attempts, error, self._backoff(job.attempts), job.id),
+            )
+
+    async def save_reply(self, job: InboundJob, reply: InternalResponse, sent_chunks: int = 0) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "UPDATE inbound_jobs SET reply = %s, sent_chunks = %s WHERE id = %s",
+                (reply.model_dump_json(), sent_chunks, job.id),
+            )
+        job.reply = reply
+        job.sent_chunks = sent_chunks
+
+    async def stats(self) -> Dict[str, Any]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                SELECT
+                    count(*) FILTER (WHERE status = 'queued'),
+                    count(*) FILTER (WHERE status = 'processing'),
+                    count(*) FILTER (WHERE status = 'dead'),
+                    coalesce(extract(epoch FROM now() - min(created_at) FILTER (WHERE status = 'queued')), 0)
+                FROM inbound_jobs
+                """
+            )
+            depth, in_progress, dead, oldest = await cur.fetchone()
+        return {
+            "backend": "postgres",
+            "depth": depth,
+            "in_progress": in_progress,
+            "dead": dead,
+            "oldest_age_seconds": round(float(oldest), 3),
+        }
+
+
+class InboundWorkerPool:
+    """
+    `concurrency` async consumers that claim jobs and pass each message to
+    `handler` (run the agent). With a `mailbox`, a burst of messages on one
+    thread is merged into a single handler call. A handler exception puts
+    the jobs back with backoff until the queue's `max_attempts` is reached.
+
+    With `deliver`, the handler returns the reply, which is saved on the
+    first job (the others are done) before `deliver` sends it. A failed
+    delivery then only retries the sending, resuming after the chunks that
+    already went out, instead of running the agent again.
+    """
+
+    def __init__(
+        self,
+        queue: InboundQueue,
+        handler: Callable[[InternalMessage], Awaitable[Any]],
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        mailbox: Optional["ThreadMailbox"] = None,
+        deliver: Optional[Callable[[InternalMessage, InternalResponse, int], Awaitable[Any]]] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.deliver = deliver
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.mailbox = mailbox
+        self._tasks: List[asyncio.Task] = []
+        _pools.append(self)
+
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.last_latency: Optional[float] = None
+
+    async def _send_reply(self, job: InboundJob) -> None:
+        try:
+            await self.deliver(job.message, job.reply, job.sent_chunks)
+        except DeliveryError as e:
+            if e.sent > job.sent_chunks:
+                await self.queue.save_reply(job, job.reply, e.sent)
+            raise
+
+    async def _handle(self, message: InternalMessage, jobs: List[InboundJob]) -> None:
+        total, pending = len(jobs), jobs
+        try:
+            if jobs[0].reply is None:
+                reply = await self.handler(message)
+                if self.deliver is not None and reply is not None:
+                    # the agent's turn is checkpointed: from now on only the
+                    # first job stays, to retry sending this reply
+                    await self.queue.save_reply(jobs[0], reply)
+                    for job in jobs[1:]:
+                        await self.queue.complete(job)
+                    pending = jobs[:1]
+            if self.deliver is not None and jobs[0].reply is not None:
+                await self._send_reply(jobs[0])
+        except Exception as e:
+            self.failed += len(pending)
+            logger.error(f"Inbound jobs {[j.id for j in pending]} failed: {e}")
+            for job in pending:
+                await self.queue.fail(job, str(e))
+        else:
+            self.processed += total
+            self.last_latency = time.time() - jobs[0].created_at
+            for job in pending:
+                await self.queue.complete(job)
+
+    async def _process(self, job: InboundJob) -> None:
+        self.busy += 1
+        try:
+            if self.mailbox is None:
+                await self._handle(job.message, [job])
+                return
+            async with self.mailbox.batch(self.queue, job) as (message, jobs):
+                await self._handle(message, jobs)
+        finally:
+            self.busy -= 1
+
+    async def _run(self, worker_id: int) -> None:
+        while True:
+            try:
+                jobs = await self.queue.claim(limit=1)
+            except Exception as e:
+                logger.error(f"Inbound worker {worker_id} could not claim jobs: {e}")
+                jobs = []
+
+            if not jobs:
+                await self.queue.wait(self.poll_interval)
+                continue
+
+            for job in jobs:
+                try:
+                    await self._process(job)
+                except Exception as e:
+                    # complete/fail could not reach the queue; the visibility timeout recovers the job
+                    logger.error(f"Inbound worker {worker_id} lost track of job {job.id}: {e}")
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(i), name=f"inbound-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_end_to_end_seconds": round(self.last_latency, 3) if self.last_latency is not None else None,
+        }
+
+
+def inbound_worker_stats() -> List[Dict[str, Any]]:
+    """Consumer counters for every inbound worker pool in this process."""
+    return [pool.stats() for pool in _pools]
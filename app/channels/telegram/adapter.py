@@ -1,24 +1,43 @@
+import asyncio
 import logging
 import httpx
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 from app.channels.core.base_adapter import BaseChannelAdapter
 from app.channels.core.models import InternalMessage, InternalResponse, ChannelType
+from app.channels.core.outbound import MARKDOWN_ENTITY, OutboundDispatcher, RateLimitedError, build_channel_client
 from app.config.settings import get_settings
+from app.utils.retry import network_retry
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class TelegramAdapter(BaseChannelAdapter):
+    queued_replies = True
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.outbound = OutboundDispatcher(
+            "telegram",
+            self._send_text,
+            chunk_size=self.MAX_MESSAGE_LENGTH,
+            keep_together=MARKDOWN_ENTITY,
+            rate=settings.TELEGRAM_SEND_RATE,
+            per_recipient_rate=settings.TELEGRAM_SEND_RATE_PER_CHAT,
+        )
+
     def from_request(self, raw_request: Dict[str, Any]) -> InternalMessage:
         # Placeholder for Telegram webhook payload
         message = raw_request.get("message", {})
         user_id = str(message.get("from", {}).get("id", "unknown_tg"))
         text = message.get("text", "")
+        update_id = raw_request.get("update_id")
         
         return InternalMessage(
             user_id=user_id,
             channel=ChannelType.TELEGRAM,
             text=text,
+            message_id=str(update_id) if update_id is not None else None,
             metadata=raw_request
         )
 
@@ -26,18 +45,38 @@ class TelegramAdapter(BaseChannelAdapter):
         # Since we sent the message via API, return simple OK to acknowledge webhook
         return {"status": "ok"}
 
-    async def send_message(self, internal_response: InternalResponse) -> Any:
-        """
-        Send message via Telegram Bot API.
-        """
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = build_channel_client()
+        return self._client
+
+    @network_retry()
+    async def _send_text(self, chat_id: str, text: str) -> Dict[str, Any]:
+        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "Markdown"
+        }
+        response = await self._get_client().post(url, json=payload)
+        if response.status_code == 429:
+            retry_after = response.json().get("parameters", {}).get("retry_after")
+            raise RateLimitedError(retry_after)
+        if response.status_code == 400 and "can't parse entities" in response.text:
+            # unbalanced Markdown from the model; send it as plain text
+            logger.warning(f"Telegram could not parse Markdown for chat {chat_id}, resending as plain text")
+            payload.pop("parse_mode")
+            response = await self._get_client().post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _submit(self, internal_response: InternalResponse, skip_chunks: int = 0) -> Tuple[Dict[str, Any], Optional[asyncio.Future]]:
         meta = internal_response.metadata or {}
         ingress = meta.get("ingress_metadata", {}) or {}
 
         if not settings.TELEGRAM_BOT_TOKEN:
              logger.info(f"[MOCK SEND] Telegram: {internal_response.text}")
-             return {"status": "mock_sent"}
-
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+             return {"status": "mock_sent"}, None
 
         # Determine chat_id
         chat_id = (
@@ -46,18 +85,27 @@ class TelegramAdapter(BaseChannelAdapter):
             or ingress.get("message", {}).get("chat", {}).get("id")
             or "unknown_chat_id"
         )
-        
-        payload = {
-            "chat_id": chat_id,
-            "text": internal_response.text,
-            "parse_mode": "Markdown"
-        }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error sending Telegram message: {e}")
-                return {"error": str(e)}
+        delivery = self.outbound.submit(str(chat_id), internal_response.text, skip=skip_chunks)
+        return {"status": "queued", "chat_id": chat_id}, delivery
+
+    async def send_message(self, internal_response: InternalResponse) -> Any:
+        """
+        Send message via Telegram Bot API.
+
+        The reply is queued on the outbound dispatcher (chunked, paced, in
+        order per chat) and this returns without waiting for delivery.
+        """
+        return self._submit(internal_response)[0]
+
+    async def deliver(self, internal_response: InternalResponse, skip_chunks: int = 0) -> Any:
+        result, delivery = self._submit(internal_response, skip_chunks)
+        if delivery is not None:
+            result = {**result, "status": "sent", "responses": await delivery}
+        return result
+
+    async def aclose(self) -> None:
+        await self.outbound.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,14 +1,46 @@
-from typing import Any, Dict
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
 from app.channels.core.base_adapter import BaseChannelAdapter
 from app.channels.core.models import InternalMessage, InternalResponse, ChannelType
+from app.channels.web.session import WebSessionError, WebSessions
+
+logger = logging.getLogger(__name__)
 
 class WebAdapter(BaseChannelAdapter):
+    """
+    Web chat channel. Replies are returned in the HTTP response and also
+    pushed to the user's open WebSocket connections on this worker.
+
+    With `sessions` the user id comes from the request's `session_token`
+    (see WebSessions); without it the client-supplied `user_id` is used and
+    nothing is pushed, since WebSockets need an authenticated user.
+    """
+
+    def __init__(self, outbox_size: int = 256, sessions: Optional[WebSessions] = None):
+        self.outbox_size = outbox_size
+        self.sessions = sessions
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def authenticate(self, token: Optional[str]) -> str:
+        """User id of a session token; raises WebSessionError."""
+        if self.sessions is None:
+            raise WebSessionError("Web sessions are not configured")
+        return self.sessions.verify(token)
+
     def from_request(self, raw_request: Dict[str, Any]) -> InternalMessage:
         # Assuming raw_request is a dict from JSON body
+        if self.sessions is not None:
+            user_id = self.authenticate(raw_request.get("session_token"))
+        else:
+            user_id = raw_request.get("user_id", "anonymous")
         return InternalMessage(
-            user_id=raw_request.get("user_id", "anonymous"),
+            user_id=user_id,
             channel=ChannelType.WEB,
             text=raw_request.get("text", ""),
+            message_id=raw_request.get("message_id"),
             metadata=raw_request.get("metadata", {})
         )
 
@@ -19,8 +51,32 @@ class WebAdapter(BaseChannelAdapter):
             "rich_content": internal_response.rich_content
         }
 
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Outbox queue for one live connection of an authenticated `user_id`; events pushed to it land here."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.outbox_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def push(self, user_id: Optional[str], event: Dict[str, Any]) -> int:
+        """Deliver an event to every connection of `user_id`. Returns the number reached."""
+        delivered = 0
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                logger.warning(f"Web outbox full for user {user_id}, dropping event")
+        return delivered
+
     async def send_message(self, internal_response: InternalResponse) -> Any:
-        # For Web, usually we return the response directly in the HTTP request.
-        # But if we need async push (e.g. WebSocket), we would implement it here.
-        # For now, we just return the response structure to be sent back.
-        return self.to_response(internal_response)
\ No newline at end of file
+        if self.sessions is None:
+            return {"status": "no_connection", "delivered": 0}
+        user_id = (internal_response.metadata or {}).get("user_id")
+        delivered = self.push(user_id, {"event": "message", "data": self.to_response(internal_response)})
+        return {"status": "pushed" if delivered else "no_connection", "delivered": delivered}
@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import hmac
+import time
+import uuid
+from typing import Optional
+
+
+class WebSessionError(ValueError):
+    """Missing, forged or expired web session token."""
+
+
+class WebSessions:
+    """
+    Signed web chat sessions: `<base64url user_id>.<expiry>.<hmac>`.
+
+    The web channel takes its user id from the token, never from the
+    request, so a client can only read or push to its own thread. Anonymous
+    visitors get a fresh id from `issue()`; a storefront backend that knows
+    the customer can sign tokens for them with the same secret.
+    """
+
+    def __init__(self, secret: str, ttl: float = 86400.0):
+        self.secret = secret.encode()
+        self.ttl = ttl
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def issue(self, user_id: Optional[str] = None) -> str:
+        user_id = user_id or f"web-{uuid.uuid4().hex}"
+        encoded = base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+        payload = f"{encoded}.{int(time.time() + self.ttl)}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: Optional[str]) -> str:
+        """Returns the token's user id; raises WebSessionError."""
+        try:
+            encoded, expires, signature = (token or "").split(".")
+            payload = f"{encoded}.{expires}"
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                raise WebSessionError("Invalid session token")
+            if int(expires) < time.time():
+                raise WebSessionError("Session expired")
+            return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+        except WebSessionError:
+            raise
+        except ValueError:
+            raise WebSessionError("Invalid session token")
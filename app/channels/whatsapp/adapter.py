@@ -1,14 +1,32 @@
+import asyncio
 import logging
 import httpx
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 from app.channels.core.base_adapter import BaseChannelAdapter
 from app.channels.core.models import InternalMessage, InternalResponse, ChannelType
+from app.channels.core.outbound import OutboundDispatcher, RateLimitedError, build_channel_client
 from app.config.settings import get_settings
+from app.utils.retry import network_retry
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class WhatsAppAdapter(BaseChannelAdapter):
+    queued_replies = True
+    MAX_MESSAGE_LENGTH = 4096
+    # Cloud API throughput / pair-rate-limit error codes
+    RATE_LIMIT_CODES = {4, 80007, 130429, 131056}
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.outbound = OutboundDispatcher(
+            "whatsapp",
+            self._send_text,
+            chunk_size=self.MAX_MESSAGE_LENGTH,
+            rate=settings.WHATSAPP_SEND_RATE,
+            per_recipient_rate=settings.WHATSAPP_SEND_RATE_PER_RECIPIENT,
+        )
+
     def from_request(self, raw_request: Dict[str, Any]) -> InternalMessage:
         # Placeholder for WhatsApp payload structure parsing
         # Simplification: Assume some standard webhook format
@@ -20,6 +38,7 @@ class WhatsAppAdapter(BaseChannelAdapter):
         
         user_id = raw_request.get("From", "unknown_wa_user")
         text = raw_request.get("Body", "")
+        message_id = raw_request.get("MessageSid")
         
         # Try finding in nested if flat not found
         if not text and "entry" in raw_request:
@@ -27,6 +46,7 @@ class WhatsAppAdapter(BaseChannelAdapter):
                 msg = raw_request["entry"][0]["changes"][0]["value"]["messages"][0]
                 user_id = msg.get("from", user_id)
                 text = msg.get("text", {}).get("body", "")
+                message_id = msg.get("id", message_id)
             except (IndexError, KeyError):
                 pass
 
@@ -34,6 +54,7 @@ class WhatsAppAdapter(BaseChannelAdapter):
             user_id=user_id,
             channel=ChannelType.WHATSAPP,
             text=text,
+            message_id=message_id,
             metadata=raw_request
         )
 
@@ -41,19 +62,39 @@ class WhatsAppAdapter(BaseChannelAdapter):
         # Since we are sending message via API (async), we just return 200 OK status to the webhook.
         return {"status": "success"}
 
-    async def send_message(self, internal_response: InternalResponse) -> Any:
-        """
-        Send message via WhatsApp API (Meta or Twilio).
-        """
-        meta = internal_response.metadata or {}
-        ingress = meta.get("ingress_metadata", {}) or {}
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = build_channel_client()
+        return self._client
 
+    @network_retry()
+    async def _send_text(self, to_number: str, text: str) -> Dict[str, Any]:
         # Example using Meta Graph API structure
         url = f"https://graph.facebook.com/v17.0/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
         headers = {
             "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
             "Content-Type": "application/json"
         }
+        payload = {
+            "messaging_product": "whatsapp",
+            "to": to_number,
+            "type": "text",
+            "text": {"body": text}
+        }
+        response = await self._get_client().post(url, json=payload, headers=headers)
+        if response.status_code >= 400:
+            try:
+                code = response.json().get("error", {}).get("code")
+            except ValueError:
+                code = None
+            if response.status_code == 429 or code in self.RATE_LIMIT_CODES:
+                raise RateLimitedError()
+        response.raise_for_status()
+        return response.json()
+
+    def _submit(self, internal_response: InternalResponse, skip_chunks: int = 0) -> Tuple[Dict[str, Any], Optional[asyncio.Future]]:
+        meta = internal_response.metadata or {}
+        ingress = meta.get("ingress_metadata", {}) or {}
 
         to_number = (
             meta.get("to_phone_number")
@@ -63,24 +104,31 @@ class WhatsAppAdapter(BaseChannelAdapter):
             or "recipient_number"
         )
 
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": to_number,  # Should be in metadata or tracked context
-            "type": "text",
-            "text": {"body": internal_response.text}
-        }
-        
         # If simulation / no token
         if not settings.WHATSAPP_ACCESS_TOKEN:
-            logger.info(f"[MOCK SEND] WhatsApp to {payload['to']}: {internal_response.text}")
-            return {"status": "mock_sent", "payload": payload}
+            logger.info(f"[MOCK SEND] WhatsApp to {to_number}: {internal_response.text}")
+            return {"status": "mock_sent", "to": to_number}, None
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error sending WhatsApp message: {e}")
-                # Don't raise, just log, so we don't crash the agent loop
-                return {"error": str(e)}
+        delivery = self.outbound.submit(str(to_number), internal_response.text, skip=skip_chunks)
+        return {"status": "queued", "to": to_number}, delivery
+
+    async def send_message(self, internal_response: InternalResponse) -> Any:
+        """
+        Send message via WhatsApp API (Meta or Twilio).
+
+        The reply is queued on the outbound dispatcher (chunked, paced, in
+        order per recipient) and this returns without waiting for delivery.
+        """
+        return self._submit(internal_response)[0]
+
+    async def deliver(self, internal_response: InternalResponse, skip_chunks: int = 0) -> Any:
+        result, delivery = self._submit(internal_response, skip_chunks)
+        if delivery is not None:
+            result = {**result, "status": "sent", "responses": await delivery}
+        return result
+
+    async def aclose(self) -> None:
+        await self.outbound.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,9 +1,13 @@
+import asyncio
 import httpx
 import logging
 import mimetypes
+import time
 from pathlib import Path
 from typing import Optional, Dict, Any, Union
 from app.utils.retry import network_retry
+from app.utils.singleflight import SingleFlight, normalize_key
+from app.services.datastore.semantic_cache import SemanticCache
 from fastapi import UploadFile
 from app.config.settings import get_settings
 
@@ -11,23 +15,97 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class LightRAGClient:
-    def __init__(self, base_url: str = "http://lightrag:9621"):
+    def __init__(
+        self,
+        base_url: str = "http://lightrag:9621",
+        timeout: Optional[httpx.Timeout] = None,
+        limits: Optional[httpx.Limits] = None,
+        answer_cache: Optional[SemanticCache] = None,
+        pipeline_check_interval: float = 10.0,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.answer_cache = answer_cache
+        # LightRAG indexes uploads in the background; answers are not cached
+        # while its pipeline is busy and the cache is dropped once it is done
+        self.pipeline_check_interval = pipeline_check_interval
+        self._indexing = False
+        self._pipeline_checked_at = 0.0
+        self._pipeline_lock = asyncio.Lock()
+        # identical concurrent queries (e.g. FAQ bursts) share one LightRAG call
+        self._flights = SingleFlight("lightrag")
+
+        self.timeout = timeout or httpx.Timeout(
+            connect=settings.LIGHTRAG_HTTP_CONNECT_TIMEOUT,
+            read=settings.LIGHTRAG_HTTP_READ_TIMEOUT,
+            write=settings.LIGHTRAG_HTTP_WRITE_TIMEOUT,
+            pool=settings.LIGHTRAG_HTTP_POOL_TIMEOUT,
+        )
+        self.limits = limits or httpx.Limits(
+            max_connections=settings.LIGHTRAG_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LIGHTRAG_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LIGHTRAG_HTTP_KEEPALIVE_EXPIRY,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+        self._pool_timeouts = 0
+
+    async def open(self) -> None:
+        """Create the long-lived pooled client (called from app lifespan)."""
+        self._get_client()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # created lazily as well, so scripts that never run the lifespan still work
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Connection pool utilization for sizing LIGHTRAG_HTTP_MAX_CONNECTIONS per
+        worker. httpx doesn't expose its pool, so this counts requests here:
+        peak in-flight near `max_connections`, or any pool timeouts, means the
+        pool is too small.
+        """
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight_requests": self._in_flight,
+            "peak_in_flight_requests": self._peak_in_flight,
+            "requests_total": self._requests_total,
+            "pool_timeouts_total": self._pool_timeouts,
+        }
 
     @network_retry()
     async def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         url = f"{self.base_url}{endpoint}"
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                response = await client.request(method, url, **kwargs)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error requesting {url}: {e.response.text}")
-                raise
-            except Exception as e:
-                logger.error(f"Error communicating with LightRAG: {e}")
-                raise
+        client = self._get_client()
+        self._in_flight += 1
+        self._requests_total += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error requesting {url}: {e.response.text}")
+            raise
+        except httpx.PoolTimeout:
+            self._pool_timeouts += 1
+            logger.error(f"No free LightRAG connection within the pool timeout for {url}")
+            raise
+        except Exception as e:
+            logger.error(f"Error communicating with LightRAG: {e}")
+            raise
+        finally:
+            self._in_flight -= 1
 
     async def check_health(self) -> bool:
         try:
@@ -42,7 +120,10 @@ class LightRAGClient:
         payload = {"text": text}
         if description:
             payload["description"] = description
-        return await self._request("POST", "/documents/text", json=payload)
+        result = await self._request("POST", "/documents/text", json=payload)
+        await self._invalidate_answers()
+        self._mark_indexing()
+        return result
 
     async def insert_file(self, file: Union[UploadFile, str, Path], domain: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -60,20 +141,72 @@ class LightRAGClient:
             files = {"file": (file.filename, file.file, mime)}
 
         params = {"domain": domain} if domain else None
-        return await self._request("POST", "/documents/upload", files=files, params=params)
+        result = await self._request("POST", "/documents/upload", files=files, params=params)
+        await self._invalidate_answers()
+        self._mark_indexing()
+        return result
+
+    async def _invalidate_answers(self) -> None:
+        if self.answer_cache is not None:
+            await self.answer_cache.invalidate()
+
+    def _mark_indexing(self) -> None:
+        # the insert endpoints return before indexing finishes
+        self._indexing = True
+        self._pipeline_checked_at = time.monotonic()
+
+    async def is_indexing(self) -> bool:
+        """
+        Whether LightRAG is still processing documents (checked at most every
+        `pipeline_check_interval`). Covers uploads from any client, e.g. the
+        admin UI. When it finishes, cached answers are invalidated again.
+        """
+        if time.monotonic() - self._pipeline_checked_at < self.pipeline_check_interval:
+            return self._indexing
+        async with self._pipeline_lock:
+            if time.monotonic() - self._pipeline_checked_at < self.pipeline_check_interval:
+                return self._indexing
+            try:
+                response = await self._get_client().get(f"{self.base_url}/documents/pipeline_status")
+                response.raise_for_status()
+                status = response.json()
+                indexing = bool(status.get("busy") or status.get("request_pending"))
+            except Exception as e:
+                logger.warning(f"LightRAG pipeline status check failed: {e}")
+                indexing = self._indexing
+            finally:
+                self._pipeline_checked_at = time.monotonic()
+            if self._indexing and not indexing:
+                logger.info("LightRAG finished indexing, clearing answer cache")
+                await self._invalidate_answers()
+            self._indexing = indexing
+            return indexing
 
     async def query(self, query: str, mode: str = "global") -> str:
         """
         Query LightRAG.
         modes: 'global', 'local', 'hybrid', 'naive'
         """
+        if self.answer_cache is not None and not await self.is_indexing():
+            return await self.answer_cache.get_or_compute(
+                query, mode, lambda: self._query(query, mode)
+            )
+        return await self._query(query, mode)
+
+    async def _query(self, query: str, mode: str) -> str:
         payload = {
             "query": query,
             "mode": mode
         }
-        response = await self._request("POST", "/query", json=payload)
+        response = await self._flights.do(
+            normalize_key("query", mode, query),
+            lambda: self._request("POST", "/query", json=payload),
+        )
         if isinstance(response, dict) and "response" in response:
             return response["response"]
         return str(response)
 
-lightrag_client = LightRAGClient(base_url=getattr(settings, "LIGHTRAG_API_URL", "http://lightrag:9621")) 
\ No newline at end of file
+lightrag_client = LightRAGClient(
+    base_url=getattr(settings, "LIGHTRAG_API_URL", "http://lightrag:9621"),
+    pipeline_check_interval=settings.LIGHTRAG_PIPELINE_CHECK_INTERVAL,
+) 
\ No newline at end of file
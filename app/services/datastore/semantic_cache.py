@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s?!.,;:]+$")
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _TRAILING_PUNCT.sub("", _WHITESPACE.sub(" ", query).strip().lower())
+
+
+class KBVersion:
+    """
+    Shared knowledge-base version counter. Writers bump it after documents are
+    ingested, edited or deleted; every worker's cache compares it to the
+    value it last saw. The base class is process-local (no cross-worker signal).
+    """
+
+    async def current(self) -> Optional[int]:
+        return None
+
+    async def bump(self) -> None:
+        return None
+
+
+class PostgresKBVersion(KBVersion):
+    """Single row in `kb_cache_version`, also bumped by the Streamlit CMS."""
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]]):
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS kb_cache_version (
+                        id SMALLINT PRIMARY KEY,
+                        version BIGINT NOT NULL
+                    )
+                    """
+                )
+            self._ready = True
+        return pool
+
+    async def current(self) -> Optional[int]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute("SELECT version FROM kb_cache_version WHERE id = 1")
+            row = await cur.fetchone()
+        return row[0] if row else 0
+
+    async def bump(self) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO kb_cache_version (id, version) VALUES (1, 1)
+                ON CONFLICT (id) DO UPDATE SET version = kb_cache_version.version + 1
+                """
+            )
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    answer: str
+    created_at: float
+
+
+class _VectorIndex:
+    """Brute-force cosine index; rows are unit vectors, so similarity is a dot product."""
+
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[CachedAnswer] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, vector: np.ndarray, entry: CachedAnswer) -> None:
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.entries.append(entry)
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self.entries:
+            return None, 0.0
+        scores = self.vectors @ vector
+        i = int(np.argmax(scores))
+        return i, float(scores[i])
+
+    def keep(self, mask: Sequence[bool]) -> None:
+        mask = np.asarray(mask, dtype=bool)
+        self.entries = [e for e, k in zip(self.entries, mask) if k]
+        self.vectors = self.vectors[mask] if self.entries else None
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query meaning rather than exact text.
+
+    A lookup first tries the normalized query text, then embeds it and returns
+    the answer of the nearest cached query (same mode) if cosine similarity
+    is at least `threshold`. Entries expire after `ttl` seconds, the oldest are
+    evicted past `max_entries` per mode, and everything is dropped when the
+    shared `KBVersion` changes (checked at most every `version_check_interval`).
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Awaitable[List[float]]],
+        threshold: float = 0.92,
+        ttl: float = 86400.0,
+        max_entries: int = 2000,
+        version: Optional[KBVersion] = None,
+        version_check_interval: float = 30.0,
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version or KBVersion()
+        self.version_check_interval = version_check_interval
+
+        self._indexes: Dict[str, _VectorIndex] = {}
+        self._exact: Dict[Tuple[str, str], CachedAnswer] = {}
+        self._generation = 0
+        self._seen_version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._version_lock = asyncio.Lock()
+
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return now - entry.created_at >= self.ttl
+
+    async def _check_version(self) -> None:
+        if time.time() - self._version_checked_at < self.version_check_interval:
+            return
+        async with self._version_lock:
+            if time.time() - self._version_checked_at < self.version_check_interval:
+                return
+            try:
+                version = await self.version.current()
+            except Exception as e:
+                logger.warning(f"KB version check failed, keeping cached answers: {e}")
+                return
+            finally:
+                self._version_checked_at = time.time()
+            if self._seen_version is not None and version != self._seen_version:
+                logger.info(f"Knowledge base changed (version {self._seen_version} -> {version}), clearing answer cache")
+                self.clear()
+            self._seen_version = version
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(await self.embed(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _lookup_exact(self, key: Tuple[str, str], now: float) -> Optional[str]:
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, now):
+            del self._exact[key]
+            return None
+        return entry.answer
+
+    def _lookup_vector(self, mode: str, vector: np.ndarray, now: float) -> Optional[CachedAnswer]:
+        index = self._indexes.get(mode)
+        if index is None:
+            return None
+        i, score = index.nearest(vector)
+        if i is None or score < self.threshold:
+            return None
+        entry = index.entries[i]
+        return None if self._expired(entry, now) else entry
+
+    def _store(self, key: Tuple[str, str], vector: np.ndarray, entry: CachedAnswer) -> None:
+        query, mode = key
+        index = self._indexes.setdefault(mode, _VectorIndex())
+        if len(index) >= self.max_entries:
+            now = time.time()
+            index.keep([not self._expired(e, now) for e in index.entries])
+        if len(index) >= self.max_entries:
+            # entries are in insertion order: drop the oldest tenth
+            drop = max(1, self.max_entries // 10)
+            index.keep([i >= drop for i in range(len(index))])
+        index.add(vector, entry)
+        self._exact[key] = entry
+
+        if len(self._exact) > self.max_entries * max(1, len(self._indexes)):
+            now = time.time()
+            self._exact = {k: e for k, e in self._exact.items() if not self._expired(e, now)}
+
+    async def get_or_compute(self, query: str, mode: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return a cached answer for `query` (or a close paraphrase), else `compute()` and cache it."""
+        await self._check_version()
+
+        normalized = normalize_query(query)
+        key = (normalized, mode)
+        now = time.time()
+
+        answer = self._lookup_exact(key, now)
+        if answer is not None:
+            self.hits += 1
+            self.exact_hits += 1
+            return answer
+
+        vector = None
+        try:
+            vector = await self._embed(normalized)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, bypassing answer cache: {e}")
+
+        if vector is not None:
+            entry = self._lookup_vector(mode, vector, now)
+            if entry is not None:
+                self.hits += 1
+                logger.debug(f"Semantic cache hit: '{normalized}' ~ '{entry.query}'")
+                return entry.answer
+
+        self.misses += 1
+        generation = self._generation
+        answer = await compute()
+
+        # skip answers computed against a knowledge base that changed meanwhile
+        if vector is not None and answer and generation == self._generation:
+            self._store(key, vector, CachedAnswer(normalized, answer, time.time()))
+        return answer
+
+    def clear(self) -> None:
+        """Drop every cached answer in this worker."""
+        self._indexes = {}
+        self._exact = {}
+        self._generation += 1
+
+    async def invalidate(self) -> None:
+        """Clear this worker and bump the shared version so other workers clear too."""
+        self.clear()
+        try:
+            await self.version.bump()
+            self._seen_version = await self.version.current()
+            self._version_checked_at = time.time()
+        except Exception as e:
+            logger.warning(f"Could not bump shared KB version: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(len(index) for index in self._indexes.values()),
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "kb_version": self._seen_version,
+        }
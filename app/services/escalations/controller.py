@@ -1,7 +1,10 @@
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from app.services.escalations.models import EscalationResponse, EscalationPriority, EscalationReason, EscalationRequest
+from app.services.escalations.outbox import Notification
+from app.services.escalations.store import EscalationStore, decode_cursor, encode_cursor, queue_key
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +19,36 @@ class EscalationService:
     - Internal ticketing systems
     - Email notifications
     - Slack/Teams notifications
+
+    Escalations live in `store` (Postgres in production). Lookups by id go
+    through a small per-worker write-through cache; entries expire after
+    `cache_ttl` seconds so changes made on other workers show up.
+
+    Webhook notifications are written to the store's outbox with the
+    escalation and delivered in the background by `WebhookDispatcher`,
+    so creating an escalation never waits on the receivers.
     """
     
-    def __init__(self):
-        # In-memory storage for demo. Replace with database/external service.
-        self._escalations: Dict[str, EscalationRequest] = {}
-        self._webhooks: List[str] = []  # Webhook URLs to notify
+    def __init__(
+        self,
+        store: Optional[EscalationStore] = None,
+        cache_size: int = 1024,
+        cache_ttl: float = 30.0,
+        webhooks: Optional[List[str]] = None,
+    ):
+        self.store = store or EscalationStore()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[EscalationRequest, float]]" = OrderedDict()
+        self._webhooks: List[str] = list(webhooks or [])  # Webhook URLs to notify
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _remember(self, escalation: EscalationRequest) -> None:
+        self._cache[escalation.id] = (escalation, time.monotonic())
+        self._cache.move_to_end(escalation.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
     
     async def create_escalation(
         self,
@@ -66,8 +93,10 @@ class EscalationService:
                 metadata=metadata or {}
             )
             
-            # Store escalation
-            self._escalations[escalation.id] = escalation
+            # Store escalation together with its webhook notifications
+            await self.store.save(escalation, self._notifications(escalation))
+            self._remember(escalation)
+            self.store.outbox.notify()
             
             # Log escalation
             logger.info(
@@ -81,9 +110,6 @@ class EscalationService:
                 }
             )
             
-            # Notify via webhooks (async, fire-and-forget)
-            await self._notify_webhooks(escalation)
-            
             # Estimate wait time based on priority
             wait_times = {
                 EscalationPriority.URGENT: "5-10 minutes",
@@ -109,15 +135,33 @@ class EscalationService:
     
     async def get_escalation(self, escalation_id: str) -> Optional[EscalationRequest]:
         """Get an escalation by ID."""
-        return self._escalations.get(escalation_id)
+        cached = self._cache.get(escalation_id)
+        if cached and time.monotonic() - cached[1] < self.cache_ttl:
+            self._cache.move_to_end(escalation_id)
+            self.cache_hits += 1
+            return cached[0]
+        self.cache_misses += 1
+        escalation = await self.store.get(escalation_id)
+        if escalation:
+            self._remember(escalation)
+        return escalation
     
     async def get_user_escalations(self, user_id: str) -> List[EscalationRequest]:
         """Get all escalations for a user."""
-        return [e for e in self._escalations.values() if e.user_id == user_id]
+        return await self.store.list_by_user(user_id)
     
-    async def get_pending_escalations(self) -> List[EscalationRequest]:
-        """Get all pending escalations (for admin dashboard)."""
-        return [e for e in self._escalations.values() if e.status == "pending"]
+    async def get_pending_escalations(
+        self, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[EscalationRequest], Optional[str]]:
+        """
+        One page of pending escalations (for admin dashboard), most urgent
+        first, then oldest first. Returns the page and the cursor for the
+        next one (None on the last page). Raises ValueError on a bad cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        escalations = await self.store.list_pending(limit, after)
+        next_cursor = encode_cursor(queue_key(escalations[-1])) if len(escalations) == limit else None
+        return escalations, next_cursor
     
     async def update_status(
         self, 
@@ -126,39 +170,52 @@ class EscalationService:
         assigned_to: Optional[str] = None
     ) -> bool:
         """Update escalation status."""
-        if escalation_id not in self._escalations:
+        escalation = await self.store.update_status(escalation_id, status, assigned_to)
+        if escalation is None:
+            self._cache.pop(escalation_id, None)
             return False
-        
-        self._escalations[escalation_id].status = status
-        if assigned_to:
-            self._escalations[escalation_id].metadata["assigned_to"] = assigned_to
+        self._remember(escalation)
         
         logger.info(f"Escalation {escalation_id} status updated to {status}")
         return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cached": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+        }
     
-    async def _notify_webhooks(self, escalation: EscalationRequest):
+    def _notifications(self, escalation: EscalationRequest) -> List[Notification]:
+        payload = self._webhook_payload(escalation)
+        return [Notification(escalation_id=escalation.id, url=url, payload=payload) for url in self._webhooks]
+
+    def _webhook_payload(self, escalation: EscalationRequest) -> Dict[str, Any]:
         """
-        Notify external systems about the escalation.
-        
-        Override this method to integrate with:
-        - Slack: Post to a support channel
+        Body POSTed to every webhook URL.
+
+        Override this method to shape it for:
+        - Slack: Post to a support channel (incoming webhook)
         - Email: Send notification to support team
         - Ticketing: Create ticket in Zendesk/Freshdesk
         """
-        # Placeholder for webhook notification
-        # In production, implement actual HTTP calls
-        logger.info(f"Would notify webhooks about escalation {escalation.id}")
-        
-        # Example Slack payload structure (for future implementation):
-        # payload = {
-        #     "text": f"🚨 New Escalation: {escalation.summary}",
-        #     "blocks": [
-        #         {"type": "section", "text": {"type": "mrkdwn", "text": f"*Priority:* {escalation.priority.value}"}},
-        #         {"type": "section", "text": {"type": "mrkdwn", "text": f"*Reason:* {escalation.reason.value}"}},
-        #         {"type": "section", "text": {"type": "mrkdwn", "text": f"*User:* {escalation.user_id}"}},
-        #     ]
-        # }
-
-
-# Singleton instance
-escalation_service = EscalationService()
+        return {
+            "text": f"🚨 New Escalation: {escalation.summary}",
+            "blocks": [
+                {"type": "section", "text": {"type": "mrkdwn", "text": f"*Priority:* {escalation.priority.value}"}},
+                {"type": "section", "text": {"type": "mrkdwn", "text": f"*Reason:* {escalation.reason.value}"}},
+                {"type": "section", "text": {"type": "mrkdwn", "text": f"*User:* {escalation.user_id} ({escalation.channel})"}},
+            ],
+            "escalation": {
+                "id": escalation.id,
+                "user_id": escalation.user_id,
+                "channel": escalation.channel,
+                "thread_id": escalation.thread_id,
+                "reason": escalation.reason.value,
+                "priority": escalation.priority.value,
+                "summary": escalation.summary,
+                "created_at": escalation.created_at.isoformat(),
+            },
+        }
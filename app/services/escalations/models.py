@@ -16,6 +16,15 @@ class EscalationPriority(str, Enum):
     URGENT = "urgent"
 
 
+# Queue order: lower rank is served first
+PRIORITY_RANK = {
+    EscalationPriority.URGENT: 0,
+    EscalationPriority.HIGH: 1,
+    EscalationPriority.MEDIUM: 2,
+    EscalationPriority.LOW: 3,
+}
+
+
 class EscalationReason(str, Enum):
     """Common reasons for escalation."""
     COMPLEX_ISSUE = "complex_issue"
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Notification:
+    """One escalation webhook delivery (one row per escalation and URL)."""
+    escalation_id: str
+    url: str
+    payload: Dict[str, Any]
+    id: int = 0
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+
+
+class PermanentDeliveryError(Exception):
+    """The receiver rejected the payload; retrying won't help."""
+
+
+class EscalationOutbox:
+    """
+    Pending webhook notifications, written together with the escalation
+    (`add()` gets the store's connection so both commit in one transaction).
+    The base class keeps them in this process, for development and tests.
+    """
+
+    def __init__(self, max_attempts: int = 5, visibility_timeout: float = 60.0):
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self._wakeup = asyncio.Event()
+        self._next_id = 1
+        self._pending: Dict[int, Notification] = {}
+        self._available_at: Dict[int, float] = {}
+        self.delivered = 0
+        self.dead: List[Notification] = []
+
+    async def setup(self, conn: Any) -> None:
+        return None
+
+    async def add(self, conn: Any, notifications: List[Notification]) -> None:
+        for notification in notifications:
+            notification.id = self._next_id
+            self._next_id += 1
+            self._pending[notification.id] = notification
+            self._available_at[notification.id] = time.time()
+
+    async def claim(self, limit: int = 10) -> List[Notification]:
+        now = time.time()
+        claimed = []
+        for notification_id in sorted(self._pending):
+            if len(claimed) >= limit:
+                break
+            if self._available_at[notification_id] > now:
+                continue
+            notification = self._pending[notification_id]
+            notification.attempts += 1
+            self._available_at[notification_id] = now + self.visibility_timeout
+            claimed.append(notification)
+        return claimed
+
+    async def complete(self, notification: Notification) -> None:
+        self._pending.pop(notification.id, None)
+        self._available_at.pop(notification.id, None)
+        self.delivered += 1
+
+    async def fail(self, notification: Notification, error: str, permanent: bool = False) -> None:
+        if permanent or notification.attempts >= self.max_attempts:
+            self._pending.pop(notification.id, None)
+            self._available_at.pop(notification.id, None)
+            self.dead.append(notification)
+            return
+        self._available_at[notification.id] = time.time() + self._backoff(notification.attempts)
+
+    async def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "backend": "memory",
+            "pending": len(self._pending),
+            "delivered": self.delivered,
+            "dead": len(self.dead),
+            "oldest_age_seconds": round(max((now - n.created_at for n in self._pending.values()), default=0.0), 3),
+        }
+
+    def _backoff(self, attempts: int) -> float:
+        return min(2 ** attempts, 300)
+
+    def notify(self) -> None:
+        """Wake the local dispatcher right away instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class PostgresEscalationOutbox(EscalationOutbox):
+    """
+    `escalation_outbox` table. Rows are inserted in the escalation's
+    transaction and claimed with `FOR UPDATE SKIP LOCKED`; a claim hides the
+    row for `visibility_timeout` seconds, so a crashed dispatcher's rows are
+    picked up again. Delivered rows are deleted, dead ones kept for review.
+    """
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]], **kwargs):
+        super().__init__(**kwargs)
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def setup(self, conn: Any) -> None:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS escalation_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                escalation_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                payload JSONB NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INT NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                available_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS escalation_outbox_ready_idx "
+            "ON escalation_outbox (available_at, id) WHERE status = 'pending'"
+        )
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await self.setup(conn)
+            self._ready = True
+        return pool
+
+    async def add(self, conn: Any, notifications: List[Notification]) -> None:
+        if not notifications:
+            return
+        async with conn.cursor() as cur:
+            await cur.executemany(
+                "INSERT INTO escalation_outbox (escalation_id, url, payload) VALUES (%s, %s, %s::jsonb)",
+                [(n.escalation_id, n.url, json.dumps(n.payload, default=str)) for n in notifications],
+            )
+
+    async def claim(self, limit: int = 10) -> List[Notification]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE escalation_outbox
+                SET attempts = attempts + 1, available_at = now() + make_interval(secs => %s)
+                WHERE id IN (
+                    SELECT id FROM escalation_outbox
+                    WHERE status = 'pending' AND available_at <= now()
+                    ORDER BY available_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, escalation_id, url, payload, attempts, extract(epoch FROM created_at)
+                """,
+                (self.visibility_timeout, limit),
+            )
+            rows = await cur.fetchall()
+        return [
+            Notification(escalation_id=row[1], url=row[2], payload=row[3], id=row[0], attempts=row[4], created_at=float(row[5]))
+            for row in rows
+        ]
+
+    async def complete(self, notification: Notification) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute("DELETE FROM escalation_outbox WHERE id = %s", (notification.id,))
+        self.delivered += 1
+
+    async def fail(self, notification: Notification, error: str, permanent: bool = False) -> None:
+        dead = permanent or notification.attempts >= self.max_attempts
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                UPDATE escalation_outbox
+                SET status = %s, last_error = %s, available_at = now() + make_interval(secs => %s)
+                WHERE id = %s
+                """,
+                ("dead" if dead else "pending", error, self._backoff(notification.attempts), notification.id),
+            )
+
+    async def stats(self) -> Dict[str, Any]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                """
+                SELECT
+                    count(*) FILTER (WHERE status = 'pending'),
+                    count(*) FILTER (WHERE status = 'dead'),
+                    coalesce(extract(epoch FROM now() - min(created_at) FILTER (WHERE status = 'pending')), 0)
+                FROM escalation_outbox
+                """
+            )
+            pending, dead, oldest = await cur.fetchone()
+        return {
+            "backend": "postgres",
+            "pending": pending,
+            "delivered": self.delivered,
+            "dead": dead,
+            "oldest_age_seconds": round(float(oldest), 3),
+        }
+
+
+class WebhookDispatcher:
+    """
+    Background task that drains the outbox: claims a batch, POSTs every
+    notification concurrently over one pooled client, and reschedules
+    failures with exponential backoff until the outbox's `max_attempts`
+    (4xx responses other than 429 are dead-lettered at once).
+    """
+
+    def __init__(
+        self,
+        outbox: EscalationOutbox,
+        client_factory: Callable[[], httpx.AsyncClient],
+        batch_size: int = 20,
+        poll_interval: float = 2.0,
+    ):
+        self.outbox = outbox
+        self.client_factory = client_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    async def _post(self, notification: Notification) -> None:
+        response = await self._get_client().post(notification.url, json=notification.payload)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code >= 400:
+            raise PermanentDeliveryError(f"{response.status_code} {response.text[:200]}")
+
+    async def _deliver(self, notification: Notification) -> None:
+        try:
+            await self._post(notification)
+        except Exception as e:
+            self.failed += 1
+            permanent = isinstance(e, PermanentDeliveryError)
+            logger.warning(
+                f"Escalation {notification.escalation_id} webhook to {notification.url} failed "
+                f"(attempt {notification.attempts}{', giving up' if permanent else ''}): {e}"
+            )
+            await self.outbox.fail(notification, str(e), permanent=permanent)
+        else:
+            self.sent += 1
+            await self.outbox.complete(notification)
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch; returns how many notifications were claimed."""
+        notifications = await self.outbox.claim(self.batch_size)
+        results = await asyncio.gather(*(self._deliver(n) for n in notifications), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                # outbox unreachable; the visibility timeout brings the row back
+                logger.error(f"Could not record webhook delivery: {result}")
+        return len(notifications)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Escalation webhook dispatcher could not claim notifications: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                await self.outbox.wait(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="escalation-webhooks")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"running": self._task is not None, "sent": self.sent, "failed": self.failed, **await self.outbox.stats()}
@@ -0,0 +1,218 @@
+import base64
+import bisect
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from app.services.escalations.models import EscalationRequest, PRIORITY_RANK
+from app.services.escalations.outbox import EscalationOutbox, Notification
+
+logger = logging.getLogger(__name__)
+
+# (priority rank, created_at, id): the pending queue order and the keyset cursor
+QueueKey = Tuple[int, datetime, str]
+
+def queue_key(escalation: EscalationRequest) -> QueueKey:
+    return PRIORITY_RANK[escalation.priority], escalation.created_at, escalation.id
+
+def encode_cursor(key: QueueKey) -> str:
+    rank, created_at, escalation_id = key
+    raw = json.dumps([rank, created_at.isoformat(), escalation_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> QueueKey:
+    try:
+        rank, created_at, escalation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), datetime.fromisoformat(created_at), str(escalation_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class EscalationStore:
+    """
+    Escalations held in this process (development / tests). Keeps a per-user
+    index and the pending queue sorted by (priority, created_at).
+    `save()` records the escalation's webhook notifications in `outbox`.
+    """
+
+    def __init__(self, outbox: Optional[EscalationOutbox] = None):
+        self.outbox = outbox or EscalationOutbox()
+        self._escalations: Dict[str, EscalationRequest] = {}
+        self._by_user: Dict[str, List[str]] = {}
+        self._pending: List[QueueKey] = []
+
+    async def save(self, escalation: EscalationRequest, notifications: Sequence[Notification] = ()) -> None:
+        self._escalations[escalation.id] = escalation
+        self._by_user.setdefault(escalation.user_id, []).append(escalation.id)
+        if escalation.status == "pending":
+            bisect.insort(self._pending, queue_key(escalation))
+        await self.outbox.add(None, list(notifications))
+
+    async def get(self, escalation_id: str) -> Optional[EscalationRequest]:
+        return self._escalations.get(escalation_id)
+
+    async def list_by_user(self, user_id: str) -> List[EscalationRequest]:
+        return [self._escalations[i] for i in self._by_user.get(user_id, [])]
+
+    async def list_pending(self, limit: int, after: Optional[QueueKey] = None) -> List[EscalationRequest]:
+        start = bisect.bisect_right(self._pending, after) if after else 0
+        return [self._escalations[key[2]] for key in self._pending[start:start + limit]]
+
+    async def update_status(
+        self, escalation_id: str, status: str, assigned_to: Optional[str] = None
+    ) -> Optional[EscalationRequest]:
+        escalation = self._escalations.get(escalation_id)
+        if escalation is None:
+            return None
+        key = queue_key(escalation)
+        if escalation.status == "pending" and status != "pending":
+            index = bisect.bisect_left(self._pending, key)
+            if index < len(self._pending) and self._pending[index] == key:
+                del self._pending[index]
+        elif escalation.status != "pending" and status == "pending":
+            bisect.insort(self._pending, key)
+        escalation.status = status
+        if assigned_to:
+            escalation.metadata["assigned_to"] = assigned_to
+        return escalation
+
+
+class PostgresEscalationStore(EscalationStore):
+    """
+    Row per escalation in `escalations`, shared by all workers and kept
+    across restarts. The pending queue is read in index order and paged
+    by keyset, so no page scans or sorts the whole table.
+    """
+
+    COLUMNS = (
+        "id", "user_id", "channel", "thread_id", "reason", "priority", "summary",
+        "conversation_history", "metadata", "created_at", "status",
+    )
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]], outbox: Optional[EscalationOutbox] = None):
+        super().__init__(outbox)
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS escalations (
+                        id TEXT PRIMARY KEY,
+                        user_id TEXT NOT NULL,
+                        channel TEXT NOT NULL,
+                        thread_id TEXT NOT NULL,
+                        reason TEXT NOT NULL,
+                        priority TEXT NOT NULL,
+                        priority_rank SMALLINT NOT NULL,
+                        summary TEXT NOT NULL,
+                        conversation_history JSONB NOT NULL DEFAULT '[]',
+                        metadata JSONB NOT NULL DEFAULT '{}',
+                        created_at TIMESTAMP NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS escalations_queue_idx "
+                    "ON escalations (status, priority_rank, created_at, id)"
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS escalations_user_idx ON escalations (user_id, created_at)"
+                )
+                await self.outbox.setup(conn)
+            self._ready = True
+        return pool
+
+    def _to_escalation(self, row) -> EscalationRequest:
+        return EscalationRequest(**dict(zip(self.COLUMNS, row)))
+
+    async def save(self, escalation: EscalationRequest, notifications: Sequence[Notification] = ()) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn, conn.transaction():
+            await conn.execute(
+                """
+                INSERT INTO escalations (
+                    id, user_id, channel, thread_id, reason, priority, priority_rank,
+                    summary, conversation_history, metadata, created_at, status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s)
+                """,
+                (
+                    escalation.id, escalation.user_id, escalation.channel, escalation.thread_id,
+                    escalation.reason.value, escalation.priority.value, PRIORITY_RANK[escalation.priority],
+                    escalation.summary, json.dumps(escalation.conversation_history, default=str),
+                    json.dumps(escalation.metadata, default=str), escalation.created_at, escalation.status,
+                ),
+            )
+            # same transaction: an escalation is never committed without its notifications
+            await self.outbox.add(conn, list(notifications))
+
+    async def get(self, escalation_id: str) -> Optional[EscalationRequest]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM escalations WHERE id = %s", (escalation_id,)
+            )
+            row = await cur.fetchone()
+        return self._to_escalation(row) if row else None
+
+    async def list_by_user(self, user_id: str) -> List[EscalationRequest]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM escalations WHERE user_id = %s ORDER BY created_at",
+                (user_id,),
+            )
+            rows = await cur.fetchall()
+        return [self._to_escalation(row) for row in rows]
+
+    async def list_pending(self, limit: int, after: Optional[QueueKey] = None) -> List[EscalationRequest]:
+        pool = await self._pool()
+        columns = ", ".join(self.COLUMNS)
+        async with pool.connection() as conn:
+            if after:
+                cur = await conn.execute(
+                    f"""
+                    SELECT {columns} FROM escalations
+                    WHERE status = 'pending' AND (priority_rank, created_at, id) > (%s, %s, %s)
+                    ORDER BY priority_rank, created_at, id
+                    LIMIT %s
+                    """,
+                    (*after, limit),
+                )
+            else:
+                cur = await conn.execute(
+                    f"""
+                    SELECT {columns} FROM escalations
+                    WHERE status = 'pending'
+                    ORDER BY priority_rank, created_at, id
+                    LIMIT %s
+                    """,
+                    (limit,),
+                )
+            rows = await cur.fetchall()
+        return [self._to_escalation(row) for row in rows]
+
+    async def update_status(
+        self, escalation_id: str, status: str, assigned_to: Optional[str] = None
+    ) -> Optional[EscalationRequest]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"""
+                UPDATE escalations SET
+                    status = %(status)s,
+                    metadata = CASE WHEN %(assigned_to)s::text IS NULL THEN metadata
+                        ELSE metadata || jsonb_build_object('assigned_to', %(assigned_to)s::text) END,
+                    updated_at = now()
+                WHERE id = %(id)s
+                RETURNING {', '.join(self.COLUMNS)}
+                """,
+                {"id": escalation_id, "status": status, "assigned_to": assigned_to},
+            )
+            row = await cur.fetchone()
+        return self._to_escalation(row) if row else None
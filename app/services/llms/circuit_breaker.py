@@ -0,0 +1,126 @@
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker fed by call outcomes and latency.
+
+    closed    -> calls flow normally; the breaker trips when the error rate or
+                 the p95 latency over the rolling window crosses its threshold.
+    open      -> calls are rejected until `cooldown` seconds have passed.
+    half_open -> one trial call is let through; success closes the breaker,
+                 failure opens it again. A trial that ends without an outcome
+                 (cancelled, interrupted) must be given back with
+                 `release_trial()`, or the breaker would stay half-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        p95_latency_threshold: float = 15.0,
+        cooldown: float = 30.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_threshold = p95_latency_threshold
+        self.cooldown = cooldown
+
+        # (ok, latency_seconds)
+        self._samples: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Let the next call be the half-open trial (no-op once the trial recorded an outcome)."""
+        if self._state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for ok, _ in self._samples if not ok) / len(self._samples)
+
+    def p95_latency(self) -> float:
+        if not self._samples:
+            return 0.0
+        latencies = sorted(latency for _, latency in self._samples)
+        index = max(0, math.ceil(0.95 * len(latencies)) - 1)
+        return latencies[index]
+
+    def record_success(self, latency: float) -> None:
+        self._samples.append((True, latency))
+        if self._state == self.HALF_OPEN:
+            self._close()
+            return
+        self._evaluate()
+
+    def record_failure(self, latency: float) -> None:
+        self._samples.append((False, latency))
+        if self._state == self.HALF_OPEN:
+            self._open("trial call failed")
+            return
+        self._evaluate()
+
+    def _evaluate(self) -> None:
+        if self._state != self.CLOSED or len(self._samples) < self.min_calls:
+            return
+
+        error_rate = self.error_rate()
+        if error_rate >= self.error_rate_threshold:
+            self._open(f"error rate {error_rate:.0%}")
+            return
+
+        p95 = self.p95_latency()
+        if p95 >= self.p95_latency_threshold:
+            self._open(f"p95 latency {p95:.1f}s")
+
+    def _open(self, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+        logger.warning(f"Circuit for LLM provider {self.name} opened: {reason}")
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._samples.clear()
+        logger.info(f"Circuit for LLM provider {self.name} closed")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "calls": len(self._samples),
+            "error_rate": round(self.error_rate(), 3),
+            "p95_latency": round(self.p95_latency(), 3),
+        }
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_PROMPT = "Reply with the word OK only."
+
+@dataclass
+class ProviderStatus:
+    provider: str
+    healthy: bool
+    detail: str
+    checked_at: float
+    latency_ms: Optional[float] = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.checked_at
+
+
+class ProviderHealthMonitor:
+    """
+    Background health checker for LLM providers.
+
+    Probes every provider on a fixed interval and caches the result, so
+    selecting a model never has to wait for a round trip to the provider.
+    Results older than `ttl` seconds are treated as unknown.
+    """
+
+    def __init__(
+        self,
+        providers: Callable[[], List[str]],
+        probe: Callable[[str], Awaitable[str]],
+        interval: float = 120.0,
+        ttl: float = 300.0,
+        timeout: float = 10.0,
+    ):
+        self._providers = providers
+        self._probe = probe
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+
+        self._statuses: Dict[str, ProviderStatus] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get_status(self, provider: str) -> Optional[ProviderStatus]:
+        """Cached status for a provider, or None if never probed or expired."""
+        status = self._statuses.get(provider)
+        if status is None or status.age() > self.ttl:
+            return None
+        return status
+
+    def is_healthy(self, provider: str) -> Optional[bool]:
+        """True/False from the cache, None when the status is unknown."""
+        status = self.get_status(provider)
+        return status.healthy if status else None
+
+    def mark(self, provider: str, healthy: bool, detail: str, latency_ms: Optional[float] = None) -> None:
+        self._statuses[provider] = ProviderStatus(
+            provider=provider,
+            healthy=healthy,
+            detail=detail,
+            checked_at=time.monotonic(),
+            latency_ms=latency_ms,
+        )
+
+    async def probe(self, provider: str) -> ProviderStatus:
+        start = time.perf_counter()
+        try:
+            content = await asyncio.wait_for(self._probe(provider), timeout=self.timeout)
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.mark(provider, True, f"active → {content}", latency_ms)
+        except Exception as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.mark(provider, False, f"failed → {e!r}", latency_ms)
+            logger.warning(f"LLM health probe for {provider} failed → {e!r}")
+        return self._statuses[provider]
+
+    async def probe_all(self) -> Dict[str, ProviderStatus]:
+        providers = self._providers()
+        await asyncio.gather(*(self.probe(p) for p in providers))
+        return {p: self._statuses[p] for p in providers if p in self._statuses}
+
+    async def _run(self, initial_delay: float = 0.0) -> None:
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"LLM health probe loop error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, initial_delay: float = 0.0) -> None:
+        """Start probing; pass `initial_delay` when the caller has just run `probe_all()`."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(initial_delay), name="llm-health-monitor")
+            logger.info(f"LLM health monitor started (interval={self.interval}s, ttl={self.ttl}s)")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
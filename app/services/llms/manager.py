@@ -1,6 +1,10 @@
 import logging
+from typing import Dict, List, Optional
 from langchain.chat_models import init_chat_model
+from langchain.embeddings import init_embeddings
 from app.config.settings import get_settings
+from app.services.llms.health import ProviderHealthMonitor, HEALTH_PROBE_PROMPT
+from app.services.llms.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -16,11 +20,13 @@ class LLMManager:
             "openai": {
                 "api_key": settings.OPENAI_API_KEY,
                 "model": settings.OPENAI_MODEL,
+                "embedding_model": settings.OPENAI_EMBEDDING_MODEL,
                 "langchain_name": lambda m: f"openai:{m}",
             },
             "googlegenai": {
                 "api_key": settings.GOOGLEGENAI_API_KEY,
                 "model": settings.GOOGLEGENAI_MODEL,
+                "embedding_model": settings.GOOGLEGENAI_EMBEDDING_MODEL,
                 "langchain_name": lambda m: f"google_genai:{m}",
             },
             "groq": {
@@ -31,10 +37,20 @@ class LLMManager:
             "ollama": {
                 "base_url": settings.OLLAMA_BASE_URL,
                 "model": settings.OLLAMA_MODEL,
+                "embedding_model": settings.OLLAMA_EMBEDDING_MODEL,
                 "langchain_name": lambda m: f"ollama:{m}",
             },
         }
 
+        self.health = ProviderHealthMonitor(
+            providers=self._configured_providers,
+            probe=self._probe_provider,
+            interval=settings.LLM_HEALTH_CHECK_INTERVAL,
+            ttl=settings.LLM_HEALTH_CHECK_TTL,
+            timeout=settings.LLM_HEALTH_CHECK_TIMEOUT,
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
     def get_llm(self, **kwargs):
         """
         Get an llm instance based on llm selection mode
@@ -44,127 +60,164 @@ class LLMManager:
 
         return self._get_auto_llm(**kwargs)
 
-    def _get_auto_llm(self, **kwargs):
+    @property
+    def active_provider(self) -> Optional[str]:
+        """Provider `get_llm` would currently select, without instantiating a model."""
+        if self.mode == "static":
+            return self.static_provider
+        try:
+            return self.select_provider()
+        except RuntimeError:
+            return None
+
+    def _config_error(self, provider: str) -> Optional[str]:
+        provider_map = self.providers_map.get(provider)
+        if not provider_map:
+            return "not registered"
+        if not provider_map.get("model"):
+            return "model not configured"
+        if provider != "ollama" and not provider_map.get("api_key"):
+            return "API key not set"
+        return None
+
+    def _configured_providers(self) -> List[str]:
+        providers = []
         for provider in self.priority_list:
             provider = provider.lower()
-            provider_map = self.providers_map.get(provider)
+            if self._config_error(provider) is None:
+                providers.append(provider)
+        return providers
+
+    def get_breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(
+                provider,
+                window=settings.LLM_BREAKER_WINDOW,
+                min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                error_rate_threshold=settings.LLM_BREAKER_ERROR_RATE,
+                p95_latency_threshold=settings.LLM_BREAKER_P95_LATENCY,
+                cooldown=settings.LLM_BREAKER_COOLDOWN,
+            )
+        return self.breakers[provider]
 
-            if not provider_map:
-                logger.warning(f"Provider {provider} not registered")
-                continue
+    def failover_providers(self) -> List[str]:
+        """Providers to try at call time, in order. Static mode never fails over."""
+        if self.mode == "static":
+            return [self.static_provider]
+        return self._configured_providers()
 
-            model_name = provider_map.get("model")
-            if not model_name:
-                logger.warning(f"Model for provider {provider} is not configured")
-                continue
+    def get_provider_llm(self, provider: str, **kwargs):
+        """Instantiate the chat model for a specific provider."""
+        error = self._config_error(provider)
+        if error:
+            raise RuntimeError(f"Provider '{provider}' unavailable: {error}")
+        return self._init_llm(provider, **kwargs)
 
-            llm_id = provider_map["langchain_name"](model_name)
-
-            try:
-                if provider == "ollama":
-                    llm = init_chat_model(
-                        llm_id,
-                        base_url=provider_map["base_url"],
-                        **kwargs,
-                    )
-                else:
-                    api_key = provider_map.get("api_key")
-                    if not api_key:
-                        logger.warning(f"API key for {provider} not set")
-                        continue
-
-                    llm = init_chat_model(
-                        llm_id,
-                        api_key=api_key,
-                        **kwargs,
-                    )
-                    
-                response = llm.invoke("Reply with the word OK only.")
-                logger.info(f"✔ LLM {provider} active → {response.content}")
-
-                return llm
-
-            except Exception as e:
-                logger.error(f"❌ {provider} failed → {e}")
-                continue
+    def _init_llm(self, provider: str, **kwargs):
+        provider_map = self.providers_map[provider]
+        llm_id = provider_map["langchain_name"](provider_map["model"])
 
-        raise RuntimeError("No available LLM provider passed health check")
+        if provider == "ollama":
+            return init_chat_model(
+                llm_id,
+                base_url=provider_map["base_url"],
+                **kwargs,
+            )
 
-    def _get_static_llm(self, **kwargs):
-        provider = self.static_provider
+        return init_chat_model(
+            llm_id,
+            api_key=provider_map["api_key"],
+            **kwargs,
+        )
 
+    def get_embeddings(self, provider: str):
+        """Instantiate the embedding model configured for a provider (`*_EMBEDDING_MODEL`)."""
         provider_map = self.providers_map.get(provider)
-        if not provider_map:
-            raise RuntimeError(f"Static provider '{provider}' not found")
+        if not provider_map or not provider_map.get("embedding_model"):
+            raise RuntimeError(f"No embedding model configured for provider '{provider}'")
+
+        embedding_id = provider_map["langchain_name"](provider_map["embedding_model"])
+        if provider == "ollama":
+            return init_embeddings(embedding_id, base_url=provider_map["base_url"])
+        if not provider_map.get("api_key"):
+            raise RuntimeError(f"API key for embedding provider '{provider}' not set")
+        return init_embeddings(embedding_id, api_key=provider_map["api_key"])
+
+    async def _probe_provider(self, provider: str) -> str:
+        llm = self._init_llm(provider, temperature=self.llm_temperature)
+        response = await llm.ainvoke(HEALTH_PROBE_PROMPT)
+        return response.content
+
+    def select_provider(self) -> str:
+        """
+        First provider in LLM_PRIORITY_LIST that the health cache reports as
+        healthy and whose circuit breaker is not open. Falls back to the first
+        provider whose health is still unknown (not probed yet, or the cached
+        result expired).
+        """
+        unknown = None
+        for provider in self._configured_providers():
+            if self.get_breaker(provider).state == CircuitBreaker.OPEN:
+                continue
+            healthy = self.health.is_healthy(provider)
+            if healthy:
+                return provider
+            if healthy is None and unknown is None:
+                unknown = provider
 
-        model_name = provider_map.get("model")
-        if not model_name:
-            raise RuntimeError(f"Static LLM '{provider}' missing model config")
+        if unknown:
+            return unknown
 
-        llm_id = provider_map["langchain_name"](model_name)
+        raise RuntimeError("No available LLM provider passed health check")
 
+    def _get_auto_llm(self, **kwargs):
+        provider = self.select_provider()
         try:
-            if provider == "ollama":
-                return init_chat_model(
-                    llm_id,
-                    base_url=provider_map["base_url"],
-                    **kwargs,
-                )
+            llm = self._init_llm(provider, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ {provider} failed → {e}")
+            self.health.mark(provider, False, f"failed → {e}")
+            return self._get_auto_llm(**kwargs)
 
-            api_key = provider_map.get("api_key")
-            if not api_key:
-                raise RuntimeError(f"API key for static provider '{provider}' not set")
+        logger.info(f"✔ LLM {provider} selected")
+        return llm
 
-            return init_chat_model(
-                llm_id,
-                api_key=api_key,
-                **kwargs,
-            )
+    def _get_static_llm(self, **kwargs):
+        provider = self.static_provider
+
+        error = self._config_error(provider)
+        if error == "not registered":
+            raise RuntimeError(f"Static provider '{provider}' not found")
+        if error == "model not configured":
+            raise RuntimeError(f"Static LLM '{provider}' missing model config")
+        if error == "API key not set":
+            raise RuntimeError(f"API key for static provider '{provider}' not set")
 
+        try:
+            return self._init_llm(provider, **kwargs)
         except Exception as e:
             logger.error(f"Static provider '{provider}' init failed → {e}")
             raise
 
     def check_all_provider(self):
+        """Provider status from the health cache; does not call any provider."""
         results = {}
         for provider in self.priority_list:
             provider = provider.lower()
-            provider_map = self.providers_map.get(provider)
 
-            if not provider_map:
-                results[provider] = "not registered"
+            error = self._config_error(provider)
+            if error:
+                results[provider] = error
                 continue
 
-            model_name = provider_map.get("model")
-            if not model_name:
-                results[provider] = "model not configured"
+            status = self.health.get_status(provider)
+            if status is None:
+                results[provider] = "not checked yet"
                 continue
 
-            llm_id = provider_map["langchain_name"](model_name)
-
-            try:
-                if provider == "ollama":
-                    llm = init_chat_model(
-                        llm_id,
-                        base_url=provider_map["base_url"],
-                        temperature=self.llm_temperature,
-                    )
-                else:
-                    api_key = provider_map.get("api_key")
-                    if not api_key:
-                        results[provider] = "API key not set"
-                        continue
-
-                    llm = init_chat_model(
-                        llm_id,
-                        api_key=api_key,
-                        temperature=self.llm_temperature,
-                    )
-
-                response = llm.invoke("Reply with the word OK only.")
-                results[provider] = f"active → {response.content}"
-
-            except Exception as e:
-                results[provider] = f"failed → {e}"
-
-        return results
\ No newline at end of file
+            results[provider] = (
+                f"{status.detail} ({int(status.age())}s ago, "
+                f"circuit {self.get_breaker(provider).state})"
+            )
+
+        return results
@@ -0,0 +1,156 @@
+import asyncio
+import fcntl
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+from mem0 import AsyncMemory, AsyncMemoryClient
+from app.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackendError(RuntimeError):
+    """The configured memory backend can't be used (bad settings, dimension mismatch)."""
+
+# MEMORY_LLM_PROVIDER / MEMORY_EMBEDDER_PROVIDER (mem0 provider names) -> settings holding their key
+_API_KEYS = {"openai": "OPENAI_API_KEY", "groq": "GROQ_API_KEY", "gemini": "GOOGLEGENAI_API_KEY"}
+
+# one Qdrant client per target, reused by every controller in this process so
+# a server client keeps one connection pool
+_qdrant_clients: Dict[Tuple[str, ...], Any] = {}
+
+# QDRANT_PATH -> open lock file; the embedded store locks its directory, so
+# only one process (one gunicorn worker) may open it
+_local_store_locks: Dict[str, Any] = {}
+
+def _claim_local_store(path: str) -> None:
+    """Fail fast, with a usable message, when another process already owns the embedded store."""
+    if path in _local_store_locks:
+        return
+    os.makedirs(path, exist_ok=True)
+    handle = open(os.path.join(path, ".worker.lock"), "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise MemoryBackendError(
+            f"QDRANT_PATH {path} is in use by another process; MEMORY_BACKEND=local supports a single "
+            "worker (gunicorn -w 1). Use MEMORY_BACKEND=qdrant for multiple workers"
+        )
+    _local_store_locks[path] = handle
+
+def memory_backend(settings: Settings) -> str:
+    if settings.MEMORY_BACKEND != "auto":
+        return settings.MEMORY_BACKEND
+    return "hosted" if settings.MEM0_API_KEY else "qdrant"
+
+def _provider_config(settings: Settings, provider: str, model: str) -> Dict[str, Any]:
+    config: Dict[str, Any] = {"model": model}
+    if provider == "ollama":
+        config["ollama_base_url"] = settings.OLLAMA_BASE_URL
+    elif provider in _API_KEYS and getattr(settings, _API_KEYS[provider]):
+        config["api_key"] = getattr(settings, _API_KEYS[provider])
+    return config
+
+def qdrant_client(settings: Settings):
+    if memory_backend(settings) == "local":
+        if not settings.QDRANT_PATH:
+            raise MemoryBackendError("MEMORY_BACKEND=local needs QDRANT_PATH (directory for the embedded store)")
+        _claim_local_store(settings.QDRANT_PATH)
+        key: Tuple[str, ...] = ("path", settings.QDRANT_PATH)
+        params: Dict[str, Any] = {"path": settings.QDRANT_PATH}
+    else:
+        key = ("server", settings.QDRANT_HOST, str(settings.QDRANT_PORT))
+        params = {"host": settings.QDRANT_HOST, "port": settings.QDRANT_PORT, "api_key": settings.QDRANT_API_KEY}
+    if key not in _qdrant_clients:
+        from qdrant_client import QdrantClient
+        _qdrant_clients[key] = QdrantClient(**params)
+    return _qdrant_clients[key]
+
+def mem0_config(settings: Settings, client: Optional[Any] = None) -> Dict[str, Any]:
+    """mem0 config for the `qdrant` and `local` backends, built from Settings."""
+    vector_store: Dict[str, Any] = {
+        "collection_name": settings.MEMORY_COLLECTION,
+        "embedding_model_dims": settings.MEMORY_EMBEDDING_DIMS,
+    }
+    if memory_backend(settings) == "local":
+        vector_store.update(path=settings.QDRANT_PATH, on_disk=True)
+    else:
+        vector_store.update(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT, api_key=settings.QDRANT_API_KEY)
+    if client is not None:
+        # mem0 uses the shared client over host/port/path (still required by its config validation)
+        vector_store["client"] = client
+
+    embedder = _provider_config(settings, settings.MEMORY_EMBEDDER_PROVIDER, settings.MEMORY_EMBEDDER_MODEL)
+    embedder["embedding_dims"] = settings.MEMORY_EMBEDDING_DIMS
+    llm = _provider_config(settings, settings.MEMORY_LLM_PROVIDER, settings.MEMORY_LLM_MODEL)
+    llm["temperature"] = 0.2
+
+    config: Dict[str, Any] = {
+        "vector_store": {"provider": "qdrant", "config": vector_store},
+        "llm": {"provider": settings.MEMORY_LLM_PROVIDER, "config": llm},
+        "embedder": {"provider": settings.MEMORY_EMBEDDER_PROVIDER, "config": embedder},
+    }
+    if settings.MEMORY_HISTORY_DB_PATH:
+        config["history_db_path"] = settings.MEMORY_HISTORY_DB_PATH
+    return config
+
+def _collection_dims(info: Any) -> Optional[int]:
+    vectors = info.config.params.vectors
+    if isinstance(vectors, dict):  # named vectors: mem0 writes the unnamed/first one
+        vectors = next(iter(vectors.values()), None)
+    return getattr(vectors, "size", None)
+
+def validate_memory(memory: AsyncMemory, settings: Settings) -> Dict[str, Any]:
+    """
+    Check that the embedder and the existing collection both use
+    MEMORY_EMBEDDING_DIMS; a mismatch would fail (or corrupt) every write.
+    Also indexes the metadata fields `get_memory` filters on.
+    """
+    expected = settings.MEMORY_EMBEDDING_DIMS
+    embedded = len(memory.embedding_model.embed("dimension probe"))
+    if embedded != expected:
+        raise MemoryBackendError(
+            f"{settings.MEMORY_EMBEDDER_PROVIDER}/{settings.MEMORY_EMBEDDER_MODEL} returns {embedded}-dim "
+            f"vectors but MEMORY_EMBEDDING_DIMS={expected}"
+        )
+    stored = _collection_dims(memory.vector_store.client.get_collection(settings.MEMORY_COLLECTION))
+    if stored is not None and stored != expected:
+        raise MemoryBackendError(
+            f"Collection '{settings.MEMORY_COLLECTION}' holds {stored}-dim vectors but MEMORY_EMBEDDING_DIMS="
+            f"{expected}; use another MEMORY_COLLECTION or re-embed"
+        )
+    for field in ("type", "tags"):
+        try:
+            memory.vector_store.client.create_payload_index(
+                collection_name=settings.MEMORY_COLLECTION, field_name=field, field_schema="keyword"
+            )
+        except Exception as e:
+            logger.debug(f"Payload index on {field} not created: {e}")
+    return {"embedding_dims": embedded, "collection_dims": stored}
+
+async def create_memory(settings: Settings) -> Union[AsyncMemory, AsyncMemoryClient]:
+    """
+    The mem0 client for MEMORY_BACKEND:
+
+        hosted  mem0 platform (MEM0_API_KEY)
+        qdrant  Qdrant server at QDRANT_HOST:QDRANT_PORT
+        local   embedded on-disk Qdrant at QDRANT_PATH, for one-box runs;
+                single worker only (the store is locked by the first process)
+
+    Self-hosted backends are validated before use; a bad configuration
+    raises MemoryBackendError instead of degrading to mem0's defaults.
+    """
+    backend = memory_backend(settings)
+    if backend == "hosted":
+        if not settings.MEM0_API_KEY:
+            raise MemoryBackendError("MEMORY_BACKEND=hosted needs MEM0_API_KEY")
+        return AsyncMemoryClient(api_key=settings.MEM0_API_KEY)
+
+    def build() -> AsyncMemory:
+        # constructing clients (and loading local embedding models) blocks
+        memory = AsyncMemory.from_config(mem0_config(settings, qdrant_client(settings)))
+        report = validate_memory(memory, settings)
+        logger.info(f"Memory backend {backend} ready: collection={settings.MEMORY_COLLECTION} {report}")
+        return memory
+
+    return await asyncio.to_thread(build)
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, normalized query; "" without one)
+ContextKey = Tuple[str, str]
+
+def context_key(user_id: str, query: Optional[str]) -> ContextKey:
+    return user_id, " ".join((query or "").lower().split())
+
+class UserContextCache:
+    """
+    TTL cache of the compact memory context (`summarize_user_context`),
+    keyed by user and the message it was ranked against (`query`).
+
+    `prefetch()` starts loading a user's context in the background as soon
+    as their message arrives; concurrent prefetches and reads for the same
+    (user, query) share one load, and a context ranked for one message is
+    never served for another. `get()` waits at most `timeout` seconds, so a
+    slow memory store never delays the reply; the load keeps running and
+    fills the cache for a retry of the same message. Memory writes must
+    call `invalidate()`, which drops every cached query for the user.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, Optional[str]], Awaitable[str]],
+        ttl: float = 300.0,
+        max_entries: int = 5000,
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ContextKey, Tuple[str, float]]" = OrderedDict()
+        self._loading: Dict[ContextKey, asyncio.Task] = {}
+        self._generation: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+
+    def _cached(self, key: ContextKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def _load(self, key: ContextKey, generation: int, query: Optional[str]) -> str:
+        user_id = key[0]
+        try:
+            context = await self.loader(user_id, query)
+            # a write during the load makes this result stale; don't keep it
+            if self._generation.get(user_id, 0) == generation:
+                self._entries[key] = (context, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return context
+        finally:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+
+    def prefetch(self, user_id: str, query: Optional[str] = None) -> Optional[asyncio.Task]:
+        """Start loading `user_id`'s context for `query` unless it is cached or already loading."""
+        key = context_key(user_id, query)
+        if self._cached(key) is not None:
+            return None
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._load(key, self._generation.get(user_id, 0), query), name=f"user-context-{user_id}"
+            )
+            # failures are logged by get(); don't warn about unretrieved exceptions
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[key] = task
+        return task
+
+    async def get(
+        self, user_id: str, timeout: Optional[float] = None, query: Optional[str] = None
+    ) -> Optional[str]:
+        """The user's context for `query`, or None if it isn't available within `timeout` seconds."""
+        key = context_key(user_id, query)
+        context = self._cached(key)
+        if context is not None:
+            self.hits += 1
+            return context
+        self.misses += 1
+        task = self.prefetch(user_id, query)
+        if task is None:
+            return self._cached(key)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.info(f"User context for {user_id} not ready after {timeout}s, continuing without it")
+        except Exception as e:
+            logger.warning(f"Could not load user context for {user_id}: {e}")
+        return None
+
+    def invalidate(self, user_id: str) -> None:
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
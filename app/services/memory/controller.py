@@ -1,34 +1,51 @@
 import logging
 import asyncio
-from typing import List, Optional, Union, Dict
+import math
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union, Dict
 from mem0 import AsyncMemory
 from app.utils.retry import network_retry
 from app.config.settings import get_settings
-from app.services.memory.models import MemoryItem
+from app.services.memory.models import MemoryBatchFailure, MemoryBatchReport, MemoryItem, MemoryWrite
+from app.services.memory.context_cache import UserContextCache
+from app.services.memory.write_queue import MemoryWriteQueue
+from app.services.memory.backend import create_memory
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+def approx_tokens(text: str) -> int:
+    # same ~4 chars/token estimate as langchain's count_tokens_approximately
+    return math.ceil(len(text) / 4)
+
 class MemoryController:
-    def __init__(self, memory: AsyncMemory):
+    def __init__(
+        self,
+        memory: AsyncMemory,
+        context_cache: Optional[UserContextCache] = None,
+        write_queue: Optional[MemoryWriteQueue] = None,
+    ):
         self.memory = memory
+        self.context_cache = context_cache
+        self.write_queue = write_queue
 
-    @network_retry()
-    async def get_memory(
-        self,
+    @staticmethod
+    def _filters(
         user_id: str,
-        *,
         types: Optional[List[str]] = None,
-    ) -> List[MemoryItem]:
+        tags: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """mem0 filters; `type` and `tags` are metadata keys stored on the vector payload."""
+        filters: Dict[str, Any] = {"user_id": user_id}
+        if types:
+            filters["type"] = types[0] if len(types) == 1 else {"in": types}
+        if tags:
+            filters["tags"] = {"in": tags}
+        return filters
 
-        try:
-            memories = await asyncio.wait_for(
-                self.memory.get_all(user_id=user_id),
-                timeout=30,
-            )
-        except Exception as e:
-            logger.error(f"Failed to fetch memory for {user_id}: {e}")
-            raise
+    @staticmethod
+    def _to_items(user_id: str, memories: Any) -> List[MemoryItem]:
+        if isinstance(memories, dict):
+            memories = memories.get("results", [])
 
         items: List[MemoryItem] = []
 
@@ -45,45 +62,73 @@ class MemoryController:
             m.setdefault("id", f"mem_{len(items)}")
             m.setdefault("user_id", user_id)
             m.setdefault("memory", m.pop("content", ""))
-            m.setdefault("metadata", {})
-
-            item = MemoryItem(**m)
+            m["metadata"] = m.get("metadata") or {}
 
-            if types and item.metadata.get("type") not in types:
-                continue
-
-            items.append(item)
+            items.append(MemoryItem(**m))
 
         return items
 
     @network_retry()
-    async def add_memory(
+    async def get_memory(
         self,
         user_id: str,
-        data: Union[str, dict],
         *,
-        type: str,
+        types: Optional[List[str]] = None,
         tags: Optional[List[str]] = None,
-    ) -> MemoryItem:
-
-        metadata = {"type": type}
-        if tags:
-            metadata["tags"] = tags
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include_pending: bool = True,
+    ) -> List[MemoryItem]:
+        """
+        The user's memories, filtered by metadata `types`/`tags` in the vector
+        store. With a `query`, returns the most relevant ones first (top-k
+        search); otherwise in store order. `limit` defaults to MEMORY_FETCH_LIMIT.
+        Writes still in the write-behind queue come first (`include_pending`).
+        """
+        limit = limit or settings.MEMORY_FETCH_LIMIT
+        filters = self._filters(user_id, types, tags)
 
         try:
-            result = await asyncio.wait_for(
-                self.memory.add(data, user_id=user_id, metadata=metadata),
-                timeout=30,
-            )
+            if query:
+                call = self.memory.search(query, top_k=offset + limit, filters=filters)
+            else:
+                call = self.memory.get_all(filters=filters, top_k=offset + limit)
+            memories = await asyncio.wait_for(call, timeout=30)
         except Exception as e:
-            logger.error(f"Failed to add memory for {user_id}: {e}")
+            logger.error(f"Failed to fetch memory for {user_id}: {e}")
             raise
 
+        items = self._to_items(user_id, memories)
+        if include_pending and self.write_queue is not None:
+            items = [w.as_item() for w in await self.write_queue.pending(user_id)] + items
+
+        items = [
+            item for item in items
+            # backends that ignore metadata filters still return only matches
+            if (not types or item.metadata.get("type") in types)
+            and (not tags or set(tags) & set(item.metadata.get("tags") or []))
+        ]
+        return items[offset:offset + limit]
+
+    async def _add(
+        self,
+        user_id: str,
+        data: Union[str, dict],
+        metadata: Dict[str, Any],
+        timeout: float,
+        infer: bool = True,
+    ) -> MemoryItem:
+        result = await asyncio.wait_for(
+            self.memory.add(data, user_id=user_id, metadata=metadata, infer=infer),
+            timeout=timeout,
+        )
+
         payload = None
         if isinstance(result, list) and result:
             payload = result[0]
         elif isinstance(result, dict):
-            payload = result.get("results", [result])[0]
+            payload = (result.get("results") or [result])[0]
 
         if isinstance(payload, dict):
             payload.setdefault("id", payload.get("memory_id", "unknown"))
@@ -99,8 +144,136 @@ class MemoryController:
             metadata=metadata,
         )
 
+    @staticmethod
+    def _metadata(type: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {"type": type}
+        if tags:
+            metadata["tags"] = tags
+        return metadata
+
+    @network_retry()
+    async def add_memory(
+        self,
+        user_id: str,
+        data: Union[str, dict],
+        *,
+        type: str,
+        tags: Optional[List[str]] = None,
+    ) -> MemoryItem:
+
+        try:
+            item = await self._add(user_id, data, self._metadata(type, tags), timeout=30)
+        except Exception as e:
+            logger.error(f"Failed to add memory for {user_id}: {e}")
+            raise
+        self._invalidate_context(user_id)
+        return item
+
+    async def add_memory_group(
+        self,
+        user_id: str,
+        texts: List[str],
+        *,
+        type: str,
+        tags: Optional[List[str]] = None,
+        infer: bool = True,
+    ) -> List[MemoryItem]:
+        """
+        Store several texts of one type with a single mem0 call: one
+        extraction pass over all of them (`infer`) and one upsert.
+        """
+        metadata = self._metadata(type, tags)
+        result = await asyncio.wait_for(
+            self.memory.add(
+                [{"role": "user", "content": text} for text in texts],
+                user_id=user_id,
+                metadata=metadata,
+                infer=infer,
+            ),
+            timeout=settings.MEMORY_BATCH_ITEM_TIMEOUT,
+        )
+        self._invalidate_context(user_id)
+        return self._to_items(user_id, result or [])
+
+    async def queue_memory(
+        self,
+        user_id: str,
+        data: str,
+        *,
+        type: str,
+        tags: Optional[List[str]] = None,
+    ) -> MemoryItem:
+        """
+        Save a memory off the reply path: queued for the write-behind flush
+        when one is configured (readable right away), else `add_memory`.
+        """
+        if self.write_queue is None:
+            return await self.add_memory(user_id, data, type=type, tags=tags)
+        write = await self.write_queue.enqueue(user_id, data, type=type, tags=tags)
+        self._invalidate_context(user_id)
+        return write.as_item()
+
+    async def _run_batch(
+        self,
+        keys: List[str],
+        call: Callable[[int], Awaitable[Any]],
+        concurrency: Optional[int] = None,
+    ) -> List[Tuple[str, Any, Optional[Exception]]]:
+        """Run `call(i)` for every key, `concurrency` at a time; never raises."""
+        semaphore = asyncio.Semaphore(concurrency or settings.MEMORY_BATCH_CONCURRENCY)
+
+        async def run(i: int):
+            async with semaphore:
+                try:
+                    return keys[i], await call(i), None
+                except Exception as e:
+                    return keys[i], None, e
+
+        return await asyncio.gather(*(run(i) for i in range(len(keys))))
+
+    async def add_memories(
+        self,
+        user_id: str,
+        writes: List[MemoryWrite],
+        *,
+        infer: bool = True,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> MemoryBatchReport:
+        """
+        Add many memories at once (imports), `concurrency` at a time with a
+        `timeout` per item (MEMORY_BATCH_CONCURRENCY / MEMORY_BATCH_ITEM_TIMEOUT). Failed items are
+        reported by their position in `writes` instead of failing the batch.
+        `infer=False` stores the text as-is, skipping mem0's LLM extraction.
+        """
+        results = await self._run_batch(
+            [str(i) for i in range(len(writes))],
+            lambda i: self._add(
+                user_id,
+                writes[i].data,
+                self._metadata(writes[i].type, writes[i].tags),
+                timeout=timeout or settings.MEMORY_BATCH_ITEM_TIMEOUT,
+                infer=infer,
+            ),
+            concurrency,
+        )
+        report = MemoryBatchReport()
+        for key, item, error in results:
+            if error is None:
+                report.added.append(item)
+            else:
+                report.failed.append(MemoryBatchFailure(item=key, error=repr(error)))
+        if report.added:
+            self._invalidate_context(user_id)
+        if report.failed:
+            logger.warning(f"{len(report.failed)}/{len(writes)} memory writes failed for {user_id}")
+        return report
+
     @network_retry()
     async def delete_memory(self, user_id: str, memory_id: str) -> None:
+        if self.write_queue is not None and await self.write_queue.discard(user_id, ids=[memory_id]):
+            self._invalidate_context(user_id)
+            return
         try:
             await asyncio.wait_for(
                 self.memory.delete(memory_id),
@@ -109,6 +282,36 @@ class MemoryController:
         except Exception as e:
             logger.error(f"Failed deleting memory {memory_id} for {user_id}: {e}")
             raise
+        self._invalidate_context(user_id)
+
+    async def delete_memories(
+        self,
+        user_id: str,
+        memory_ids: List[str],
+        *,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> MemoryBatchReport:
+        """Delete many memories concurrently; failures are reported per memory id."""
+        results = await self._run_batch(
+            list(memory_ids),
+            lambda i: asyncio.wait_for(
+                self.memory.delete(memory_ids[i]),
+                timeout=timeout or settings.MEMORY_BATCH_ITEM_TIMEOUT,
+            ),
+            concurrency,
+        )
+        report = MemoryBatchReport()
+        for key, _, error in results:
+            if error is None:
+                report.deleted.append(key)
+            else:
+                report.failed.append(MemoryBatchFailure(item=key, error=repr(error)))
+        if report.deleted:
+            self._invalidate_context(user_id)
+        if report.failed:
+            logger.warning(f"{len(report.failed)}/{len(memory_ids)} memory deletes failed for {user_id}")
+        return report
 
     @network_retry()
     async def clear_memory(
@@ -118,11 +321,18 @@ class MemoryController:
         types: Optional[List[str]] = None,
     ) -> None:
 
+        if self.write_queue is not None:
+            # waits for a flush already storing this user's writes, so none land after the clear
+            await self.write_queue.discard(user_id, types=types)
         try:
             if types:
-                items = await self.get_memory(user_id, types=types)
-                for item in items:
-                    await self.memory.delete(item.id)
+                # reads are capped at MEMORY_FETCH_LIMIT; repeat until nothing matches
+                while items := await self.get_memory(user_id, types=types, include_pending=False):
+                    report = await self.delete_memories(user_id, [item.id for item in items])
+                    if report.failed:
+                        raise RuntimeError(
+                            f"{len(report.failed)} memories could not be deleted: {report.failed[0].error}"
+                        )
             else:
                 await asyncio.wait_for(
                     self.memory.delete_all(user_id=user_id),
@@ -131,55 +341,59 @@ class MemoryController:
         except Exception as e:
             logger.error(f"Failed clearing memory for {user_id}: {e}")
             raise
+        finally:
+            # a partial clear still changed the user's memories
+            self._invalidate_context(user_id)
 
-    async def summarize_user_context(self, user_id: str) -> str:
-        items = await self.get_memory(user_id)
+    async def summarize_user_context(self, user_id: str, query: Optional[str] = None) -> str:
+        """
+        The user's memories as prompt text: the MEMORY_CONTEXT_TOP_K most
+        relevant to `query` (or first stored when None), cut off at
+        MEMORY_CONTEXT_TOKEN_BUDGET tokens.
+        """
+        items = await self.get_memory(user_id, query=query, limit=settings.MEMORY_CONTEXT_TOP_K)
 
         if not items:
             return "User has no previous history/context."
 
-        return "User Context:\n" + "\n".join(
-            f"- {item.content} (type={item.metadata.get('type','general')})"
+        lines: List[str] = []
+        budget = settings.MEMORY_CONTEXT_TOKEN_BUDGET
+        for item in items:
+            line = f"- {item.content} (type={item.metadata.get('type','general')})"
+            budget -= approx_tokens(line)
+            if budget < 0:
+                break
+            lines.append(line)
 
-            for item in items
-        )
+        return "User Context:\n" + "\n".join(lines)
+
+    def _invalidate_context(self, user_id: str) -> None:
+        if self.context_cache is not None:
+            self.context_cache.invalidate(user_id)
+
+    def prefetch_user_context(self, user_id: str, query: Optional[str] = None) -> None:
+        """Start loading the user's context in the background (no-op without a cache)."""
+        if self.context_cache is not None:
+            self.context_cache.prefetch(user_id, query)
+
+    async def user_context(
+        self, user_id: str, timeout: Optional[float] = None, query: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        `summarize_user_context` through the (user, query) cache. With a `timeout`,
+        returns None when the context isn't ready in time instead of waiting.
+        """
+        if self.context_cache is None:
+            return await self.summarize_user_context(user_id, query)
+        context = await self.context_cache.get(user_id, timeout=timeout, query=query)
+        if context is None and timeout is None:
+            # the cached load failed; let the caller see the actual error
+            return await self.summarize_user_context(user_id, query)
+        return context
 
     @classmethod
     async def create(cls):
-        try:
-            if settings.MEM0_API_KEY:
-                memory = AsyncMemory(api_key=settings.MEM0_API_KEY)
-            else:
-                memory = await AsyncMemory.from_config({
-                    "vector_store": {
-                        "provider": "qdrant",
-                        "config": {
-                            "collection_name": "memories",
-                            "host": "qdrant",
-                            "port": 6333,
-                            "embedding_model_dims": 1024,
-                        }
-                    },
-                    "llm": {
-                        "provider": "groq",
-                        "config": {
-                            "model": "moonshotai/kimi-k2-instruct",
-                            "temperature": 0.2,
-                        }
-                    },
-                    "embedder": {
-                        "provider": "ollama",
-                        "config": {
-                            "model": "mxbai-embed-large",
-                            "ollama_base_url": "http://ollama:11434"
-                        }
-                    }
-                })
-        except Exception as e:
-            logger.warning(f"Mem0 init failed, fallback: {e}")
-            memory = AsyncMemory()
-
-        return cls(memory)
+        return cls(await create_memory(settings))
 
 
 if __name__ == "__main__":
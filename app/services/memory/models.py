@@ -9,3 +9,17 @@ class MemoryItem(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
+
+class MemoryWrite(BaseModel):
+    data: Union[str, dict]
+    type: str = "memory"
+    tags: Optional[List[str]] = None
+
+class MemoryBatchFailure(BaseModel):
+    item: str  # memory id (delete) or position in the request (add)
+    error: str
+
+class MemoryBatchReport(BaseModel):
+    added: List[MemoryItem] = Field(default_factory=list)
+    deleted: List[str] = Field(default_factory=list)
+    failed: List[MemoryBatchFailure] = Field(default_factory=list)
@@ -0,0 +1,420 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.services.memory.models import MemoryItem
+
+logger = logging.getLogger(__name__)
+
+# (user_id, type, tags, normalized text): writes with the same key are one fact
+WriteKey = Tuple[str, str, Tuple[str, ...], str]
+GroupKey = Tuple[str, str, Tuple[str, ...]]
+
+@dataclass
+class PendingWrite:
+    user_id: str
+    data: str
+    type: str
+    tags: Optional[List[str]] = None
+    attempts: int = 0
+    id: str = field(default_factory=lambda: f"pending-{uuid.uuid4().hex[:12]}")
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    claimed_until: float = 0.0
+
+    @property
+    def key(self) -> WriteKey:
+        return self.user_id, self.type, tuple(sorted(self.tags or [])), " ".join(self.data.lower().split())
+
+    def as_item(self) -> MemoryItem:
+        metadata: Dict[str, Any] = {"type": self.type, "pending": True}
+        if self.tags:
+            metadata["tags"] = self.tags
+        return MemoryItem(
+            id=self.id, user_id=self.user_id, memory=self.data, created_at=self.created_at, metadata=metadata
+        )
+
+
+class MemoryWriteStore:
+    """
+    Where pending writes wait for their flush. The base class keeps them in
+    this process: readers on other workers don't see them and a crash loses
+    them, so it only fits a single worker (and tests).
+
+    A write is claimed by one flush at a time for `visibility_timeout`
+    seconds; `discard()` only removes unclaimed writes and reports how many
+    are still being flushed.
+    """
+
+    backend = "memory"
+    # durable stores keep writes across restarts, so `stop()` needn't drain them
+    durable = False
+
+    def __init__(self):
+        self._writes: Dict[WriteKey, PendingWrite] = {}
+
+    async def add(self, write: PendingWrite) -> Tuple[PendingWrite, bool]:
+        """Store `write`; returns the stored write and False when the same fact was already pending."""
+        existing = self._writes.get(write.key)
+        if existing is not None:
+            return existing, False
+        self._writes[write.key] = write
+        return write, True
+
+    async def pending(self, user_id: str) -> List[PendingWrite]:
+        return [w for w in self._writes.values() if w.user_id == user_id]
+
+    async def claim(self, limit: int, visibility_timeout: float) -> List[PendingWrite]:
+        now = time.monotonic()
+        claimed = []
+        for w in self._writes.values():
+            if len(claimed) >= limit:
+                break
+            if w.claimed_until > now:
+                continue
+            w.attempts += 1
+            w.claimed_until = now + visibility_timeout
+            claimed.append(w)
+        return claimed
+
+    async def remove(self, writes: List[PendingWrite]) -> None:
+        for w in writes:
+            if self._writes.get(w.key) is w:
+                del self._writes[w.key]
+
+    async def release(self, writes: List[PendingWrite]) -> None:
+        for w in writes:
+            w.claimed_until = 0.0
+
+    async def discard(
+        self, user_id: str, *, ids: Optional[List[str]] = None, types: Optional[List[str]] = None
+    ) -> Tuple[int, int]:
+        """Remove the user's unclaimed matching writes; returns (removed, still being flushed)."""
+        now = time.monotonic()
+        matching = [
+            w for w in self._writes.values()
+            if w.user_id == user_id and (ids is None or w.id in ids) and (types is None or w.type in types)
+        ]
+        removed = [w for w in matching if w.claimed_until <= now]
+        await self.remove(removed)
+        return len(removed), len(matching) - len(removed)
+
+    async def count(self) -> int:
+        return len(self._writes)
+
+
+class PostgresMemoryWriteStore(MemoryWriteStore):
+    """
+    `memory_write_queue` table shared by all workers and replicas: a write
+    saved on one worker is readable and flushed from any of them, and
+    survives a restart. Claims use `FOR UPDATE SKIP LOCKED` and hide the row
+    for the visibility timeout, so a crashed worker's batch is retried.
+    """
+
+    backend = "postgres"
+    durable = True
+    _COLUMNS = "id, user_id, data, type, tags, attempts, created_at"
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]]):
+        super().__init__()
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS memory_write_queue (
+                        id TEXT PRIMARY KEY,
+                        dedup_key TEXT NOT NULL UNIQUE,
+                        user_id TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        tags TEXT[] NOT NULL DEFAULT '{}',
+                        data TEXT NOT NULL,
+                        attempts INT NOT NULL DEFAULT 0,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        claimed_until TIMESTAMPTZ
+                    )
+                    """
+                )
+                await conn.execute(
+                    "CREATE INDEX IF NOT EXISTS memory_write_queue_user_idx ON memory_write_queue (user_id)"
+                )
+            self._ready = True
+        return pool
+
+    @staticmethod
+    def _row(row: Tuple[Any, ...]) -> PendingWrite:
+        return PendingWrite(
+            id=row[0], user_id=row[1], data=row[2], type=row[3], tags=list(row[4]) or None,
+            attempts=row[5], created_at=row[6].isoformat(),
+        )
+
+    @staticmethod
+    def _filters(
+        user_id: str, ids: Optional[List[str]], types: Optional[List[str]]
+    ) -> Tuple[str, List[Any]]:
+        where, params = ["user_id = %s"], [user_id]
+        if ids is not None:
+            where.append("id = ANY(%s)")
+            params.append(ids)
+        if types is not None:
+            where.append("type = ANY(%s)")
+            params.append(types)
+        return " AND ".join(where), params
+
+    async def add(self, write: PendingWrite) -> Tuple[PendingWrite, bool]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            # the no-op update makes RETURNING yield the existing row on conflict; xmax = 0 marks a new row
+            cur = await conn.execute(
+                f"""
+                INSERT INTO memory_write_queue (id, dedup_key, user_id, type, tags, data)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (dedup_key) DO UPDATE SET dedup_key = EXCLUDED.dedup_key
+                RETURNING {self._COLUMNS}, xmax = 0
+                """,
+                (write.id, json.dumps(write.key), write.user_id, write.type, write.tags or [], write.data),
+            )
+            row = await cur.fetchone()
+        return self._row(row), row[7]
+
+    async def pending(self, user_id: str) -> List[PendingWrite]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"SELECT {self._COLUMNS} FROM memory_write_queue WHERE user_id = %s ORDER BY created_at",
+                (user_id,),
+            )
+            rows = await cur.fetchall()
+        return [self._row(row) for row in rows]
+
+    async def claim(self, limit: int, visibility_timeout: float) -> List[PendingWrite]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"""
+                UPDATE memory_write_queue
+                SET attempts = attempts + 1, claimed_until = now() + make_interval(secs => %s)
+                WHERE id IN (
+                    SELECT id FROM memory_write_queue
+                    WHERE claimed_until IS NULL OR claimed_until <= now()
+                    ORDER BY created_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {self._COLUMNS}
+                """,
+                (visibility_timeout, limit),
+            )
+            rows = await cur.fetchall()
+        return [self._row(row) for row in rows]
+
+    async def remove(self, writes: List[PendingWrite]) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute("DELETE FROM memory_write_queue WHERE id = ANY(%s)", ([w.id for w in writes],))
+
+    async def release(self, writes: List[PendingWrite]) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "UPDATE memory_write_queue SET claimed_until = NULL WHERE id = ANY(%s)", ([w.id for w in writes],)
+            )
+
+    async def discard(
+        self, user_id: str, *, ids: Optional[List[str]] = None, types: Optional[List[str]] = None
+    ) -> Tuple[int, int]:
+        where, params = self._filters(user_id, ids, types)
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f"DELETE FROM memory_write_queue WHERE {where} "
+                "AND (claimed_until IS NULL OR claimed_until <= now())",
+                params,
+            )
+            removed = cur.rowcount
+            cur = await conn.execute(
+                f"SELECT count(*) FROM memory_write_queue WHERE {where} AND claimed_until > now()", params
+            )
+            (claimed,) = await cur.fetchone()
+        return removed, claimed
+
+    async def count(self) -> int:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute("SELECT count(*) FROM memory_write_queue")
+            (count,) = await cur.fetchone()
+        return count
+
+
+class MemoryWriteQueue:
+    """
+    Write-behind buffer for memories saved during a conversation.
+
+    `enqueue()` returns at once; a background task flushes the buffer every
+    `interval` seconds (sooner once `batch_size` writes are waiting). Each
+    flush groups the writes by (user, type, tags) and stores every group
+    with one `flush(user_id, texts, type, tags)` call, so mem0 runs one
+    extraction pass and one upsert per group instead of per fact. Saving
+    the same fact again before it is flushed is coalesced into the first
+    write. Until a write is stored, `pending()` serves it to readers.
+
+    Writes wait in `store`: in this process by default (single worker
+    only), or in Postgres so every worker reads and flushes the same
+    writes. A group that keeps failing is dropped after `max_attempts`
+    flushes, and `stop()` flushes what a non-durable store still holds.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[str, List[str], str, Optional[List[str]]], Awaitable[Any]],
+        store: Optional[MemoryWriteStore] = None,
+        batch_size: int = 50,
+        interval: float = 2.0,
+        max_attempts: int = 3,
+        visibility_timeout: float = 120.0,
+        poll_interval: float = 0.2,
+    ):
+        self.flush = flush
+        self.store = store or MemoryWriteStore()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._unflushed = 0
+        # user_id -> flush groups running in this process
+        self._flushing: Dict[str, Set[asyncio.Task]] = {}
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flush_calls = 0
+        self.dropped = 0
+
+    async def enqueue(
+        self, user_id: str, data: str, *, type: str, tags: Optional[List[str]] = None
+    ) -> PendingWrite:
+        write, created = await self.store.add(PendingWrite(user_id=user_id, data=data, type=type, tags=tags))
+        if not created:
+            self.coalesced += 1
+            return write
+        self.enqueued += 1
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            self._wake.set()
+        return write
+
+    async def pending(self, user_id: str) -> List[PendingWrite]:
+        return await self.store.pending(user_id)
+
+    async def discard(
+        self, user_id: str, *, ids: Optional[List[str]] = None, types: Optional[List[str]] = None
+    ) -> int:
+        """
+        Drop a user's pending writes (all, or those with the given ids/types)
+        before they are stored. Writes a flush has already taken are waited
+        for, so once this returns nothing for the user is left to land in
+        the memory store afterwards.
+        """
+        dropped = 0
+        while True:
+            removed, in_flight = await self.store.discard(user_id, ids=ids, types=types)
+            dropped += removed
+            if not in_flight:
+                return dropped
+            flushing = self._flushing.get(user_id)
+            if flushing:
+                await asyncio.wait(set(flushing))
+            else:
+                # taken by another worker: it stores or releases them, or its claim expires
+                await asyncio.sleep(self.poll_interval)
+
+    async def _flush_group(self, group: GroupKey, writes: List[PendingWrite]) -> None:
+        user_id, type, tags = group
+        task = asyncio.current_task()
+        self._flushing.setdefault(user_id, set()).add(task)
+        try:
+            await self._store_group(group, writes)
+        finally:
+            flushing = self._flushing[user_id]
+            flushing.discard(task)
+            if not flushing:
+                del self._flushing[user_id]
+
+    async def _store_group(self, group: GroupKey, writes: List[PendingWrite]) -> None:
+        user_id, type, tags = group
+        try:
+            await self.flush(user_id, [w.data for w in writes], type, list(tags) or None)
+            self.flush_calls += 1
+        except asyncio.CancelledError:
+            # shutting down mid-flush: let the drain (or another worker) take them again
+            await self.store.release(writes)
+            raise
+        except Exception as e:
+            attempts = max(w.attempts for w in writes)
+            if attempts < self.max_attempts:
+                logger.warning(f"Memory write-behind flush failed for {user_id}, will retry: {e}")
+                await self.store.release(writes)
+                return
+            self.dropped += len(writes)
+            logger.error(f"Dropping {len(writes)} memory writes for {user_id} after {attempts} attempts: {e}")
+        else:
+            self.flushed += len(writes)
+        await self.store.remove(writes)
+
+    async def flush_once(self) -> int:
+        """Store up to `batch_size` pending writes; returns how many were taken."""
+        self._unflushed = 0
+        batch = await self.store.claim(self.batch_size, self.visibility_timeout)
+        groups: Dict[GroupKey, List[PendingWrite]] = {}
+        for w in batch:
+            groups.setdefault(w.key[:3], []).append(w)
+        await asyncio.gather(*(self._flush_group(group, writes) for group, writes in groups.items()))
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush_once()
+            except Exception as e:
+                logger.error(f"Memory write-behind flush failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="memory-write-behind")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if not self.store.durable:
+            # drain; a write that keeps failing is dropped after max_attempts, so this ends
+            while await self.flush_once():
+                pass
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.backend,
+            "pending": await self.store.count(),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flush_calls": self.flush_calls,
+            "dropped": self.dropped,
+            "running": self._task is not None,
+        }
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+class CacheBackend:
+    """
+    Shared second-level store so every worker can start from one warm copy.
+    Values are JSON strings; `stored_at` is a unix timestamp.
+    """
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        return None
+
+    async def set(self, key: str, value: str, stored_at: float) -> None:
+        return None
+
+
+class FileCacheBackend(CacheBackend):
+    """JSON file on local disk, shared by all workers on one host."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _read(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {self.path}: {e}")
+            return {}
+
+    def _write(self, key: str, value: str, stored_at: float) -> None:
+        data = self._read()
+        data[key] = {"value": value, "stored_at": stored_at}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.path)
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        entry = (await asyncio.to_thread(self._read)).get(key)
+        if not entry:
+            return None
+        return entry["value"], entry["stored_at"]
+
+    async def set(self, key: str, value: str, stored_at: float) -> None:
+        await asyncio.to_thread(self._write, key, value, stored_at)
+
+
+class PostgresCacheBackend(CacheBackend):
+    """Row per key in `shopify_cache`, shared by all workers and replicas."""
+
+    def __init__(self, pool_factory: Callable[[], Awaitable[Any]]):
+        self.pool_factory = pool_factory
+        self._ready = False
+
+    async def _pool(self):
+        pool = await self.pool_factory()
+        if not self._ready:
+            async with pool.connection() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS shopify_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        stored_at DOUBLE PRECISION NOT NULL
+                    )
+                    """
+                )
+            self._ready = True
+        return pool
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT value, stored_at FROM shopify_cache WHERE key = %s", (key,)
+            )
+            row = await cur.fetchone()
+        return (row[0], row[1]) if row else None
+
+    async def set(self, key: str, value: str, stored_at: float) -> None:
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO shopify_cache (key, value, stored_at) VALUES (%s, %s, %s)
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, stored_at = EXCLUDED.stored_at
+                """,
+                (key, value, stored_at),
+            )
+
+
+class StaleWhileRevalidateCache(Generic[T]):
+    """
+    In-memory TTL cache for a single pydantic value with stale-while-revalidate.
+
+    - fresh (age < ttl): served from memory.
+    - stale (ttl <= age < ttl + max_stale): served from memory while one
+      background task refreshes it.
+    - missing/expired: loaded from the shared backend, then from `loader`.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        model: type[T],
+        loader: Callable[[], Awaitable[T]],
+        ttl: float = 3600.0,
+        max_stale: float = 86400.0,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.key = key
+        self.model = model
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.backend = backend or CacheBackend()
+
+        self._value: Optional[T] = None
+        self._stored_at: float = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _age(self) -> float:
+        return time.time() - self._stored_at
+
+    def _usable(self) -> bool:
+        return self._value is not None and self._age() < self.ttl + self.max_stale
+
+    async def get(self) -> T:
+        if self._value is not None and self._age() < self.ttl:
+            return self._value
+
+        if self._usable():
+            self._schedule_refresh()
+            return self._value
+
+        async with self._lock:
+            if self._usable():
+                return self._value
+
+            await self._load_from_backend()
+            if self._value is not None and self._age() < self.ttl:
+                return self._value
+            if self._usable():
+                self._schedule_refresh()
+                return self._value
+
+            return await self._refresh()
+
+    async def _load_from_backend(self) -> None:
+        try:
+            entry = await self.backend.get(self.key)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed for {self.key}: {e}")
+            return
+        if entry is None:
+            return
+        value, stored_at = entry
+        if stored_at > self._stored_at:
+            self._value = self.model.model_validate_json(value)
+            self._stored_at = stored_at
+
+    async def _refresh(self) -> T:
+        value = await self.loader()
+        self._value = value
+        self._stored_at = time.time()
+        try:
+            await self.backend.set(self.key, value.model_dump_json(), self._stored_at)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed for {self.key}: {e}")
+        logger.info(f"Refreshed cache entry {self.key}")
+        return value
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+
+        async def refresh():
+            try:
+                async with self._lock:
+                    # another worker may have refreshed the shared copy already
+                    await self._load_from_backend()
+                    if self._age() >= self.ttl:
+                        await self._refresh()
+            except Exception as e:
+                logger.error(f"Background refresh of {self.key} failed, serving stale value: {e}")
+
+        self._refresh_task = asyncio.create_task(refresh())
+
+    def invalidate(self) -> None:
+        """Drop the in-memory copy; the next `get()` reloads it."""
+        self._value = None
+        self._stored_at = 0.0
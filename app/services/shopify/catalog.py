@@ -0,0 +1,465 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.services.shopify.client import ShopifyClient
+from app.services.shopify.models import ProductResponse
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PAGE_QUERY = """
+query CatalogPage($first: Int!, $variants: Int!, $after: String, $query: String) {
+  products(first: $first, after: $after, query: $query, sortKey: UPDATED_AT) {
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      id
+      title
+      description
+      handle
+      status
+      onlineStoreUrl
+      updatedAt
+      featuredImage {
+        url
+      }
+      priceRangeV2 {
+        minVariantPrice {
+          amount
+          currencyCode
+        }
+      }
+      variants(first: $variants) {
+        nodes {
+          id
+          title
+          price
+        }
+      }
+    }
+  }
+}
+"""
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Filler words of customer questions (English and Indonesian). They occur in
+# most product texts, so "do you have ..." would otherwise match something
+# for every query and the remote search fallback would never run.
+STOPWORDS = frozenset("""
+    a an and any are at be can could do does for from get have has how i in is it
+    looking me my need of on or please show some that the there this to want we
+    what which with you your
+    ada adakah aku apa apakah atau bisa boleh cari dan dari di dong gak ga ingin
+    ini itu ka kak kakak ke min mau mencari nya punya saya tolong untuk ya yang
+""".split())
+
+def tokenize(text: Optional[str]) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        # light plural folding so "hoodies" matches "hoodie"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """In-process Okapi BM25 inverted index over product text fields."""
+
+    TITLE_BOOST = 2
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    @classmethod
+    def document_tokens(cls, product: ProductResponse) -> List[str]:
+        tokens = tokenize(product.title) * cls.TITLE_BOOST
+        tokens += tokenize(product.description)
+        for variant in product.variants:
+            tokens += tokenize(variant.get("title"))
+        return tokens
+
+    def add(self, doc_id: str, tokens: List[str]) -> None:
+        self.remove(doc_id)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings[term][doc_id] = tf
+        self._doc_terms[doc_id] = list(counts)
+        self._doc_len[doc_id] = len(tokens)
+        self._total_len += len(tokens)
+
+    def remove(self, doc_id: str) -> None:
+        length = self._doc_len.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_len -= length
+        for term in self._doc_terms.pop(doc_id, []):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return []
+
+        avg_len = self._total_len / n_docs
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:limit]
+
+
+class CatalogStore:
+    """SQLite mirror of active products, shared by all workers on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS products (
+                    id TEXT PRIMARY KEY,
+                    updated_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_lease (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(self, products: Iterable[Tuple[ProductResponse, str]]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO products (id, updated_at, data) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data
+                """,
+                [(p.id, updated_at, p.model_dump_json()) for p, updated_at in products],
+            )
+
+    def delete(self, product_ids: Iterable[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM products WHERE id = ?", [(i,) for i in product_ids])
+
+    def all_ids(self) -> Set[str]:
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT id FROM products")}
+
+    def load_all(self) -> List[ProductResponse]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM products").fetchall()
+        return [ProductResponse.model_validate_json(row[0]) for row in rows]
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def acquire_lease(self, owner: str, ttl: float, name: str = "catalog") -> bool:
+        """Take or renew the named lease unless another owner holds an unexpired one."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                INSERT INTO sync_lease (name, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE sync_lease.owner = excluded.owner OR sync_lease.expires_at < ?
+                """,
+                (name, owner, now + ttl, now),
+            )
+            return cur.rowcount == 1
+
+    def release_lease(self, owner: str, name: str = "catalog") -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sync_lease WHERE name = ? AND owner = ?", (name, owner))
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+
+class ProductCatalog:
+    """
+    Local mirror of the Shopify catalog with a BM25 index for `search_products`.
+
+    `sync()` pages through the Admin API products connection with cursors and
+    stores active products in SQLite. After the first full sync, only products
+    with `updated_at` newer than the last seen value are fetched. Workers share
+    the SQLite file; a worker whose index is behind the shared sync cursor
+    reloads from it before pulling further changes.
+
+    Only the worker holding the store's sync lease talks to Shopify; the
+    others `refresh()` from the file every `refresh_interval` seconds and
+    take over once the lease expires. Pages are sized to stay under the
+    Admin API's 1000 point query cost (halved if Shopify still rejects one),
+    and the loop waits for the cost bucket to refill instead of getting
+    THROTTLED.
+    """
+
+    PAGE_SIZE = 50
+    VARIANTS_PER_PRODUCT = 20
+
+    def __init__(
+        self,
+        client: ShopifyClient,
+        path: str,
+        sync_interval: float = 900.0,
+        full_sync_interval: float = 86400.0,
+        refresh_interval: float = 30.0,
+    ):
+        self.client = client
+        self.store = CatalogStore(path)
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.refresh_interval = refresh_interval
+        # a sync that outlives the lease lets another worker start one
+        self.lease_ttl = 2 * sync_interval + 60
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.page_size = self.PAGE_SIZE
+
+        self.index = BM25Index()
+        self._products: Dict[str, ProductResponse] = {}
+        self._loaded = False
+        self._indexed_until: Optional[str] = None
+        self._indexed_version: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._sync_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_sync_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and len(self.index) > 0
+
+    def _index_product(self, product: ProductResponse) -> None:
+        self._products[product.id] = product
+        self.index.add(product.id, BM25Index.document_tokens(product))
+
+    def _drop_product(self, product_id: str) -> None:
+        self._products.pop(product_id, None)
+        self.index.remove(product_id)
+
+    def _shared_version(self) -> Tuple[Optional[str], Optional[str]]:
+        # a full sync can delete products without moving the updated_at cursor
+        return self.store.get_state("updated_at"), self.store.get_state("full_synced_at")
+
+    async def load(self) -> None:
+        """Build the in-memory index from the local store (e.g. synced by another worker)."""
+        version = await asyncio.to_thread(self._shared_version)
+        products = await asyncio.to_thread(self.store.load_all)
+        self.index = BM25Index()
+        self._products = {}
+        for product in products:
+            self._index_product(product)
+        self._indexed_version = version
+        self._indexed_until = version[0]
+        self._loaded = True
+        logger.info(f"Loaded {len(products)} products into the catalog index")
+
+    @staticmethod
+    def _to_product(node: Dict[str, Any]) -> ProductResponse:
+        price_info = (node.get("priceRangeV2") or {}).get("minVariantPrice") or {}
+        currency = price_info.get("currencyCode", "")
+        return ProductResponse(
+            id=node.get("id"),
+            title=node.get("title"),
+            description=node.get("description"),
+            price_amount=float(price_info.get("amount", 0)),
+            price_currency=currency,
+            image_url=(node.get("featuredImage") or {}).get("url"),
+            product_url=node.get("onlineStoreUrl"),
+            variants=[
+                {
+                    "id": v.get("id"),
+                    "title": v.get("title"),
+                    "price": float(v.get("price") or 0),
+                    "currency": currency,
+                }
+                for v in (node.get("variants") or {}).get("nodes", [])
+            ],
+        )
+
+    @staticmethod
+    def _cost_delay(data: Dict[str, Any]) -> float:
+        """Seconds until the cost bucket holds enough points for another page like this one."""
+        cost = (data.get("extensions") or {}).get("cost") or {}
+        status = cost.get("throttleStatus") or {}
+        restore_rate = status.get("restoreRate") or 0
+        if not restore_rate:
+            return 0.0
+        missing = (cost.get("requestedQueryCost") or 0) - (status.get("currentlyAvailable") or 0)
+        return max(missing, 0) / restore_rate
+
+    async def _fetch_page(self, cursor: Optional[str], search: Optional[str]) -> Dict[str, Any]:
+        while True:
+            data = await self.client.admin_graphql(
+                CATALOG_PAGE_QUERY,
+                {"first": self.page_size, "variants": self.VARIANTS_PER_PRODUCT, "after": cursor, "query": search},
+            )
+            codes = {(e.get("extensions") or {}).get("code") for e in data.get("errors") or []}
+            if "MAX_COST_EXCEEDED" in codes and self.page_size > 1:
+                self.page_size = max(self.page_size // 2, 1)
+                logger.warning(f"Catalog page too expensive, retrying with {self.page_size} products per page")
+                continue
+            if "THROTTLED" in codes:
+                await asyncio.sleep(max(self._cost_delay(data), 1.0))
+                continue
+            if "errors" in data:
+                raise RuntimeError(f"Shopify catalog sync error: {data['errors']}")
+            delay = self._cost_delay(data)
+            if delay:
+                await asyncio.sleep(delay)
+            return data
+
+    async def refresh(self) -> bool:
+        """Reload the index if another worker changed the shared store. Returns True if reloaded."""
+        async with self._sync_lock:
+            if self._loaded and await asyncio.to_thread(self._shared_version) == self._indexed_version:
+                return False
+            await self.load()
+            return True
+
+    async def sync(self, full: bool = False) -> int:
+        """Pull new/changed products from Shopify. Returns the number of products touched."""
+        async with self._sync_lock:
+            if not self._loaded or await asyncio.to_thread(self._shared_version) != self._indexed_version:
+                await self.load()
+
+            since = None if full else self._indexed_until
+            search = f"updated_at:>='{since}'" if since else None
+            cursor = None
+            touched = 0
+            newest = since
+            seen: Set[str] = set()
+
+            while True:
+                data = await self._fetch_page(cursor, search)
+                connection = data.get("data", {}).get("products", {})
+                active, inactive = [], []
+                for node in connection.get("nodes", []):
+                    seen.add(node.get("id"))
+                    updated_at = node.get("updatedAt") or ""
+                    newest = max(newest or "", updated_at)
+                    # onlineStoreUrl is null unless published to the online store,
+                    # like the Storefront search fallback; drafts and other channels
+                    # are dropped (not filtered in the query, so they get removed)
+                    if node.get("status") == "ACTIVE" and node.get("onlineStoreUrl"):
+                        active.append((self._to_product(node), updated_at))
+                    else:
+                        inactive.append(node.get("id"))
+
+                await asyncio.to_thread(self.store.upsert, active)
+                await asyncio.to_thread(self.store.delete, inactive)
+                for product, _ in active:
+                    self._index_product(product)
+                for product_id in inactive:
+                    self._drop_product(product_id)
+                touched += len(active) + len(inactive)
+
+                page_info = connection.get("pageInfo", {})
+                if not page_info.get("hasNextPage"):
+                    break
+                cursor = page_info.get("endCursor")
+
+            if full:
+                # products deleted in Shopify never show up in updated_at queries
+                removed = await asyncio.to_thread(self.store.all_ids) - seen
+                await asyncio.to_thread(self.store.delete, removed)
+                for product_id in removed:
+                    self._drop_product(product_id)
+                touched += len(removed)
+
+            if newest:
+                await asyncio.to_thread(self.store.set_state, "updated_at", newest)
+                self._indexed_until = newest
+            self.last_sync_at = time.time()
+            if full:
+                await asyncio.to_thread(self.store.set_state, "full_synced_at", str(self.last_sync_at))
+            self._indexed_version = await asyncio.to_thread(self._shared_version)
+            logger.info(f"Catalog sync done ({'full' if full else 'incremental'}): {touched} products updated")
+            return touched
+
+    def search(self, query: str, limit: int = 10) -> List[ProductResponse]:
+        return [self._products[doc_id] for doc_id, _ in self.index.search(query, limit)]
+
+    async def _full_sync_due(self) -> bool:
+        full_synced_at = await asyncio.to_thread(self.store.get_state, "full_synced_at")
+        return full_synced_at is None or time.time() - float(full_synced_at) >= self.full_sync_interval
+
+    async def _run(self) -> None:
+        while True:
+            interval = self.refresh_interval
+            try:
+                if await asyncio.to_thread(self.store.acquire_lease, self.owner, self.lease_ttl):
+                    interval = self.sync_interval
+                    await self.sync(full=await self._full_sync_due())
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.error(f"Catalog sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="shopify-catalog-sync")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self.store.release_lease, self.owner)
@@ -0,0 +1,133 @@
+import logging
+import httpx
+from typing import Any, Dict, Optional
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+API_VERSION = "2025-10"
+
+class ShopifyClient:
+    """
+    Pooled HTTP transport for the Shopify Storefront and Admin APIs.
+
+    One long-lived `httpx.AsyncClient` (HTTP/2, keep-alive) is shared by every
+    async call in the worker; a pooled `httpx.Client` backs the sync
+    compatibility methods. Both use explicit connect/read timeouts.
+    """
+
+    def __init__(
+        self,
+        store: Optional[str] = None,
+        storefront_token: Optional[str] = None,
+        admin_token: Optional[str] = None,
+    ):
+        store = store or settings.SHOPIFY_STORE
+        self.base_url = f"https://{store}.myshopify.com"
+        self.admin_graphql_url = f"{self.base_url}/admin/api/{API_VERSION}/graphql.json"
+        self.graphql_url = f"{self.base_url}/api/{API_VERSION}/graphql.json"
+        self.storefront_token = storefront_token or settings.SHOPIFY_STOREFRONT_ACCESS_TOKEN
+        self.admin_token = admin_token or settings.SHOPIFY_ADMIN_ACCESS_TOKEN
+
+        self.timeout = httpx.Timeout(
+            settings.SHOPIFY_HTTP_READ_TIMEOUT,
+            connect=settings.SHOPIFY_HTTP_CONNECT_TIMEOUT,
+        )
+        self.limits = httpx.Limits(
+            max_connections=settings.SHOPIFY_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SHOPIFY_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SHOPIFY_HTTP_KEEPALIVE_EXPIRY,
+        )
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+
+    def _storefront_headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "X-Shopify-Storefront-Access-Token": self.storefront_token or "",
+        }
+
+    def _admin_headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "X-Shopify-Access-Token": self.admin_token or "",
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=settings.SHOPIFY_HTTP2,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(
+                http2=settings.SHOPIFY_HTTP2,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._sync_client
+
+    @staticmethod
+    def _graphql_payload(query: str, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+        return payload
+
+    async def storefront_graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        resp = await self._get_client().post(
+            self.graphql_url,
+            json=self._graphql_payload(query, variables),
+            headers=self._storefront_headers(),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    async def admin_graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        resp = await self._get_client().post(
+            self.admin_graphql_url,
+            json=self._graphql_payload(query, variables),
+            headers=self._admin_headers(),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    async def admin_rest_get(self, path: str) -> Dict[str, Any]:
+        resp = await self._get_client().get(
+            f"{self.base_url}/admin/api/{API_VERSION}/{path.lstrip('/')}",
+            headers=self._admin_headers(),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def storefront_graphql_sync(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        resp = self._get_sync_client().post(
+            self.graphql_url,
+            json=self._graphql_payload(query, variables),
+            headers=self._storefront_headers(),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def admin_graphql_sync(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        resp = self._get_sync_client().post(
+            self.admin_graphql_url,
+            json=self._graphql_payload(query, variables),
+            headers=self._admin_headers(),
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -1,382 +1,426 @@
 import logging
-import requests
-from typing import List, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 from app.config.settings import get_settings
-from app.services.shopify.models import ProductResponse, OrderResponse, PolicyItem, ShopInfo
+from app.services.shopify.cache import CacheBackend, StaleWhileRevalidateCache
+from app.services.shopify.catalog import ProductCatalog
+from app.services.shopify.client import ShopifyClient
+from app.services.shopify.models import ProductResponse, OrderResponse, PolicyItem, ShopInfo, StoreSnapshot
 from app.utils.retry import network_retry
+from app.utils.singleflight import SingleFlight, normalize_key
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-class ShopifyController:
-    def __init__(self):
-        self.base_url = f"https://{settings.SHOPIFY_STORE}.myshopify.com"
-        self.admin_graphql_url = f"{self.base_url}/admin/api/2025-10/graphql.json"
-        self.graphql_url = f"{self.base_url}/api/2025-10/graphql.json"
-        self.storefront_token = settings.SHOPIFY_STOREFRONT_ACCESS_TOKEN
-        self.admin_token = settings.SHOPIFY_ADMIN_ACCESS_TOKEN
-
-    @network_retry()
-    def search_products(self, search_term: str) -> List[ProductResponse]:
-        try:
-            headers = {
-                "Content-Type": "application/json",
-                "X-Shopify-Storefront-Access-Token": self.storefront_token
-            }
-
-            gql_query = """
-            query SearchProducts($query: String!) {
-              search(first: 10, query: $query) {
-                edges {
-                  node {
-                    __typename
-                    ... on Product {
-                      id
-                      title
-                      description
-                      handle
-                      onlineStoreUrl
-                      images(first: 1) {
-                        edges {
-                          node {
-                            url
-                          }
-                        }
-                      }
-                      priceRange {
-                        minVariantPrice {
-                          amount
-                          currencyCode
-                        }
-                      }
-                      variants(first: 5) {
-                        nodes {
-                          id
-                          title
-                          priceV2 {
-                            amount
-                            currencyCode
-                          }
-                        }
-                      }
-                    }
-                  }
-                }
+PolicyType = Literal["privacy", "terms", "refund", "shipping"]
+
+SHOP_POLICY_TYPES: Dict[str, str] = {
+    "privacy": "PRIVACY_POLICY",
+    "terms": "TERMS_OF_SERVICE",
+    "refund": "REFUND_POLICY",
+    "shipping": "SHIPPING_POLICY",
+}
+
+SEARCH_PRODUCTS_QUERY = """
+query SearchProducts($query: String!) {
+  search(first: 10, query: $query) {
+    edges {
+      node {
+        __typename
+        ... on Product {
+          id
+          title
+          description
+          handle
+          onlineStoreUrl
+          images(first: 1) {
+            edges {
+              node {
+                url
               }
             }
-            """
-
-            variables = {"query": search_term}
-
-            resp = requests.post(
-                self.graphql_url,
-                json={"query": gql_query, "variables": variables},
-                headers=headers
-            )
-            # raise exception jika error HTTP
-            resp.raise_for_status()
-
-            data = resp.json()
-
-            # cek jika ada error dari graphQL
-            if "errors" in data:
-                logger.error(f"Shopify GraphQL error: {data['errors']}")
-                return []
-
-            # parse products
-            products: List[ProductResponse] = []
-
-            for edge in data.get("data", {}).get("search", {}).get("edges", []):
-                node = edge.get("node", {})
-                if node.get("__typename") != "Product":
-                    continue  # skip non-Product types
-
-                # ambil gambar pertama jika ada
-                image_url = None
-                images = node.get("images", {}).get("edges", [])
-                if images and len(images) > 0:
-                    image_url = images[0].get("node", {}).get("url")
-
-                # ambil harga utama dari priceRange
-                price_info = node.get("priceRange", {}).get("minVariantPrice", {})
-                price_amount = float(price_info.get("amount", 0))
-                price_currency = price_info.get("currencyCode", "")
-
-                variant_list = []
-                for v in node.get("variants", {}).get("nodes", []):
-                    price_v2 = v.get("priceV2", {})
-                    variant_list.append({
-                        "id": v.get("id"),
-                        "title": v.get("title"),
-                        "price": float(price_v2.get("amount", 0)),
-                        "currency": price_v2.get("currencyCode", "")
-                    })
-
-                product_resp = ProductResponse(
-                    id=node.get("id"),
-                    title=node.get("title"),
-                    description=node.get("description"),
-                    price_amount=price_amount,
-                    price_currency=price_currency,
-                    image_url=image_url,
-                    product_url=node.get("onlineStoreUrl"),
-                    variants=variant_list
-                )
-
-                products.append(product_resp)
-
-            return products
-
-        except Exception as e:
-            logger.exception("Error searching products in Shopify", exc_info=e)
-            raise
-  
-    @network_retry()
-    def order_lookup(self, order_id: str) -> Optional[List[OrderResponse]]:
-        try:
-            headers = {
-                "Content-Type": "application/json",
-                "X-Shopify-Access-Token": self.admin_token
+          }
+          priceRange {
+            minVariantPrice {
+              amount
+              currencyCode
             }
-
-            if not order_id:
-                raise ValueError("order_id must be provided.")
-
-            # GraphQL query
-            gql_query = """
-              query getOrder($query: String!) {
-                orders(first: 1, query: $query) {
-                  edges {
-                    node {
-                      id
-                      name
-                      email
-                      displayFulfillmentStatus
-                      displayFinancialStatus
-                      createdAt
-                      lineItems(first: 20) {
-                        edges {
-                          node {
-                            title
-                            quantity
-                            originalTotalSet {
-                              shopMoney {
-                                amount
-                                currencyCode
-                              }
-                            }
-                          }
-                        }
-                      }
-                      fulfillments(first: 5) {
-                        status
-                        trackingInfo(first: 5) {
-                          company
-                          number
-                          url
-                        }
-                      }
-                    }
-                  }
+          }
+          variants(first: 5) {
+            nodes {
+              id
+              title
+              priceV2 {
+                amount
+                currencyCode
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+ORDER_LOOKUP_QUERY = """
+query getOrder($query: String!) {
+  orders(first: 1, query: $query) {
+    edges {
+      node {
+        id
+        name
+        email
+        displayFulfillmentStatus
+        displayFinancialStatus
+        createdAt
+        lineItems(first: 20) {
+          edges {
+            node {
+              title
+              quantity
+              originalTotalSet {
+                shopMoney {
+                  amount
+                  currencyCode
                 }
               }
+            }
+          }
+        }
+        fulfillments(first: 5) {
+          status
+          trackingInfo(first: 5) {
+            company
+            number
+            url
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+STORE_SNAPSHOT_QUERY = """
+query {
+  shop {
+    name
+    email
+    myshopifyDomain
+    contactEmail
+    primaryDomain {
+      host
+    }
+    billingAddress {
+      address1
+      address2
+      city
+      province
+      country
+      zip
+      phone
+    }
+    shopPolicies {
+      type
+      title
+      body
+      url
+    }
+  }
+}
+"""
 
-            """
-
-            variables = {"query": f"name:{order_id}"}
-
-            resp = requests.post(
-                self.admin_graphql_url,
-                json={"query": gql_query, "variables": variables},
-                headers=headers
+class ShopifyController:
+    def __init__(
+        self,
+        client: Optional[ShopifyClient] = None,
+        cache_backend: Optional[CacheBackend] = None,
+        catalog: Optional[ProductCatalog] = None,
+    ):
+        self.client = client or ShopifyClient()
+        # local product mirror; search falls back to the Storefront API without it
+        self.catalog = catalog
+        # identical concurrent lookups share one upstream call
+        self._flights = SingleFlight("shopify")
+        # shop info + policies change rarely: one fetch, served from memory
+        self.store_cache = StaleWhileRevalidateCache(
+            key=f"store_snapshot:{self.client.base_url}",
+            model=StoreSnapshot,
+            loader=self.afetch_store_snapshot,
+            ttl=settings.SHOPIFY_CACHE_TTL,
+            max_stale=settings.SHOPIFY_CACHE_MAX_STALE,
+            backend=cache_backend,
+        )
+        self.base_url = self.client.base_url
+        self.admin_graphql_url = self.client.admin_graphql_url
+        self.graphql_url = self.client.graphql_url
+        self.storefront_token = self.client.storefront_token
+        self.admin_token = self.client.admin_token
+
+    # ------------------------------------------------------------------
+    # Response parsing (shared by the async API and the sync shims)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_products(data: Dict[str, Any]) -> List[ProductResponse]:
+        # cek jika ada error dari graphQL
+        if "errors" in data:
+            logger.error(f"Shopify GraphQL error: {data['errors']}")
+            return []
+
+        # parse products
+        products: List[ProductResponse] = []
+
+        for edge in data.get("data", {}).get("search", {}).get("edges", []):
+            node = edge.get("node", {})
+            if node.get("__typename") != "Product":
+                continue  # skip non-Product types
+
+            # ambil gambar pertama jika ada
+            image_url = None
+            images = node.get("images", {}).get("edges", [])
+            if images and len(images) > 0:
+                image_url = images[0].get("node", {}).get("url")
+
+            # ambil harga utama dari priceRange
+            price_info = node.get("priceRange", {}).get("minVariantPrice", {})
+            price_amount = float(price_info.get("amount", 0))
+            price_currency = price_info.get("currencyCode", "")
+
+            variant_list = []
+            for v in node.get("variants", {}).get("nodes", []):
+                price_v2 = v.get("priceV2", {})
+                variant_list.append({
+                    "id": v.get("id"),
+                    "title": v.get("title"),
+                    "price": float(price_v2.get("amount", 0)),
+                    "currency": price_v2.get("currencyCode", "")
+                })
+
+            product_resp = ProductResponse(
+                id=node.get("id"),
+                title=node.get("title"),
+                description=node.get("description"),
+                price_amount=price_amount,
+                price_currency=price_currency,
+                image_url=image_url,
+                product_url=node.get("onlineStoreUrl"),
+                variants=variant_list
             )
-            resp.raise_for_status()
-
-            data = resp.json()
-
-            # Cek jika errors
-            if "errors" in data:
-                logger.error(data["errors"])
-                raise Exception(data["errors"])
-
-            orders = data.get("data", {}).get("orders", {}).get("edges", [])
-
-            if not orders:
-                # Jika tidak ada order
-                logger.info(f"No orders found for order_id: {order_id}")
-                return "[]"
-
-            results = []
-
-            for edge in orders:
-                order_node = edge.get("node", {})
 
-                # Parse line items
-                line_items = []
-                for item_edge in order_node.get("lineItems", {}).get("edges", []):
-                    item = item_edge.get("node", {})
-                    money = item.get("originalTotalSet", {}).get("shopMoney", {})
-                    line_items.append({
-                        "title": item.get("title"),
-                        "quantity": item.get("quantity"),
-                        "amount": float(money.get("amount", 0)),
-                        "currency": money.get("currencyCode", "")
+            products.append(product_resp)
+
+        return products
+
+    @staticmethod
+    def _parse_orders(data: Dict[str, Any], order_id: str) -> List[OrderResponse]:
+        # Cek jika errors
+        if "errors" in data:
+            logger.error(data["errors"])
+            raise Exception(data["errors"])
+
+        orders = data.get("data", {}).get("orders", {}).get("edges", [])
+
+        if not orders:
+            # Jika tidak ada order
+            logger.info(f"No orders found for order_id: {order_id}")
+            return []
+
+        results = []
+
+        for edge in orders:
+            order_node = edge.get("node", {})
+
+            # Parse line items
+            line_items = []
+            for item_edge in order_node.get("lineItems", {}).get("edges", []):
+                item = item_edge.get("node", {})
+                money = item.get("originalTotalSet", {}).get("shopMoney", {})
+                line_items.append({
+                    "title": item.get("title"),
+                    "quantity": item.get("quantity"),
+                    "amount": float(money.get("amount", 0)),
+                    "currency": money.get("currencyCode", "")
+                })
+
+            # Parse fulfillments and tracking info
+            fulfillments = []
+            for f in order_node.get("fulfillments", []):
+                tracking_data = []
+                for t in f.get("trackingInfo", []):
+                    tracking_data.append({
+                        "company": t.get("company"),
+                        "number": t.get("number"),
+                        "url": t.get("url")
                     })
+                fulfillments.append({
+                    "status": f.get("status"),
+                    "tracking_info": tracking_data
+                })
+
+            total_price = sum(li["amount"] for li in line_items)
+
+            order_info = OrderResponse(
+                id=order_node.get("id"),
+                name=order_node.get("name"),
+                email=order_node.get("email"),
+                total_price=total_price,
+                currency=line_items[0]["currency"] if line_items else "",
+                line_items=line_items,
+                fulfillment_status=order_node.get("displayFulfillmentStatus"),
+                financial_status=order_node.get("displayFinancialStatus"),
+                fulfillments=fulfillments,
+                created_at=order_node.get("createdAt"),
+            )
 
-                # Parse fulfillments and tracking info
-                fulfillments = []
-                for f in order_node.get("fulfillments", []):
-                    tracking_data = []
-                    for t in f.get("trackingInfo", []):
-                        tracking_data.append({
-                            "company": t.get("company"),
-                            "number": t.get("number"),
-                            "url": t.get("url")
-                        })
-                    fulfillments.append({
-                        "status": f.get("status"),
-                        "tracking_info": tracking_data
-                    })
+            results.append(order_info)
+
+        return results
+
+    @staticmethod
+    def _parse_shop_info(data: Dict[str, Any]) -> Optional[ShopInfo]:
+        if "errors" in data:
+            logger.error(f"Shopify GraphQL error: {data['errors']}")
+            return None
+
+        shop_data = data.get("data", {}).get("shop", {})
+
+        if not shop_data:
+            logger.info("No shop information found")
+            return None
+
+        return ShopInfo(
+            name=shop_data.get("name"),
+            email=shop_data.get("email"),
+            myshopifyDomain=shop_data.get("myshopifyDomain"),
+            contactEmail=shop_data.get("contactEmail"),
+            primaryDomain=shop_data.get("primaryDomain", {}),
+            billingAddress=shop_data.get("billingAddress", {})
+        )
+
+    @classmethod
+    def _parse_store_snapshot(cls, data: Dict[str, Any]) -> StoreSnapshot:
+        shop_info = cls._parse_shop_info(data)
+        if shop_info is None:
+            raise ValueError("Shopify returned no shop data")
+
+        policies_by_type = {
+            (pol.get("type") or "").upper(): pol
+            for pol in data.get("data", {}).get("shop", {}).get("shopPolicies") or []
+        }
+        policies = {}
+        for policy_type, shopify_type in SHOP_POLICY_TYPES.items():
+            pol = policies_by_type.get(shopify_type, {})
+            policies[policy_type] = PolicyItem(
+                title=pol.get("title"),
+                body=pol.get("body"),
+                url=pol.get("url"),
+            )
 
-                total_price = sum(li["amount"] for li in line_items)
+        return StoreSnapshot(shop_info=shop_info, policies=policies)
 
-                order_info = OrderResponse(
-                    id=order_node.get("id"),
-                    name=order_node.get("name"),
-                    email=order_node.get("email"),
-                    total_price=total_price,
-                    currency=line_items[0]["currency"] if line_items else "",
-                    line_items=line_items,
-                    fulfillment_status=order_node.get("displayFulfillmentStatus"),
-                    financial_status=order_node.get("displayFinancialStatus"),
-                    fulfillments=fulfillments,
-                    created_at=order_node.get("createdAt"),
-                )
+    # ------------------------------------------------------------------
+    # Async API (shared pooled AsyncClient, safe to call from the event loop)
+    # ------------------------------------------------------------------
 
-                results.append(order_info)
+    def _search_catalog(self, search_term: str) -> List[ProductResponse]:
+        if self.catalog is None or not self.catalog.ready:
+            return []
+        products = self.catalog.search(search_term, limit=10)
+        if not products:
+            logger.info(f"No local catalog match for '{search_term}', falling back to Shopify search")
+        return products
 
+    async def asearch_products(self, search_term: str) -> List[ProductResponse]:
+        return self._search_catalog(search_term) or await self.asearch_products_remote(search_term)
 
-            return results
+    async def asearch_products_remote(self, search_term: str) -> List[ProductResponse]:
+        return await self._flights.do(
+            normalize_key("search_products", search_term),
+            lambda: self._asearch_products_remote(search_term),
+        )
 
+    @network_retry()
+    async def _asearch_products_remote(self, search_term: str) -> List[ProductResponse]:
+        try:
+            data = await self.client.storefront_graphql(SEARCH_PRODUCTS_QUERY, {"query": search_term})
+            return self._parse_products(data)
         except Exception as e:
-            logger.exception("Error looking up order in Shopify", exc_info=e)
+            logger.exception("Error searching products in Shopify", exc_info=e)
             raise
 
+    async def aorder_lookup(self, order_id: str) -> List[OrderResponse]:
+        if not order_id:
+            raise ValueError("order_id must be provided.")
+        return await self._flights.do(
+            normalize_key("order_lookup", order_id),
+            lambda: self._aorder_lookup(order_id),
+        )
+
     @network_retry()
-    def get_policies(self, policy_type: Literal["privacy", "terms", "refund", "shipping"]) -> Optional[PolicyItem]:
-        """
-        Mengambil satu policy dari Shopify Admin REST API (policies.json)
-        berdasarkan policy_type: ["privacy", "terms", "refund", "shipping"]
-        """
+    async def _aorder_lookup(self, order_id: str) -> List[OrderResponse]:
         try:
-            headers = {
-                "X-Shopify-Access-Token": self.admin_token,
-                "Content-Type": "application/json"
-            }
-
-            url = f"{self.base_url}/admin/api/2025-10/policies.json"
-            resp = requests.get(url, headers=headers)
-            resp.raise_for_status()
-
-            policies_list = resp.json().get("policies", [])
-
-            # Default kosong jika tidak ditemukan
-            result = {"title": None, "body": None, "url": None}
-
-            for pol in policies_list:
-                handle = pol.get("handle", "").lower()
-
-                # Lebih tepat: cek substring yg sesuai
-                if policy_type == "privacy" and "privacy" in handle:
-                    result = {
-                        "title": pol.get("title"),
-                        "body": pol.get("body"),
-                    }
-                    break
-                elif policy_type == "terms" and "terms" in handle:
-                    result = {
-                        "title": pol.get("title"),
-                        "body": pol.get("body"),
-                    }
-                    break
-                elif policy_type == "refund" and "refund" in handle:
-                    result = {
-                        "title": pol.get("title"),
-                        "body": pol.get("body"),
-                    }
-                    break
-                elif policy_type == "shipping" and "shipping" in handle:
-                    result = {
-                        "title": pol.get("title"),
-                        "body": pol.get("body"),
-                    }
-                    break
-
-            return PolicyItem(**result)
-
+            data = await self.client.admin_graphql(ORDER_LOOKUP_QUERY, {"query": f"name:{order_id}"})
+            return self._parse_orders(data, order_id)
         except Exception as e:
-            logger.exception("Error fetching Shopify policies via REST API", exc_info=e)
+            logger.exception("Error looking up order in Shopify", exc_info=e)
             raise
 
-    
     @network_retry()
-    def get_shop_info(self) -> Optional[ShopInfo]:
+    async def afetch_store_snapshot(self) -> StoreSnapshot:
+        """Fetch the shop record and all four policies in a single Admin API call (uncached)."""
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "X-Shopify-Access-Token": self.admin_token
-            }
+            data = await self.client.admin_graphql(STORE_SNAPSHOT_QUERY)
+            return self._parse_store_snapshot(data)
+        except Exception as e:
+            logger.exception("Error fetching Shopify store snapshot", exc_info=e)
+            raise
 
-            gql_query = """
-              query {
-                shop {
-                  name
-                  email
-                  myshopifyDomain
-                  contactEmail
-                  primaryDomain {
-                    host
-                  }
-                  billingAddress {
-                    address1
-                    address2
-                    city
-                    province
-                    country
-                    zip
-                    phone
-                  }
-                }
-              }
-            """
-            resp = requests.post(
-                self.admin_graphql_url,
-                json={"query": gql_query},
-                headers=headers
-            )
-            resp.raise_for_status()
+    async def aget_policies(self, policy_type: PolicyType) -> Optional[PolicyItem]:
+        """
+        Mengambil satu policy toko (dari cache) berdasarkan
+        policy_type: ["privacy", "terms", "refund", "shipping"]
+        """
+        snapshot = await self.store_cache.get()
+        return snapshot.policies.get(policy_type) or PolicyItem()
+
+    async def aget_shop_info(self) -> Optional[ShopInfo]:
+        snapshot = await self.store_cache.get()
+        return snapshot.shop_info
+
+    # ------------------------------------------------------------------
+    # Sync compatibility shims (scripts/tests); prefer the async API in the app
+    # ------------------------------------------------------------------
 
-            data = resp.json()
+    def search_products(self, search_term: str) -> List[ProductResponse]:
+        return self._search_catalog(search_term) or self.search_products_remote(search_term)
+
+    @network_retry()
+    def search_products_remote(self, search_term: str) -> List[ProductResponse]:
+        return self._parse_products(
+            self.client.storefront_graphql_sync(SEARCH_PRODUCTS_QUERY, {"query": search_term})
+        )
 
-            if "errors" in data:
-                logger.error(f"Shopify GraphQL error: {data['errors']}")
-                return None
+    @network_retry()
+    def order_lookup(self, order_id: str) -> List[OrderResponse]:
+        if not order_id:
+            raise ValueError("order_id must be provided.")
+        return self._parse_orders(
+            self.client.admin_graphql_sync(ORDER_LOOKUP_QUERY, {"query": f"name:{order_id}"}),
+            order_id,
+        )
 
-            shop_data = data.get("data", {}).get("shop", {})
+    @network_retry()
+    def fetch_store_snapshot(self) -> StoreSnapshot:
+        return self._parse_store_snapshot(self.client.admin_graphql_sync(STORE_SNAPSHOT_QUERY))
 
-            if not shop_data:
-                logger.info("No shop information found")
-                return None
+    def get_policies(self, policy_type: PolicyType) -> Optional[PolicyItem]:
+        return self.fetch_store_snapshot().policies.get(policy_type) or PolicyItem()
 
-            return ShopInfo(
-                name=shop_data.get("name"),
-                email=shop_data.get("email"),
-                myshopifyDomain=shop_data.get("myshopifyDomain"),
-                contactEmail=shop_data.get("contactEmail"),
-                primaryDomain=shop_data.get("primaryDomain", {}),
-                billingAddress=shop_data.get("billingAddress", {})
-            )
+    def get_shop_info(self) -> Optional[ShopInfo]:
+        return self.fetch_store_snapshot().shop_info
 
-        except Exception as e:
-            logger.exception("Error fetching Shopify shop info", exc_info=e)
-            raise
\ No newline at end of file
+    async def aclose(self) -> None:
+        if self.catalog is not None:
+            await self.catalog.stop()
+        await self.client.aclose()
@@ -75,3 +75,9 @@ class ShopInfo(BaseModel):
     myshopifyDomain: Optional[str]
     contactEmail: Optional[str]
     primaryDomain: Optional[ShopPrimaryDomain]
+
+
+class StoreSnapshot(BaseModel):
+    """Shop record plus all store policies, fetched together and cached."""
+    shop_info: Optional[ShopInfo] = None
+    policies: Dict[str, PolicyItem] = {}
@@ -52,6 +52,14 @@ def init_db():
                 );
             """)
 
+            # Shared version the API's semantic answer cache watches
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS kb_cache_version (
+                    id SMALLINT PRIMARY KEY,
+                    version BIGINT NOT NULL
+                );
+            """)
+
             # Seed Admin
             cur.execute("SELECT * FROM admin_users WHERE username = 'admin'")
             if not cur.fetchone():
@@ -124,6 +132,22 @@ def list_users():
 
 # --- KB CMS Functions ---
 
+def bump_kb_version():
+    """Tell API workers the knowledge base changed so cached answers are dropped."""
+    conn = get_db_connection()
+    if not conn: return
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO kb_cache_version (id, version) VALUES (1, 1)
+                ON CONFLICT (id) DO UPDATE SET version = kb_cache_version.version + 1
+            """)
+        conn.commit()
+    except Exception as e:
+        st.warning(f"Could not invalidate answer cache: {e}")
+    finally:
+        conn.close()
+
 def save_kb_doc(lightrag_id, filename, content, file_type):
     conn = get_db_connection()
     if not conn: return
@@ -324,6 +348,7 @@ elif page == "📚 Knowledge Base":
                         res = requests.post(f"{LIGHTRAG_URL}/documents/upload", files=files)
                         
                         if res.status_code == 200:
+                            bump_kb_version()
                             # 4. Save to CMS Table (if text extracted successfully)
                             # We use specific "pending_link" ID valid for filename matching later
                             if "Binary content" not in file_content:
@@ -359,6 +384,7 @@ elif page == "📚 Knowledge Base":
                     res = requests.post(f"{LIGHTRAG_URL}/documents/text", json=payload)
                     
                     if res.status_code == 200:
+                        bump_kb_version()
                         # We try to get the ID from response if available? Likely not.
                         # We will save to DB anyway with 'pending' ID or try to match by filename later.
                         save_kb_doc("pending_link_" + txt_filename, txt_filename, txt_input, "text/plain")
@@ -399,6 +425,7 @@ elif page == "📚 Knowledge Base":
                         del_res = requests.delete(f"{LIGHTRAG_URL}/documents/delete_document", json={"doc_ids": [st.session_state.edit_doc_id], "delete_file": True})
                         
                         if del_res.status_code == 200:
+                            bump_kb_version()
                             # 2. Ingest New
                             payload = {"text": new_content, "file_source": st.session_state.edit_filename}
                             res = requests.post(f"{LIGHTRAG_URL}/documents/text", json=payload)
@@ -476,6 +503,7 @@ elif page == "📚 Knowledge Base":
                                 
                             if st.button("🗑️ Delete", key=f"del_{doc_id}"):
                                 requests.delete(f"{LIGHTRAG_URL}/documents/delete_document", json={"doc_ids": [doc_id], "delete_file": True})
+                                bump_kb_version()
                                 # Also delete from DB
                                 if cms_doc:
                                     # We should delete from DB too
@@ -5,12 +5,16 @@ from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
+    retry_if_exception,
     retry_if_exception_type,
     before_sleep_log,
 )
 
 logger = logging.getLogger(__name__)
 
+def _is_server_error(e: BaseException) -> bool:
+    return isinstance(e, httpx.HTTPStatusError) and e.response.status_code >= 500
+
 def network_retry(
     attempts: int = 3,
     min_wait: int = 1,
@@ -25,7 +29,7 @@ def network_retry(
             httpx.RemoteProtocolError,
             asyncio.TimeoutError,
             ConnectionError,
-        )),
+        )) | retry_if_exception(_is_server_error),
         before_sleep=before_sleep_log(logger, logging.WARNING),
         reraise=True,
     )
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Prune the LangGraph checkpoint tables.
+
+    python -m scripts.checkpoint_retention --keep 2 --idle-days 90
+
+Keeps the newest N checkpoints of every thread, deletes threads idle for
+longer than --idle-days in batches, VACUUMs, and prints a JSON report.
+Safe to run while the API is serving traffic.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from app.agents.checkpoints import CheckpointPruner, CheckpointRetention
+from app.api.deps import get_pg_pool, get_thread_lock
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Checkpoint retention and vacuum")
+    parser.add_argument("--keep", type=int, default=settings.CHECKPOINT_GC_KEEP, help="checkpoints kept per thread")
+    parser.add_argument("--idle-days", type=float, default=settings.CHECKPOINT_RETENTION_IDLE_DAYS,
+                        help="delete threads idle longer than this (0 keeps all)")
+    parser.add_argument("--batch-size", type=int, default=settings.CHECKPOINT_RETENTION_BATCH_SIZE)
+    parser.add_argument("--lock-timeout", type=float, default=settings.CHECKPOINT_RETENTION_LOCK_TIMEOUT,
+                        help="seconds a batch waits for row/table locks before it is skipped")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM (ANALYZE) afterwards")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    pruner = CheckpointPruner(
+        pool_factory=get_pg_pool,
+        lock=get_thread_lock(),
+        keep=args.keep,
+        lock_timeout=args.lock_timeout,
+    )
+    retention = CheckpointRetention(
+        pool_factory=get_pg_pool,
+        pruner=pruner,
+        idle_days=args.idle_days or None,
+        batch_size=args.batch_size,
+        lock_timeout=args.lock_timeout,
+        vacuum=not args.no_vacuum,
+    )
+    try:
+        report = await retention.run_once()
+    finally:
+        await (await get_pg_pool()).close()
+    print(json.dumps(report.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
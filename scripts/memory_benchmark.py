@@ -0,0 +1,79 @@
+"""
+Time the user memory path against the configured MEMORY_BACKEND.
+
+    MEMORY_BACKEND=local QDRANT_PATH=/tmp/uv-qdrant python -m scripts.memory_benchmark --users 5 --memories 40
+
+Imports --memories facts per user (add_memories), then times filtered
+reads, relevance search and the prompt summary, and prints a JSON report.
+Writes go to the configured collection; point MEMORY_COLLECTION at a
+scratch one.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from app.config.settings import get_settings
+from app.services.memory.controller import MemoryController
+from app.services.memory.models import MemoryWrite
+
+settings = get_settings()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="User memory benchmark")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--memories", type=int, default=40, help="memories imported per user")
+    parser.add_argument("--rounds", type=int, default=10, help="reads timed per user")
+    parser.add_argument("--infer", action="store_true", help="run mem0's LLM extraction on import")
+    return parser.parse_args()
+
+async def timed(samples, call):
+    start = time.perf_counter()
+    result = await call
+    samples.append(time.perf_counter() - start)
+    return result
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 1),
+    }
+
+async def main():
+    args = parse_args()
+    controller = await MemoryController.create()
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    samples = {"import": [], "get_memory": [], "search": [], "summary": []}
+    failed = 0
+
+    for user_id in users:
+        writes = [
+            MemoryWrite(data=f"Pelanggan suka produk nomor {n} warna {'hitam' if n % 2 else 'putih'}",
+                        type="preference" if n % 3 else "memory")
+            for n in range(args.memories)
+        ]
+        report = await timed(samples["import"], controller.add_memories(user_id, writes, infer=args.infer))
+        failed += len(report.failed)
+
+    for _ in range(args.rounds):
+        for user_id in users:
+            await timed(samples["get_memory"], controller.get_memory(user_id, types=["preference"], limit=20))
+            await timed(samples["search"], controller.get_memory(user_id, query="warna hitam", limit=5))
+            await timed(samples["summary"], controller.summarize_user_context(user_id, "ada warna hitam?"))
+
+    for user_id in users:
+        await controller.clear_memory(user_id)
+
+    print(json.dumps({
+        "backend": settings.MEMORY_BACKEND,
+        "collection": settings.MEMORY_COLLECTION,
+        "failed_imports": failed,
+        **{name: summary(values) for name, values in samples.items()},
+    }, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
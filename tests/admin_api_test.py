@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from fastapi.testclient import TestClient
+from app.agents.checkpoints import RetentionReport
+from app.api import deps
+from app.api.main import app
+from app.channels.core.models import ChannelType, InternalMessage
+from app.channels.core.queue import MemoryInboundQueue
+from app.services.datastore.datastore import LightRAGClient
+from app.services.memory.models import MemoryBatchFailure, MemoryBatchReport, MemoryItem
+
+logging.basicConfig(level=logging.INFO)
+
+# no `with`: the lifespan (postgres, LLM probes, ...) doesn't run
+client = TestClient(app)
+
+
+class FakeGraphRegistry:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, tools=False):
+        self.invalidated.append(tools)
+        return 2
+
+    def stats(self):
+        return {"graphs": 2 - 2 * len(self.invalidated)}
+
+
+def test_admin_routes_require_the_api_key():
+    api_key = deps.settings.API_KEY
+    deps.settings.API_KEY = "admin-secret"
+    try:
+        assert client.get("/v1/admin/agent/graphs").status_code == 403
+    finally:
+        deps.settings.API_KEY = api_key
+
+
+def test_graphs_can_be_listed_and_invalidated():
+    registry = FakeGraphRegistry()
+    app.dependency_overrides[deps.get_graph_registry] = lambda: registry
+    try:
+        assert client.get("/v1/admin/agent/graphs").json() == {"graphs": 2}
+        response = client.post("/v1/admin/agent/graphs/invalidate", params={"reload_tools": True})
+        assert response.json() == {"success": True, "invalidated": 2}
+        assert registry.invalidated == [True]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_singleflight_metrics_are_served():
+    response = client.get("/v1/admin/metrics/singleflight")
+
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
+
+
+def test_lightrag_pool_metrics_are_served():
+    app.dependency_overrides[deps.get_lightrag_client] = lambda: LightRAGClient(base_url="http://lightrag")
+    try:
+        stats = client.get("/v1/admin/metrics/lightrag-pool").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert stats["requests_total"] == 0 and "pool_timeouts_total" in stats
+
+
+def test_answer_cache_can_be_inspected_and_invalidated():
+    class FakeAnswerCache:
+        invalidated = 0
+
+        def stats(self):
+            return {"entries": 3}
+
+        async def invalidate(self):
+            self.invalidated += 1
+
+    rag = LightRAGClient(base_url="http://lightrag", answer_cache=FakeAnswerCache())
+    app.dependency_overrides[deps.get_lightrag_client] = lambda: rag
+    try:
+        assert client.get("/v1/admin/metrics/semantic-cache").json() == {"enabled": True, "entries": 3}
+        assert client.post("/v1/admin/lightrag/cache/invalidate").json() == {"status": "invalidated"}
+    finally:
+        app.dependency_overrides.clear()
+
+    assert rag.answer_cache.invalidated == 1
+
+
+def test_inbound_queue_metrics_are_served():
+    queue = MemoryInboundQueue()
+    message = InternalMessage(user_id="628123", channel=ChannelType.WHATSAPP, text="halo")
+    asyncio.run(queue.enqueue(message))
+    app.dependency_overrides[deps.get_inbound_queue] = lambda: queue
+    try:
+        metrics = client.get("/v1/admin/metrics/inbound-queue").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert metrics["queue"]["backend"] == "memory" and metrics["queue"]["depth"] == 1
+    assert "workers" in metrics and "batches" in metrics["mailbox"]
+
+
+def test_checkpoint_retention_can_be_run_on_demand():
+    class FakeRetention:
+        async def run_once(self):
+            return RetentionReport(started_at="2026-01-01T00:00:00+00:00", pruned_threads=2, deleted_idle_threads=1)
+
+    app.dependency_overrides[deps.get_checkpoint_retention] = FakeRetention
+    try:
+        report = client.post("/v1/admin/checkpoints/retention").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert report["pruned_threads"] == 2 and report["deleted_idle_threads"] == 1
+    assert not report["skipped"]
+
+
+class FakeMemoryController:
+    def __init__(self):
+        self.calls = []
+
+    async def add_memories(self, user_id, writes, infer=True):
+        self.calls.append(("add", user_id, [w.data for w in writes], infer))
+        return MemoryBatchReport(
+            added=[MemoryItem(id="m1", user_id=user_id, memory=writes[0].data)],
+            failed=[MemoryBatchFailure(item="1", error="TimeoutError()")],
+        )
+
+    async def delete_memories(self, user_id, memory_ids):
+        self.calls.append(("delete", user_id, memory_ids))
+        return MemoryBatchReport(deleted=memory_ids)
+
+    async def clear_memory(self, user_id, types=None):
+        self.calls.append(("clear", user_id, types))
+
+
+def test_user_memories_can_be_imported_and_removed():
+    controller = FakeMemoryController()
+    app.dependency_overrides[deps.get_memory_controller] = lambda: controller
+    try:
+        imported = client.post("/v1/admin/memory/u1/import", json={
+            "memories": [{"data": "suka hoodie hitam"}, {"data": "ukuran L"}],
+            "infer": False,
+        }).json()
+        deleted = client.post("/v1/admin/memory/u1/delete", json={"memory_ids": ["m1", "m2"]}).json()
+        cleared = client.delete("/v1/admin/memory/u1", params={"types": ["preference"]}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [item["id"] for item in imported["added"]] == ["m1"] and imported["failed"][0]["item"] == "1"
+    assert deleted["deleted"] == ["m1", "m2"]
+    assert cleared == {"status": "cleared"}
+    assert controller.calls == [
+        ("add", "u1", ["suka hoodie hitam", "ukuran L"], False),
+        ("delete", "u1", ["m1", "m2"]),
+        ("clear", "u1", ["preference"]),
+    ]
+
+
+if __name__ == "__main__":
+    test_admin_routes_require_the_api_key()
+    test_graphs_can_be_listed_and_invalidated()
+    test_singleflight_metrics_are_served()
+    test_lightrag_pool_metrics_are_served()
+    test_answer_cache_can_be_inspected_and_invalidated()
+    test_inbound_queue_metrics_are_served()
+    test_checkpoint_retention_can_be_run_on_demand()
+    test_user_memories_can_be_imported_and_removed()
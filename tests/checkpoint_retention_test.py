@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from app.agents.checkpoints import CheckpointPruner, CheckpointRetention
+from app.channels.core.mailbox import ThreadLock
+
+logging.basicConfig(level=logging.INFO)
+
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+class FakeCheckpointDB:
+    """Checkpoint tables reduced to thread_id -> [checkpoint count, newest ts]."""
+
+    def __init__(self, threads):
+        self.threads = {thread: list(values) for thread, values in threads.items()}
+        self.job_lock = None
+        self.statements = []
+
+    async def __call__(self):
+        return self
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        yield FakeCheckpointConn(self)
+
+
+class FakeCheckpointConn:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    def _threads(self, params, keep=lambda count, ts: True):
+        selected = [t for t, (count, ts) in sorted(self.db.threads.items()) if keep(count, ts)]
+        if "after" in params:
+            selected = [t for t in selected if t > params["after"]][:params["limit"]]
+        if "threads" in params:
+            selected = [t for t in selected if t in params["threads"]]
+        return [(t,) for t in selected]
+
+    async def execute(self, sql, params=None):
+        self.db.statements.append(sql)
+        self.rows = []
+        if "pg_try_advisory_lock" in sql:
+            free = self.db.job_lock in (None, self)
+            if free:
+                self.db.job_lock = self
+            self.rows = [(free,)]
+        elif "pg_advisory_unlock" in sql:
+            self.db.job_lock = None
+        elif "pg_total_relation_size" in sql:
+            self.rows = [(table, 0) for table in params[0]]
+        elif "HAVING count(*)" in sql:
+            self.rows = self._threads(params, lambda count, ts: count > params["keep"])
+        elif "HAVING max(checkpoint ->> 'ts')" in sql:
+            self.rows = self._threads(params, lambda count, ts: ts < params["cutoff"])
+        elif "DELETE FROM checkpoints c USING" in sql:
+            thread = self.db.threads[params["thread"]]
+            deleted = max(thread[0] - params["keep"], 0)
+            thread[0] -= deleted
+            self.rows = [(deleted, deleted * 100)]
+        elif "DELETE FROM checkpoints t" in sql:
+            deleted = [t for t in params["threads"] if self.db.threads.pop(t, None)]
+            self.rows = [(len(deleted), len(deleted) * 100)]
+        elif "DELETE FROM" in sql:
+            self.rows = [(0, 0)]
+        return self
+
+    async def fetchone(self):
+        return self.rows[0]
+
+    async def fetchall(self):
+        return self.rows
+
+
+def make_retention(db, lock=None):
+    pruner = CheckpointPruner(pool_factory=db, lock=lock or ThreadLock(), keep=2)
+    return CheckpointRetention(pool_factory=db, pruner=pruner, idle_days=30, vacuum=False)
+
+
+def test_sweep_prunes_overgrown_and_deletes_idle_threads():
+    db = FakeCheckpointDB({"a": [5, days_ago(1)], "b": [2, days_ago(100)], "c": [1, days_ago(2)]})
+
+    report = asyncio.run(make_retention(db).run_once())
+
+    assert not report.skipped
+    assert report.pruned_threads == 1 and db.threads["a"][0] == 2
+    assert report.deleted_idle_threads == 1 and "b" not in db.threads
+    assert "c" in db.threads
+    assert db.job_lock is None
+
+
+def test_idle_batch_rechecks_threads_that_woke_up():
+    db = FakeCheckpointDB({"a": [1, days_ago(100)], "b": [1, days_ago(100)]})
+    retention = make_retention(db)
+    cutoff = days_ago(30)
+    # "b" got a new message after the batch was listed
+    db.threads["b"][1] = days_ago(0)
+
+    deleted, rows, _ = asyncio.run(retention._delete_idle_batch(["a", "b"], cutoff))
+
+    assert (deleted, rows) == (1, 1)
+    assert list(db.threads) == ["b"]
+
+
+def test_sweep_is_skipped_while_another_holds_the_job_lock():
+    db = FakeCheckpointDB({"a": [5, days_ago(100)]})
+    db.job_lock = object()
+
+    report = asyncio.run(make_retention(db).run_once())
+
+    assert report.skipped
+    assert db.threads["a"][0] == 5
+    assert not any("DELETE" in sql for sql in db.statements)
+
+
+def test_sweep_skips_threads_an_agent_is_running_on():
+    db = FakeCheckpointDB({"a": [5, days_ago(1)], "b": [5, days_ago(1)]})
+    lock = ThreadLock()
+
+    async def run():
+        async with lock.hold("a"):
+            return await asyncio.wait_for(make_retention(db, lock).run_once(), 1)
+
+    report = asyncio.run(run())
+
+    assert report.busy_threads == 1 and report.failed_batches == 0
+    assert report.pruned_threads == 1
+    assert db.threads["a"][0] == 5 and db.threads["b"][0] == 2
+
+
+if __name__ == "__main__":
+    test_sweep_prunes_overgrown_and_deletes_idle_threads()
+    test_idle_batch_rechecks_threads_that_woke_up()
+    test_sweep_is_skipped_while_another_holds_the_job_lock()
+    test_sweep_skips_threads_an_agent_is_running_on()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from app.agents.middleware.provider_failover_middleware import ProviderFailoverMiddleware
+from app.services.llms.circuit_breaker import CircuitBreaker
+
+logging.basicConfig(level=logging.INFO)
+
+
+def test_opens_on_error_rate():
+    breaker = CircuitBreaker("openai", window=10, min_calls=4, error_rate_threshold=0.5)
+
+    breaker.record_success(0.2)
+    breaker.record_success(0.2)
+    breaker.record_failure(1.0)
+    assert breaker.allow_request()
+
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_opens_on_p95_latency():
+    breaker = CircuitBreaker("groq", window=10, min_calls=5, p95_latency_threshold=5.0)
+
+    for _ in range(4):
+        breaker.record_success(0.5)
+    breaker.record_success(9.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_single_trial():
+    breaker = CircuitBreaker("googlegenai", min_calls=1, cooldown=0)
+    breaker.record_failure(1.0)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success(0.3)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class FakeLLMManager:
+    def __init__(self, providers):
+        self.breakers = {p: CircuitBreaker(p, min_calls=1, cooldown=0) for p in providers}
+
+    def failover_providers(self):
+        return list(self.breakers)
+
+    def get_breaker(self, provider):
+        return self.breakers[provider]
+
+    def get_provider_llm(self, provider, **kwargs):
+        return provider
+
+
+class FakeRequest:
+    def __init__(self, model=None):
+        self.model = model
+
+    def override(self, model):
+        return FakeRequest(model)
+
+
+def test_cancelled_trial_is_released():
+    manager = FakeLLMManager(["groq"])
+    breaker = manager.get_breaker("groq")
+    breaker.record_failure(1.0)
+    middleware = ProviderFailoverMiddleware(manager, timeout=5)
+
+    async def slow(request):
+        await asyncio.sleep(5)
+
+    async def run():
+        call = asyncio.create_task(middleware.awrap_model_call(FakeRequest(), slow))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_sync_call_times_out_and_fails_over():
+    manager = FakeLLMManager(["groq", "gemini"])
+    middleware = ProviderFailoverMiddleware(manager, timeout=0.05)
+
+    def handler(request):
+        if request.model == "groq":
+            time.sleep(1)
+        return f"answer from {request.model}"
+
+    assert middleware.wrap_model_call(FakeRequest(), handler) == "answer from gemini"
+    assert manager.get_breaker("groq").error_rate() == 1.0
+
+
+if __name__ == "__main__":
+    test_opens_on_error_rate()
+    test_opens_on_p95_latency()
+    test_half_open_allows_single_trial()
+    test_cancelled_trial_is_released()
+    test_sync_call_times_out_and_fails_over()
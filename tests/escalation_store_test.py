@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from app.services.escalations.controller import EscalationService
+from app.services.escalations.models import EscalationPriority, EscalationReason, EscalationRequest
+from app.services.escalations.store import EscalationStore
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_escalation(priority, minutes_ago, user_id="u1"):
+    return EscalationRequest(
+        user_id=user_id,
+        channel="web",
+        thread_id=user_id,
+        reason=EscalationReason.OTHER,
+        priority=priority,
+        summary=f"{priority.value} {minutes_ago}",
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago),
+    )
+
+
+def test_pending_queue_is_ordered_and_paged():
+    store = EscalationStore()
+    service = EscalationService(store=store)
+    escalations = [
+        make_escalation(EscalationPriority.LOW, 50),
+        make_escalation(EscalationPriority.URGENT, 1),
+        make_escalation(EscalationPriority.MEDIUM, 30),
+        make_escalation(EscalationPriority.URGENT, 10),
+        make_escalation(EscalationPriority.HIGH, 5),
+    ]
+
+    async def run():
+        for e in escalations:
+            await store.save(e)
+        await service.update_status(escalations[2].id, "resolved")
+        pages, cursor = [], None
+        while True:
+            page, cursor = await service.get_pending_escalations(limit=2, cursor=cursor)
+            pages.append([e.summary for e in page])
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(run())
+
+    # a full last page can't know it is the last, so one empty page follows
+    assert pages == [["urgent 10", "urgent 1"], ["high 5", "low 50"], []]
+
+
+def test_invalid_cursor_is_rejected():
+    service = EscalationService()
+    try:
+        asyncio.run(service.get_pending_escalations(cursor="not-a-cursor"))
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+def test_lookups_are_cached_write_through():
+    class CountingStore(EscalationStore):
+        gets = 0
+
+        async def get(self, escalation_id):
+            CountingStore.gets += 1
+            return await super().get(escalation_id)
+
+    service = EscalationService(store=CountingStore())
+
+    async def run():
+        created = await service.create_escalation("u2", "telegram", "u2", "complaint", "late order", "high")
+        await service.update_status(created.escalation_id, "assigned", assigned_to="agent-7")
+        escalation = await service.get_escalation(created.escalation_id)
+        mine = await service.get_user_escalations("u2")
+        return escalation, mine
+
+    escalation, mine = asyncio.run(run())
+
+    assert CountingStore.gets == 0
+    assert escalation.status == "assigned" and escalation.metadata["assigned_to"] == "agent-7"
+    assert [e.id for e in mine] == [escalation.id]
+    assert service.stats()["cache_hits"] == 1
+
+
+if __name__ == "__main__":
+    test_pending_queue_is_ordered_and_paged()
+    test_invalid_cursor_is_rejected()
+    test_lookups_are_cached_write_through()
+    print("escalation store tests passed")
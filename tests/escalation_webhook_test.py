@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import httpx
+from app.services.escalations.controller import EscalationService
+from app.services.escalations.outbox import EscalationOutbox, WebhookDispatcher
+from app.services.escalations.store import EscalationStore
+
+logging.basicConfig(level=logging.INFO)
+
+SLACK = "https://hooks.example.com/slack"
+TICKETS = "https://hooks.example.com/tickets"
+
+
+def make_service(outbox):
+    return EscalationService(store=EscalationStore(outbox=outbox), webhooks=[SLACK, TICKETS])
+
+
+def make_dispatcher(outbox, handler):
+    return WebhookDispatcher(outbox, client_factory=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_escalation_does_not_wait_for_webhooks():
+    outbox = EscalationOutbox()
+    service = make_service(outbox)
+
+    async def run():
+        result = await service.create_escalation("u1", "web", "u1", "complaint", "late order", "high")
+        return result, await outbox.stats()
+
+    result, stats = asyncio.run(run())
+
+    assert result.success
+    assert stats["pending"] == 2
+
+
+def test_dispatcher_delivers_to_every_webhook():
+    outbox = EscalationOutbox()
+    service = make_service(outbox)
+    received = []
+
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        received.append(str(request.url))
+        return httpx.Response(200)
+
+    dispatcher = make_dispatcher(outbox, handler)
+
+    async def run():
+        result = await service.create_escalation("u1", "web", "u1", "complaint", "late order", "high")
+        start = asyncio.get_running_loop().time()
+        await dispatcher.dispatch_once()
+        elapsed = asyncio.get_running_loop().time() - start
+        await dispatcher.stop()
+        return result, elapsed, await outbox.stats()
+
+    result, elapsed, stats = asyncio.run(run())
+
+    assert sorted(received) == [SLACK, TICKETS]
+    assert elapsed < 0.09  # both webhooks in parallel
+    assert stats["pending"] == 0 and stats["delivered"] == 2
+
+
+def test_failures_retry_then_dead_letter():
+    outbox = EscalationOutbox(max_attempts=3)
+    outbox._backoff = lambda attempts: 0
+    service = make_service(outbox)
+    calls = {SLACK: 0, TICKETS: 0}
+
+    def handler(request):
+        url = str(request.url)
+        calls[url] += 1
+        if url == TICKETS:
+            return httpx.Response(400, text="bad payload")
+        return httpx.Response(503) if calls[url] < 3 else httpx.Response(200)
+
+    dispatcher = make_dispatcher(outbox, handler)
+
+    async def run():
+        await service.create_escalation("u1", "web", "u1", "complaint", "late order", "high")
+        for _ in range(4):
+            await dispatcher.dispatch_once()
+        await dispatcher.stop()
+        return await outbox.stats()
+
+    stats = asyncio.run(run())
+
+    assert calls == {SLACK: 3, TICKETS: 1}  # 400 is not retried
+    assert stats["delivered"] == 1 and stats["dead"] == 1 and stats["pending"] == 0
+
+
+if __name__ == "__main__":
+    test_escalation_does_not_wait_for_webhooks()
+    test_dispatcher_delivers_to_every_webhook()
+    test_failures_retry_then_dead_letter()
+    print("escalation webhook tests passed")
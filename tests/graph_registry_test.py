@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from app.agents.config import AgentConfig
+from app.agents.graph_registry import GraphRegistry
+
+logging.basicConfig(level=logging.INFO)
+
+
+class FakeLLMManager:
+    def __init__(self, active_provider=None):
+        self.active_provider = active_provider
+
+    def get_llm(self, temperature=0.3, **kwargs):
+        return FakeListChatModel(responses=["ok"])
+
+
+def make_registry(active_provider=None):
+    manager = FakeLLMManager(active_provider)
+    tool_loads = []
+
+    def tools_factory():
+        tool_loads.append(1)
+        return []
+
+    return GraphRegistry(manager, tools_factory), manager, tool_loads
+
+
+def test_graph_is_built_once_and_reused():
+    registry, manager, tool_loads = make_registry("groq")
+
+    async def run():
+        graphs = await asyncio.gather(*(registry.get() for _ in range(5)))
+        return graphs, await registry.get(AgentConfig())
+
+    graphs, again = asyncio.run(run())
+
+    assert all(g is again for g in graphs)
+    assert len(registry.stats()["graphs"]) == 1 and len(tool_loads) == 1
+
+
+def test_graph_without_active_provider_is_reused():
+    registry, manager, _ = make_registry(active_provider=None)
+
+    async def run():
+        return await registry.get(), await registry.get()
+
+    first, second = asyncio.run(run())
+
+    assert first is second
+    assert registry.stats()["graphs"] == [{"config": registry.config_key(AgentConfig()), "provider": "unknown"}]
+
+
+def test_provider_and_config_get_their_own_graph():
+    registry, manager, _ = make_registry("groq")
+    other = AgentConfig(agent_name="other_agent")
+
+    async def run():
+        groq = await registry.get()
+        manager.active_provider = "gemini"
+        gemini = await registry.get()
+        custom = await registry.get(other)
+        return groq, gemini, custom
+
+    groq, gemini, custom = asyncio.run(run())
+
+    assert groq is not gemini and custom is not gemini
+    assert len(registry.stats()["graphs"]) == 3
+
+
+def test_invalidate_drops_graphs_and_reloads_tools():
+    registry, manager, tool_loads = make_registry("groq")
+    other = AgentConfig(agent_name="other_agent")
+
+    async def run():
+        await registry.get()
+        await registry.get(other)
+        dropped_one = registry.invalidate(other)
+        dropped_all = registry.invalidate(tools=True)
+        await registry.get()
+        return dropped_one, dropped_all
+
+    dropped_one, dropped_all = asyncio.run(run())
+
+    assert (dropped_one, dropped_all) == (1, 1)
+    assert len(registry.stats()["graphs"]) == 1 and len(tool_loads) == 2
+
+
+if __name__ == "__main__":
+    test_graph_is_built_once_and_reused()
+    test_graph_without_active_provider_is_reused()
+    test_provider_and_config_get_their_own_graph()
+    test_invalidate_drops_graphs_and_reloads_tools()
+    print("graph registry tests passed")
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from app.channels.core.idempotency import IdempotencyBackend, IdempotencyStore
+from app.channels.telegram.adapter import TelegramAdapter
+from app.channels.whatsapp.adapter import WhatsAppAdapter
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SharedBackend(IdempotencyBackend):
+    """Stands in for the Postgres table shared by several workers."""
+
+    def __init__(self):
+        self.keys = set()
+
+    async def claim(self, key, ttl):
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    async def release(self, key):
+        self.keys.discard(key)
+
+
+def test_redelivery_is_skipped_on_same_and_other_worker():
+    shared = SharedBackend()
+    worker_a = IdempotencyStore(backend=shared)
+    worker_b = IdempotencyStore(backend=shared)
+
+    async def run():
+        return [
+            await worker_a.claim("telegram:1001"),
+            await worker_a.claim("telegram:1001"),
+            await worker_b.claim("telegram:1001"),
+            await worker_b.claim("telegram:1002"),
+        ]
+
+    assert asyncio.run(run()) == [True, False, False, True]
+    assert worker_b.stats()["duplicates"] == 1
+
+
+def test_concurrent_retries_on_one_worker():
+    store = IdempotencyStore()
+
+    async def run():
+        return await asyncio.gather(*(store.claim("whatsapp:wamid.1") for _ in range(5)))
+
+    assert sorted(asyncio.run(run())) == [False] * 4 + [True]
+
+
+def test_release_allows_retry_and_lru_is_bounded():
+    store = IdempotencyStore(max_entries=2)
+
+    async def run():
+        await store.claim("a")
+        await store.release("a")
+        again = await store.claim("a")
+        await store.claim("b")
+        await store.claim("c")
+        return again
+
+    assert asyncio.run(run()) is True
+    assert list(store._seen) == ["b", "c"]
+
+
+def test_backend_failure_still_processes_message():
+    class DownBackend(IdempotencyBackend):
+        async def claim(self, key, ttl):
+            raise ConnectionError("postgres down")
+
+    store = IdempotencyStore(backend=DownBackend())
+    assert asyncio.run(store.claim("telegram:7")) is True
+
+
+def test_adapters_extract_provider_message_ids():
+    telegram = TelegramAdapter().from_request({"update_id": 555, "message": {"from": {"id": 9}, "text": "hi"}})
+    whatsapp = WhatsAppAdapter().from_request({
+        "entry": [{"changes": [{"value": {"messages": [
+            {"id": "wamid.ABC", "from": "62812", "text": {"body": "halo"}}
+        ]}}]}]
+    })
+
+    assert telegram.message_id == "555"
+    assert whatsapp.message_id == "wamid.ABC"
+
+
+if __name__ == "__main__":
+    test_redelivery_is_skipped_on_same_and_other_worker()
+    test_concurrent_retries_on_one_worker()
+    test_release_allows_retry_and_lru_is_bounded()
+    test_backend_failure_still_processes_message()
+    test_adapters_extract_provider_message_ids()
+    print("idempotency tests passed")
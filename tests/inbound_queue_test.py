@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from app.channels.core.models import ChannelType, InternalMessage, InternalResponse
+from app.channels.core.outbound import OutboundDispatcher
+from app.channels.core.queue import InboundWorkerPool, MemoryInboundQueue
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_message(text, user_id="628123"):
+    return InternalMessage(user_id=user_id, channel=ChannelType.WHATSAPP, text=text)
+
+
+def test_workers_drain_queue_concurrently():
+    queue = MemoryInboundQueue()
+    handled = []
+
+    async def handler(message):
+        await asyncio.sleep(0.05)
+        handled.append(message.text)
+
+    pool = InboundWorkerPool(queue, handler, concurrency=4, poll_interval=0.01)
+
+    async def run():
+        for i in range(8):
+            await queue.enqueue(make_message(f"msg {i}", user_id=f"user-{i}"))
+        pool.start()
+        start = asyncio.get_running_loop().time()
+        while len(handled) < 8:
+            await asyncio.sleep(0.01)
+        elapsed = asyncio.get_running_loop().time() - start
+        await pool.stop()
+        return elapsed, await queue.stats()
+
+    elapsed, stats = asyncio.run(run())
+
+    assert sorted(handled) == [f"msg {i}" for i in range(8)]
+    assert elapsed < 0.3  # 4 workers, 8 jobs of 50ms each
+    assert stats["depth"] == 0 and stats["in_progress"] == 0
+    assert pool.stats()["processed"] == 8
+
+
+def test_claimed_job_is_not_handed_out_twice():
+    queue = MemoryInboundQueue(visibility_timeout=60)
+
+    async def run():
+        await queue.enqueue(make_message("halo"))
+        first = await queue.claim()
+        second = await queue.claim()
+        return first, second, await queue.stats()
+
+    first, second, stats = asyncio.run(run())
+
+    assert len(first) == 1 and second == []
+    assert stats["depth"] == 0 and stats["in_progress"] == 1
+
+
+def test_busy_thread_is_skipped_by_claim():
+    queue = MemoryInboundQueue()
+
+    async def run():
+        await queue.enqueue(make_message("first", user_id="a"))
+        await queue.enqueue(make_message("second", user_id="a"))
+        await queue.enqueue(make_message("other", user_id="b"))
+        claimed = await queue.claim(limit=3)
+        rest = await queue.claim_thread("a")
+        return claimed, rest
+
+    claimed, rest = asyncio.run(run())
+
+    assert [j.message.text for j in claimed] == ["first", "other"]
+    assert [j.message.text for j in rest] == ["second"]
+
+
+def test_failed_jobs_retry_then_dead_letter():
+    queue = MemoryInboundQueue(max_attempts=2)
+    queue._backoff = lambda attempts: 0
+    attempts = []
+
+    async def handler(message):
+        attempts.append(message.text)
+        raise RuntimeError("send failed")
+
+    pool = InboundWorkerPool(queue, handler, concurrency=1, poll_interval=0.01)
+
+    async def run():
+        await queue.enqueue(make_message("halo"))
+        pool.start()
+        while not queue.dead:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return await queue.stats()
+
+    stats = asyncio.run(run())
+
+    assert len(attempts) == 2
+    assert stats["dead"] == 1 and stats["depth"] == 0
+
+
+def test_failed_delivery_resumes_without_rerunning_the_agent():
+    queue = MemoryInboundQueue(max_attempts=3)
+    queue._backoff = lambda attempts: 0
+    runs, sent, failures = [], [], []
+
+    async def handler(message):
+        runs.append(message.text)
+        return InternalResponse(text="aaaa bbbb cccc dddd")
+
+    async def send(recipient, chunk):
+        if chunk == "cccc dddd" and not failures:
+            failures.append(chunk)
+            raise RuntimeError("provider down")
+        sent.append(chunk)
+        return {"ok": True}
+
+    async def run():
+        dispatcher = OutboundDispatcher("test-resume", send, chunk_size=10, rate=1000, per_recipient_rate=1000)
+
+        async def deliver(message, reply, skip_chunks):
+            return await dispatcher.submit(message.user_id, reply.text, skip=skip_chunks)
+
+        pool = InboundWorkerPool(queue, handler, concurrency=1, poll_interval=0.01, deliver=deliver)
+        await queue.enqueue(make_message("halo"))
+        pool.start()
+        while pool.stats()["processed"] < 1:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return pool.stats(), await queue.stats()
+
+    pool_stats, queue_stats = asyncio.run(run())
+
+    assert runs == ["halo"]
+    assert sent == ["aaaa bbbb", "cccc dddd"]
+    assert pool_stats["failed"] == 1 and queue_stats["depth"] == 0 and queue_stats["dead"] == 0
+
+
+if __name__ == "__main__":
+    test_workers_drain_queue_concurrently()
+    test_claimed_job_is_not_handed_out_twice()
+    test_failed_jobs_retry_then_dead_letter()
+    test_failed_delivery_resumes_without_rerunning_the_agent()
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import httpx
+from app.services.datastore.datastore import LightRAGClient
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_client(handler, **kwargs):
+    client = LightRAGClient(base_url="http://lightrag", **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), limits=client.limits)
+    return client
+
+
+def test_requests_share_one_pooled_client():
+    clients = set()
+
+    async def handler(request):
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"response": request.url.path})
+
+    client = make_client(handler, limits=httpx.Limits(max_connections=4, max_keepalive_connections=2))
+
+    async def run():
+        async def call():
+            clients.add(id(client._get_client()))
+            return await client._query("ukuran hoodie", "naive")
+
+        answers = await asyncio.gather(*(call() for _ in range(3)), client._request("GET", "/health"))
+        stats = client.pool_stats()
+        await client.aclose()
+        return answers, stats
+
+    answers, stats = asyncio.run(run())
+
+    assert answers[:3] == ["/query"] * 3
+    assert len(clients) == 1
+    # the three identical queries were coalesced into one request
+    assert stats["requests_total"] == 2
+    assert stats["peak_in_flight_requests"] == 2 and stats["in_flight_requests"] == 0
+    assert stats["max_connections"] == 4 and stats["max_keepalive_connections"] == 2
+    assert stats["open"]
+    assert not client.pool_stats()["open"]
+
+
+def test_pool_timeouts_are_counted():
+    def handler(request):
+        raise httpx.PoolTimeout("no free connection", request=request)
+
+    client = make_client(handler)
+
+    async def run():
+        try:
+            await client._request("GET", "/health")
+        except httpx.PoolTimeout:
+            pass
+        return client.pool_stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["pool_timeouts_total"] == 1 and stats["requests_total"] == 1
+
+
+if __name__ == "__main__":
+    test_requests_share_one_pooled_client()
+    test_pool_timeouts_are_counted()
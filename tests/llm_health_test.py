@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from app.services.llms.health import ProviderHealthMonitor
+
+logging.basicConfig(level=logging.INFO)
+
+
+def build_monitor(failing=()):
+    async def probe(provider: str) -> str:
+        if provider in failing:
+            raise ConnectionError(f"{provider} down")
+        return "OK"
+
+    return ProviderHealthMonitor(
+        providers=lambda: ["openai", "googlegenai", "groq"],
+        probe=probe,
+        ttl=60,
+    )
+
+
+def test_probe_all_caches_status():
+    monitor = build_monitor(failing={"openai"})
+
+    assert monitor.is_healthy("openai") is None
+
+    asyncio.run(monitor.probe_all())
+
+    assert monitor.is_healthy("openai") is False
+    assert monitor.is_healthy("googlegenai") is True
+    assert monitor.get_status("groq").detail == "active → OK"
+
+
+def test_expired_status_is_unknown():
+    monitor = build_monitor()
+    asyncio.run(monitor.probe_all())
+
+    monitor.ttl = -1
+    assert monitor.is_healthy("groq") is None
+
+
+if __name__ == "__main__":
+    test_probe_all_caches_status()
+    test_expired_status_is_unknown()
@@ -0,0 +1,123 @@
+import asyncio
+import fcntl
+import os
+import tempfile
+from types import SimpleNamespace
+from app.config.settings import Settings
+from app.services.memory.backend import (
+    MemoryBackendError, create_memory, mem0_config, memory_backend, qdrant_client, validate_memory,
+)
+
+
+def make_settings(**overrides):
+    return Settings(_env_file=None, **overrides)
+
+
+class FakeQdrant:
+    def __init__(self, size):
+        self.size = size
+        self.indexes = []
+
+    def get_collection(self, name):
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=self.size))))
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.indexes.append(field_name)
+
+
+def fake_memory(embed_dims, collection_dims):
+    return SimpleNamespace(
+        embedding_model=SimpleNamespace(embed=lambda text: [0.0] * embed_dims),
+        vector_store=SimpleNamespace(client=FakeQdrant(collection_dims)),
+    )
+
+
+def test_backend_defaults_follow_mem0_api_key():
+    assert memory_backend(make_settings()) == "qdrant"
+    assert memory_backend(make_settings(MEM0_API_KEY="m0-key")) == "hosted"
+    assert memory_backend(make_settings(MEM0_API_KEY="m0-key", MEMORY_BACKEND="local")) == "local"
+
+
+def test_server_config_comes_from_settings():
+    settings = make_settings(QDRANT_HOST="qdrant.internal", QDRANT_PORT=6334, GROQ_API_KEY="gsk", MEMORY_COLLECTION="mem_v2")
+    client = object()
+
+    config = mem0_config(settings, client)
+
+    store = config["vector_store"]["config"]
+    assert store["client"] is client and store["host"] == "qdrant.internal" and store["port"] == 6334
+    assert store["collection_name"] == "mem_v2" and store["embedding_model_dims"] == 1024
+    assert config["llm"] == {
+        "provider": "groq",
+        "config": {"model": "moonshotai/kimi-k2-instruct", "api_key": "gsk", "temperature": 0.2},
+    }
+    assert config["embedder"]["config"]["ollama_base_url"] == settings.OLLAMA_BASE_URL
+
+
+def test_local_config_uses_embedded_store_and_local_embedder():
+    settings = make_settings(
+        MEMORY_BACKEND="local",
+        QDRANT_PATH="/tmp/uv-qdrant",
+        MEMORY_EMBEDDER_PROVIDER="huggingface",
+        MEMORY_EMBEDDER_MODEL="sentence-transformers/all-MiniLM-L6-v2",
+        MEMORY_EMBEDDING_DIMS=384,
+    )
+
+    config = mem0_config(settings)
+
+    store = config["vector_store"]["config"]
+    assert store["path"] == "/tmp/uv-qdrant" and store["on_disk"] and "host" not in store
+    assert config["embedder"] == {
+        "provider": "huggingface",
+        "config": {"model": "sentence-transformers/all-MiniLM-L6-v2", "embedding_dims": 384},
+    }
+
+
+def test_dimension_mismatches_are_rejected():
+    settings = make_settings()
+
+    memory = fake_memory(1024, 1024)
+    assert validate_memory(memory, settings) == {"embedding_dims": 1024, "collection_dims": 1024}
+    assert memory.vector_store.client.indexes == ["type", "tags"]
+
+    for embed_dims, collection_dims in ((768, 1024), (1024, 1536)):
+        try:
+            validate_memory(fake_memory(embed_dims, collection_dims), settings)
+        except MemoryBackendError as e:
+            assert "MEMORY_EMBEDDING_DIMS=1024" in str(e)
+        else:
+            raise AssertionError("dimension mismatch was accepted")
+
+
+def test_misconfigured_backends_fail_loudly():
+    for settings in (make_settings(MEMORY_BACKEND="hosted"), make_settings(MEMORY_BACKEND="local")):
+        try:
+            asyncio.run(create_memory(settings))
+        except MemoryBackendError:
+            pass
+        else:
+            raise AssertionError("misconfigured backend was accepted")
+
+
+def test_local_store_held_by_another_worker_is_rejected():
+    path = tempfile.mkdtemp()
+    other_worker = open(os.path.join(path, ".worker.lock"), "w")
+    fcntl.flock(other_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    try:
+        qdrant_client(make_settings(MEMORY_BACKEND="local", QDRANT_PATH=path))
+    except MemoryBackendError as e:
+        assert "single worker" in str(e)
+    else:
+        raise AssertionError("second worker opened the embedded store")
+    finally:
+        other_worker.close()
+
+
+if __name__ == "__main__":
+    test_backend_defaults_follow_mem0_api_key()
+    test_server_config_comes_from_settings()
+    test_local_config_uses_embedded_store_and_local_embedder()
+    test_dimension_mismatches_are_rejected()
+    test_misconfigured_backends_fail_loudly()
+    test_local_store_held_by_another_worker_is_rejected()
+    print("memory backend tests passed")
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from app.services.memory.context_cache import UserContextCache
+from app.services.memory.controller import MemoryController
+from app.services.memory.models import MemoryWrite
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SlowMemory:
+    """Each call takes `delay` seconds; ids/texts containing "bad" fail, "hang" never finish."""
+
+    def __init__(self, delay=0.05, count=40):
+        self.delay = delay
+        self.items = {f"m{i}": {"id": f"m{i}", "memory": f"catatan {i}", "metadata": {"type": "chat"}} for i in range(count)}
+        self.in_flight = 0
+        self.peak = 0
+        self.infer = []
+
+    async def _call(self, key):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(3600 if "hang" in key else self.delay)
+            if "bad" in key:
+                raise ConnectionError(f"cannot reach vector store for {key}")
+        finally:
+            self.in_flight -= 1
+
+    async def add(self, data, user_id, metadata, infer=True):
+        await self._call(data)
+        self.infer.append(infer)
+        memory_id = f"new{len(self.items)}"
+        self.items[memory_id] = {"id": memory_id, "memory": data, "metadata": metadata}
+        return {"results": [{"id": memory_id, "memory": data}]}
+
+    async def delete(self, memory_id):
+        await self._call(memory_id)
+        self.items.pop(memory_id, None)
+
+    async def get_all(self, *, filters, top_k=20):
+        matches = [dict(m) for m in self.items.values() if m["metadata"].get("type") == filters.get("type")]
+        return {"results": matches[:top_k]}
+
+
+def test_delete_memories_runs_concurrently_and_reports_failures():
+    memory = SlowMemory()
+    controller = MemoryController(memory)
+    ids = [f"m{i}" for i in range(30)] + ["bad1", "hang1"]
+
+    report = asyncio.run(controller.delete_memories("u1", ids, concurrency=8, timeout=0.5))
+
+    assert sorted(report.deleted) == sorted(ids[:30])
+    assert {f.item for f in report.failed} == {"bad1", "hang1"}
+    assert memory.peak == 8
+    assert not any(f"m{i}" in memory.items for i in range(30))
+
+
+def test_add_memories_reports_failed_positions_and_invalidates_context():
+    controller = MemoryController(SlowMemory())
+    controller.context_cache = UserContextCache(lambda user_id, query: asyncio.sleep(0, "lama"))
+    writes = [MemoryWrite(data="suka kopi"), MemoryWrite(data="bad data"), MemoryWrite(data="tinggal di Bali", type="profile")]
+
+    async def run():
+        await controller.user_context("u1")
+        report = await controller.add_memories("u1", writes, infer=False, timeout=0.5)
+        return report, controller.context_cache.stats()["entries"]
+
+    report, cached = asyncio.run(run())
+
+    assert [item.content for item in report.added] == ["suka kopi", "tinggal di Bali"]
+    assert report.added[1].metadata == {"type": "profile"}
+    assert [f.item for f in report.failed] == ["1"]
+    assert controller.memory.infer == [False, False]
+    assert cached == 0
+
+
+def test_clear_memory_by_type_deletes_every_page():
+    memory = SlowMemory(delay=0, count=250)  # more than one MEMORY_FETCH_LIMIT page
+    controller = MemoryController(memory)
+
+    asyncio.run(controller.clear_memory("u1", types=["chat"]))
+
+    assert memory.items == {}
+
+
+if __name__ == "__main__":
+    test_delete_memories_runs_concurrently_and_reports_failures()
+    test_add_memories_reports_failed_positions_and_invalidates_context()
+    test_clear_memory_by_type_deletes_every_page()
+    print("memory batch tests passed")
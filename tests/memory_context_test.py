@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from langchain.agents.middleware import ModelRequest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from app.agents.middleware.user_context_middleware import UserContextMiddleware
+from app.services.memory.context_cache import UserContextCache
+from app.config.settings import get_settings
+from app.services.memory.controller import MemoryController, approx_tokens
+
+logging.basicConfig(level=logging.INFO)
+settings = get_settings()
+
+
+class FakeMemory:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.items = {"u1": [{"id": "m1", "memory": "suka kopi susu", "metadata": {"type": "preference"}}]}
+        self.get_all_calls = 0
+        self.last_filters = None
+
+    def _matching(self, filters):
+        def matches(item):
+            for key, wanted in filters.items():
+                if key == "user_id":
+                    continue
+                value = item["metadata"].get(key)
+                if isinstance(wanted, dict):
+                    values = value if isinstance(value, list) else [value]
+                    if not set(values) & set(wanted["in"]):
+                        return False
+                elif value != wanted:
+                    return False
+            return True
+        return [dict(item) for item in self.items.get(filters["user_id"], []) if matches(item)]
+
+    async def get_all(self, *, filters, top_k=20):
+        self.get_all_calls += 1
+        self.last_filters = filters
+        await asyncio.sleep(self.delay)
+        return {"results": self._matching(filters)[:top_k]}
+
+    async def search(self, query, *, top_k=20, filters=None):
+        words = set(query.lower().split())
+        ranked = sorted(self._matching(filters), key=lambda m: -len(words & set(m["memory"].lower().split())))
+        return {"results": ranked[:top_k]}
+
+    async def add(self, data, user_id, metadata, infer=True):
+        self.items.setdefault(user_id, []).append({"id": "m2", "memory": data, "metadata": metadata})
+        return {"results": [{"id": "m2", "memory": data}]}
+
+
+def make_controller(delay=0.0):
+    controller = MemoryController(FakeMemory(delay))
+    controller.context_cache = UserContextCache(controller.summarize_user_context, ttl=60)
+    return controller
+
+
+def test_concurrent_reads_share_one_load_and_are_cached():
+    controller = make_controller(delay=0.05)
+
+    async def run():
+        controller.prefetch_user_context("u1")
+        first = await asyncio.gather(*(controller.user_context("u1") for _ in range(5)))
+        return first, await controller.user_context("u1")
+
+    first, again = asyncio.run(run())
+
+    assert all("suka kopi susu" in c for c in first) and again == first[0]
+    assert controller.memory.get_all_calls == 1
+    assert controller.context_cache.stats()["hits"] == 1
+
+
+def test_slow_load_times_out_then_fills_the_cache():
+    controller = make_controller(delay=0.2)
+
+    async def run():
+        missed = await controller.user_context("u1", timeout=0.01)
+        await asyncio.sleep(0.3)
+        return missed, await controller.user_context("u1", timeout=0.01)
+
+    missed, later = asyncio.run(run())
+
+    assert missed is None
+    assert "suka kopi susu" in later
+    assert controller.context_cache.stats()["timeouts"] == 1
+
+
+def test_write_invalidates_cached_context():
+    controller = make_controller()
+
+    async def run():
+        await controller.user_context("u1")
+        await controller.add_memory("u1", "tinggal di Bali", type="memory")
+        return await controller.user_context("u1")
+
+    context = asyncio.run(run())
+
+    assert "tinggal di Bali" in context
+    assert controller.memory.get_all_calls == 2
+
+
+def test_context_is_cached_per_query():
+    controller = make_controller()
+    controller.memory.items["u1"].append({"id": "m2", "memory": "alamat di Denpasar Bali", "metadata": {}})
+    controller.memory.items["u1"].append({"id": "m3", "memory": "ukuran sepatu 42", "metadata": {}})
+
+    async def run():
+        bali = await controller.user_context("u1", query="kirim ke Bali")
+        shoes = await controller.user_context("u1", query="ada sepatu ukuran 42?")
+        again = await controller.user_context("u1", query="Kirim ke  bali")
+        return bali, shoes, again
+
+    bali, shoes, again = asyncio.run(run())
+
+    assert "alamat di Denpasar Bali" in bali.splitlines()[1]
+    assert "ukuran sepatu 42" in shoes.splitlines()[1]
+    assert again == bali
+    assert controller.context_cache.stats()["hits"] == 1
+
+
+def make_memories(controller, count):
+    controller.memory.items["u1"] = [
+        {
+            "id": f"m{i}",
+            "memory": f"catatan nomor {i} " + "isi " * 20,
+            "metadata": {"type": "preference" if i % 2 else "memory", "tags": ["vip"] if i % 3 == 0 else []},
+        }
+        for i in range(count)
+    ]
+
+
+def test_filters_are_pushed_down_and_paged():
+    controller = make_controller()
+    make_memories(controller, 30)
+
+    page = asyncio.run(controller.get_memory("u1", types=["preference"], limit=5, offset=5))
+    tagged = asyncio.run(controller.get_memory("u1", types=["preference", "memory"], tags=["vip"]))
+
+    assert [item.id for item in page] == ["m11", "m13", "m15", "m17", "m19"]
+    assert {item.id for item in tagged} == {f"m{i}" for i in range(0, 30, 3)}
+    assert controller.memory.last_filters == {
+        "user_id": "u1", "type": {"in": ["preference", "memory"]}, "tags": {"in": ["vip"]},
+    }
+
+
+def test_query_ranks_relevant_memory_first():
+    controller = make_controller()
+    controller.memory.items["u1"].append({"id": "m2", "memory": "alamat di Denpasar Bali", "metadata": {}})
+
+    items = asyncio.run(controller.get_memory("u1", query="kirim ke Bali", limit=1))
+
+    assert [item.id for item in items] == ["m2"]
+
+
+def test_summary_is_capped_by_token_budget():
+    controller = make_controller()
+    make_memories(controller, 200)
+
+    summary = asyncio.run(controller.summarize_user_context("u1"))
+
+    lines = summary.splitlines()[1:]
+    assert 0 < len(lines) <= settings.MEMORY_CONTEXT_TOP_K
+    assert sum(approx_tokens(line) for line in lines) <= settings.MEMORY_CONTEXT_TOKEN_BUDGET
+
+
+def test_middleware_injects_context_into_system_prompt():
+    controller = make_controller()
+    middleware = UserContextMiddleware(controller, wait_timeout=1.0)
+    seen = []
+
+    async def handler(request):
+        seen.append(request.system_message.text)
+        return "response"
+
+    async def call(_):
+        request = ModelRequest(
+            model=FakeListChatModel(responses=["ok"]),
+            messages=[HumanMessage(content="halo")],
+            system_message=SystemMessage(content="Kamu adalah CS toko."),
+        )
+        await middleware.abefore_agent({}, None)
+        return await middleware.awrap_model_call(request, handler)
+
+    asyncio.run(RunnableLambda(call).ainvoke(None, {"configurable": {"user_id": "u1"}}))
+    asyncio.run(RunnableLambda(call).ainvoke(None, {"configurable": {}}))
+
+    assert seen[0].startswith("Kamu adalah CS toko.") and "suka kopi susu" in seen[0]
+    assert seen[1] == "Kamu adalah CS toko."
+
+
+if __name__ == "__main__":
+    test_concurrent_reads_share_one_load_and_are_cached()
+    test_slow_load_times_out_then_fills_the_cache()
+    test_write_invalidates_cached_context()
+    test_context_is_cached_per_query()
+    test_filters_are_pushed_down_and_paged()
+    test_query_ranks_relevant_memory_first()
+    test_summary_is_capped_by_token_budget()
+    test_middleware_injects_context_into_system_prompt()
+    print("memory context tests passed")
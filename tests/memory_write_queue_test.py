@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from app.services.memory.controller import MemoryController
+from app.services.memory.write_queue import MemoryWriteQueue, MemoryWriteStore
+
+logging.basicConfig(level=logging.INFO)
+
+
+class FakeMemory:
+    def __init__(self, fail_times=0, delay=0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.stored = []
+        self.add_calls = []
+
+    async def add(self, messages, user_id, metadata, infer=True):
+        await asyncio.sleep(self.delay)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("qdrant unavailable")
+        self.add_calls.append((user_id, [m["content"] for m in messages], metadata))
+        results = []
+        for m in messages:
+            item = {"id": f"m{len(self.stored)}", "user_id": user_id, "memory": m["content"], "metadata": metadata}
+            self.stored.append(item)
+            results.append(dict(item))
+        return {"results": results}
+
+    async def get_all(self, *, filters, top_k=20):
+        return {"results": [dict(m) for m in self.stored if m["user_id"] == filters["user_id"]][:top_k]}
+
+    async def delete_all(self, user_id):
+        self.stored = [m for m in self.stored if m["user_id"] != user_id]
+
+
+def make_controller(memory, **options):
+    controller = MemoryController(memory)
+
+    async def flush(user_id, texts, type, tags):
+        await controller.add_memory_group(user_id, texts, type=type, tags=tags)
+
+    controller.write_queue = MemoryWriteQueue(flush, **options)
+    return controller
+
+
+def test_writes_are_readable_before_flush_and_grouped_on_flush():
+    memory = FakeMemory()
+    controller = make_controller(memory)
+
+    async def run():
+        await controller.queue_memory("u1", "tinggal di Bali", type="memory")
+        await controller.queue_memory("u1", "Tinggal  di bali", type="memory")  # same fact
+        await controller.queue_memory("u1", "ukuran baju L", type="memory")
+        await controller.queue_memory("u1", "suka warna hitam", type="preference")
+        await controller.queue_memory("u2", "alamat Jakarta", type="memory")
+        before = await controller.get_memory("u1")
+        stored_before = len(memory.stored)
+        await controller.write_queue.flush_once()
+        after = await controller.get_memory("u1")
+        return before, stored_before, after, await controller.write_queue.stats()
+
+    before, stored_before, after, stats = asyncio.run(run())
+
+    assert stored_before == 0
+    assert [item.content for item in before] == ["tinggal di Bali", "ukuran baju L", "suka warna hitam"]
+    assert all(item.metadata["pending"] for item in before)
+    assert sorted(item.content for item in after) == ["suka warna hitam", "tinggal di Bali", "ukuran baju L"]
+    assert not any(item.metadata.get("pending") for item in after)
+    assert sorted((user, texts) for user, texts, _ in memory.add_calls) == [
+        ("u1", ["suka warna hitam"]),
+        ("u1", ["tinggal di Bali", "ukuran baju L"]),
+        ("u2", ["alamat Jakarta"]),
+    ]
+    assert stats["coalesced"] == 1 and stats["flushed"] == 4 and stats["pending"] == 0
+
+
+def test_failed_flush_is_retried_then_dropped():
+    memory = FakeMemory(fail_times=5)
+    controller = make_controller(memory, max_attempts=2)
+
+    async def run():
+        await controller.queue_memory("u1", "tinggal di Bali", type="memory")
+        await controller.write_queue.flush_once()
+        still_pending = len(await controller.write_queue.pending("u1"))
+        await controller.write_queue.flush_once()
+        return still_pending, await controller.write_queue.pending("u1"), await controller.write_queue.stats()
+
+    still_pending, left, stats = asyncio.run(run())
+
+    assert still_pending == 1
+    assert stats["dropped"] == 1
+    assert left == []
+
+
+def test_stop_flushes_remaining_writes_and_deletes_skip_the_store():
+    memory = FakeMemory()
+    controller = make_controller(memory, interval=3600)
+
+    async def run():
+        controller.write_queue.start()
+        kept = await controller.queue_memory("u1", "tinggal di Bali", type="memory")
+        dropped = await controller.queue_memory("u1", "salah ketik", type="memory")
+        await controller.delete_memory("u1", dropped.id)
+        await controller.write_queue.stop()
+        return kept
+
+    kept = asyncio.run(run())
+
+    assert kept.id.startswith("pending-")
+    assert [m["memory"] for m in memory.stored] == ["tinggal di Bali"]
+
+
+def test_clear_waits_for_a_flush_in_flight():
+    memory = FakeMemory(delay=0.1)
+    controller = make_controller(memory)
+
+    async def run():
+        await controller.queue_memory("u1", "tinggal di Bali", type="memory")
+        flushing = asyncio.create_task(controller.write_queue.flush_once())
+        await asyncio.sleep(0.01)  # the write is now being stored
+        await controller.clear_memory("u1")
+        await flushing
+        return await controller.get_memory("u1")
+
+    left = asyncio.run(run())
+
+    assert memory.add_calls and memory.stored == [] and left == []
+
+
+def test_workers_sharing_a_store_read_and_flush_each_others_writes():
+    memory = FakeMemory()
+    shared = MemoryWriteStore()  # stands in for the Postgres table
+    worker_a = make_controller(memory, store=shared)
+    worker_b = make_controller(memory, store=shared)
+
+    async def run():
+        await worker_a.queue_memory("u1", "tinggal di Bali", type="memory")
+        seen_on_b = await worker_b.get_memory("u1")
+        await worker_b.write_queue.flush_once()
+        return seen_on_b, await worker_a.get_memory("u1")
+
+    seen_on_b, after = asyncio.run(run())
+
+    assert [item.content for item in seen_on_b] == ["tinggal di Bali"]
+    assert [item.content for item in after] == ["tinggal di Bali"] and not after[0].metadata.get("pending")
+
+
+if __name__ == "__main__":
+    test_writes_are_readable_before_flush_and_grouped_on_flush()
+    test_failed_flush_is_retried_then_dropped()
+    test_stop_flushes_remaining_writes_and_deletes_skip_the_store()
+    test_clear_waits_for_a_flush_in_flight()
+    test_workers_sharing_a_store_read_and_flush_each_others_writes()
+    print("memory write queue tests passed")
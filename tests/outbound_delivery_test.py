@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+import httpx
+from app.channels.core.outbound import (
+    MARKDOWN_ENTITY,
+    DeliveryAbortedError,
+    DeliveryError,
+    OutboundDispatcher,
+    RateLimitedError,
+    TokenBucket,
+    split_message,
+)
+from app.utils.retry import network_retry
+
+logging.basicConfig(level=logging.INFO)
+
+
+def test_split_prefers_paragraphs_and_keeps_everything():
+    text = ("Paragraf satu. " * 20).strip() + "\n\n" + ("Kalimat dua. " * 20).strip()
+    chunks = split_message(text, 320)
+
+    assert all(len(c) <= 320 for c in chunks)
+    assert chunks[0].endswith("Paragraf satu.")
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_split_hard_cuts_unbroken_text():
+    assert split_message("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_chunks_are_sent_in_order_without_blocking_caller():
+    sent = []
+
+    async def send(recipient, chunk):
+        await asyncio.sleep(0.01)
+        sent.append((recipient, chunk))
+        return {"ok": True}
+
+    async def run():
+        dispatcher = OutboundDispatcher("test", send, chunk_size=10, rate=1000, per_recipient_rate=1000)
+        start = time.perf_counter()
+        first = dispatcher.submit("chat-1", "aaaa bbbb cccc dddd")
+        second = dispatcher.submit("chat-1", "eeee")
+        other = dispatcher.submit("chat-2", "zzzz")
+        submit_time = time.perf_counter() - start
+        await asyncio.gather(first, second, other)
+        return submit_time
+
+    submit_time = asyncio.run(run())
+
+    assert submit_time < 0.005
+    assert [c for r, c in sent if r == "chat-1"] == ["aaaa bbbb", "cccc dddd", "eeee"]
+
+
+def test_rate_limited_send_is_retried():
+    calls = []
+
+    async def send(recipient, chunk):
+        calls.append(chunk)
+        if len(calls) == 1:
+            raise RateLimitedError(retry_after=0.01)
+        return {"ok": True}
+
+    async def run():
+        dispatcher = OutboundDispatcher("test-429", send, rate=1000, per_recipient_rate=1000)
+        return await dispatcher.submit("chat-1", "halo"), dispatcher.stats()
+
+    results, stats = asyncio.run(run())
+
+    assert results == [{"ok": True}]
+    assert stats["rate_limited"] == 1 and stats["sent_chunks"] == 1
+
+
+def test_per_recipient_bucket_paces_sends():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.perf_counter()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) >= 0.035
+
+
+def test_split_keeps_markdown_entities_whole():
+    text = "Stok ready untuk warna *hitam dan putih* serta [katalog](https://x.id/k) ya kak"
+    assert split_message(text, 30)[0].endswith("*hitam")
+    chunks = split_message(text, 30, MARKDOWN_ENTITY)
+
+    assert all(len(c) <= 30 for c in chunks)
+    for chunk in chunks:
+        assert chunk.count("*") % 2 == 0
+        assert chunk.count("[") == chunk.count("]") and chunk.count("(") == chunk.count(")")
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_replies_left_on_close_fail_instead_of_vanishing():
+    async def send(recipient, chunk):
+        await asyncio.sleep(1)
+        return {"ok": True}
+
+    async def run():
+        dispatcher = OutboundDispatcher("test-close", send, rate=1000, per_recipient_rate=1000)
+        first = dispatcher.submit("chat-1", "satu")
+        second = dispatcher.submit("chat-1", "dua")
+        await asyncio.sleep(0.01)
+        await dispatcher.aclose(timeout=0.05)
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, DeliveryAbortedError) for r in results)
+
+
+def test_failed_reply_reports_sent_chunks_and_can_resume():
+    sent, failures = [], []
+
+    async def send(recipient, chunk):
+        if chunk == "cccc" and not failures:
+            failures.append(chunk)
+            raise RuntimeError("provider down")
+        sent.append(chunk)
+        return {"ok": True}
+
+    async def run():
+        dispatcher = OutboundDispatcher("test-skip", send, chunk_size=4, rate=1000, per_recipient_rate=1000)
+        try:
+            await dispatcher.submit("chat-1", "aaaa bbbb cccc")
+        except DeliveryError as e:
+            error = e
+        return error, await dispatcher.submit("chat-1", "aaaa bbbb cccc", skip=error.sent)
+
+    error, results = asyncio.run(run())
+
+    assert error.sent == 2 and isinstance(error.__cause__, RuntimeError)
+    assert len(results) == 1
+    assert sent == ["aaaa", "bbbb", "cccc"]
+
+
+def test_network_retry_retries_server_errors_only():
+    calls = []
+
+    @network_retry(attempts=3, min_wait=0, max_wait=0)
+    async def send(status):
+        calls.append(status)
+        request = httpx.Request("POST", "https://api.example.com/send")
+        response = httpx.Response(status if len(calls) < 2 else 200, request=request)
+        response.raise_for_status()
+        return response.status_code
+
+    assert asyncio.run(send(502)) == 200
+    assert calls == [502, 502]
+
+    calls.clear()
+    try:
+        asyncio.run(send(400))
+    except httpx.HTTPStatusError:
+        pass
+    assert calls == [400]
+
+
+if __name__ == "__main__":
+    test_split_prefers_paragraphs_and_keeps_everything()
+    test_split_hard_cuts_unbroken_text()
+    test_chunks_are_sent_in_order_without_blocking_caller()
+    test_rate_limited_send_is_retried()
+    test_per_recipient_bucket_paces_sends()
+    test_split_keeps_markdown_entities_whole()
+    test_replies_left_on_close_fail_instead_of_vanishing()
+    test_failed_reply_reports_sent_chunks_and_can_resume()
+    test_network_retry_retries_server_errors_only()
+    print("outbound delivery tests passed")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from app.services.shopify.catalog import ProductCatalog
+
+logging.basicConfig(level=logging.INFO)
+
+
+def product_node(id, title, updated_at, status="ACTIVE", description="", variants=(), published=True):
+    return {
+        "id": id,
+        "title": title,
+        "description": description,
+        "status": status,
+        "onlineStoreUrl": f"https://urbanvibe.example/products/{id}" if published else None,
+        "updatedAt": updated_at,
+        "priceRangeV2": {"minVariantPrice": {"amount": "150000", "currencyCode": "IDR"}},
+        "variants": {"nodes": [{"id": f"{id}-{v}", "title": v, "price": "150000"} for v in variants]},
+    }
+
+
+class FakeShopifyClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.queries = []
+
+    async def admin_graphql(self, query, variables=None):
+        self.queries.append(variables)
+        nodes = self.pages.pop(0) if self.pages else []
+        return {"data": {"products": {"nodes": nodes, "pageInfo": {"hasNextPage": bool(self.pages), "endCursor": "c"}}}}
+
+
+def test_sync_and_search(tmp_path):
+    client = FakeShopifyClient([
+        [
+            product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z", variants=["Black / M"]),
+            product_node("p2", "White T-Shirt", "2025-01-02T00:00:00Z", description="Combed cotton tee"),
+        ],
+        [product_node("p3", "Archived Cap", "2025-01-03T00:00:00Z", status="ARCHIVED")],
+    ])
+    catalog = ProductCatalog(client, str(tmp_path / "catalog.sqlite3"))
+
+    assert asyncio.run(catalog.sync(full=True)) == 3
+    assert catalog.ready
+    assert [p.id for p in catalog.search("black hoodies")] == ["p1"]
+    assert [p.id for p in catalog.search("cotton")] == ["p2"]
+    assert catalog.search("cap") == []
+
+
+def test_incremental_sync_uses_updated_at(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    first = ProductCatalog(FakeShopifyClient([[product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z")]]), path)
+    asyncio.run(first.sync(full=True))
+
+    client = FakeShopifyClient([[product_node("p1", "Grey Hoodie", "2025-02-01T00:00:00Z")]])
+    second = ProductCatalog(client, path)
+    asyncio.run(second.sync())
+
+    assert client.queries[0]["query"] == "updated_at:>='2025-01-01T00:00:00Z'"
+    assert [p.title for p in second.search("hoodie")] == ["Grey Hoodie"]
+
+
+def test_products_not_on_the_online_store_are_left_out(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    catalog = ProductCatalog(FakeShopifyClient([[
+        product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z"),
+        product_node("p2", "Grey Hoodie", "2025-01-02T00:00:00Z", published=False),
+    ]]), path)
+    asyncio.run(catalog.sync(full=True))
+    assert [p.id for p in catalog.search("hoodie")] == ["p1"]
+
+    # unpublished later: the incremental sync removes it
+    catalog.client = FakeShopifyClient([[product_node("p1", "Black Hoodie", "2025-01-03T00:00:00Z", published=False)]])
+    asyncio.run(catalog.sync())
+    assert catalog.search("hoodie") == []
+
+
+def test_question_words_do_not_match_every_product(tmp_path):
+    client = FakeShopifyClient([[
+        product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z", description="Do you want a warm hoodie? We have it"),
+        product_node("p2", "Kaos Putih", "2025-01-02T00:00:00Z", description="Ada ukuran S sampai XL, yang nyaman"),
+    ]])
+    catalog = ProductCatalog(client, str(tmp_path / "catalog.sqlite3"))
+    asyncio.run(catalog.sync(full=True))
+
+    assert catalog.search("do you have a raincoat?") == []
+    assert catalog.search("apakah ada jaket yang hitam?") == []
+    assert [p.id for p in catalog.search("do you have hoodies?")] == ["p1"]
+
+
+def test_page_size_is_halved_when_shopify_rejects_the_cost(tmp_path):
+    class CostlyClient(FakeShopifyClient):
+        async def admin_graphql(self, query, variables=None):
+            if variables["first"] > 20:
+                self.queries.append(variables)
+                return {"errors": [{"message": "Query cost is 1152", "extensions": {"code": "MAX_COST_EXCEEDED"}}]}
+            return await super().admin_graphql(query, variables)
+
+    client = CostlyClient([[product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z")]])
+    catalog = ProductCatalog(client, str(tmp_path / "catalog.sqlite3"))
+
+    assert asyncio.run(catalog.sync(full=True)) == 1
+    assert [q["first"] for q in client.queries] == [50, 25, 12]
+    assert client.queries[-1]["variants"] == ProductCatalog.VARIANTS_PER_PRODUCT
+
+
+def test_only_the_lease_holder_syncs(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    leader_client = FakeShopifyClient([[product_node("p1", "Black Hoodie", "2025-01-01T00:00:00Z")]])
+    follower_client = FakeShopifyClient([])
+    leader = ProductCatalog(leader_client, path, refresh_interval=0.01)
+    follower = ProductCatalog(follower_client, path, refresh_interval=0.01)
+
+    async def run():
+        leader.start()
+        await asyncio.sleep(0.05)
+        follower.start()
+        await asyncio.sleep(0.05)
+        await follower.stop()
+        await leader.stop()
+
+    asyncio.run(run())
+
+    assert len(leader_client.queries) == 1
+    assert follower_client.queries == []
+    assert [p.id for p in follower.search("hoodie")] == ["p1"]
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from starlette.requests import Request
+from app.api import rate_limit
+from app.api.rate_limit import RateLimitBackend, UserRateLimiter, client_address, is_allowlisted_source, parse_rate
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10 / 60, 10)
+    assert parse_rate("5/seconds") == (5, 5)
+
+
+def test_limit_is_shared_across_workers():
+    shared = RateLimitBackend()
+    worker_a = UserRateLimiter(backend=shared, limit="3/minute")
+    worker_b = UserRateLimiter(backend=shared, limit="3/minute")
+
+    async def run():
+        results = []
+        for limiter in (worker_a, worker_b, worker_a, worker_b):
+            results.append(await limiter.check("telegram", "42"))
+        other = await worker_b.check("whatsapp", "42")
+        return results, other
+
+    results, other = asyncio.run(run())
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert 0 < results[-1].retry_after <= 20
+    assert other.allowed  # buckets are per channel
+    assert worker_b.stats()["limited"] == 1
+
+
+def test_bucket_refills():
+    limiter = UserRateLimiter(limit="20/second")
+
+    async def run():
+        for _ in range(20):
+            await limiter.check("web", "u")
+        blocked = await limiter.check("web", "u")
+        await asyncio.sleep(0.1)
+        return blocked, await limiter.check("web", "u")
+
+    blocked, later = asyncio.run(run())
+    assert not blocked.allowed and later.allowed
+
+
+def test_backend_failure_allows_message():
+    class DownBackend(RateLimitBackend):
+        async def take(self, key, rate, burst, cost=1.0):
+            raise ConnectionError("postgres down")
+
+    limiter = UserRateLimiter(backend=DownBackend())
+    assert asyncio.run(limiter.check("telegram", "1")).allowed
+
+
+def test_client_address_and_allowlist():
+    proxies = rate_limit._trusted_proxies
+    rate_limit._trusted_proxies = rate_limit._networks(["10.0.0.0/8"])
+    try:
+        assert client_address(make_request("10.0.0.5", "149.154.167.220, 10.0.0.9")) == "149.154.167.220"
+        assert client_address(make_request("203.0.113.7", "149.154.167.220")) == "203.0.113.7"
+        assert is_allowlisted_source(make_request("10.0.0.5", "149.154.167.220"))
+        assert not is_allowlisted_source(make_request("203.0.113.7"))
+    finally:
+        rate_limit._trusted_proxies = proxies
+
+
+def test_default_settings_trust_compose_proxy_and_allow_meta():
+    # nginx on a docker network forwards the real client
+    assert client_address(make_request("172.18.0.3", "198.51.100.4")) == "198.51.100.4"
+    assert is_allowlisted_source(make_request("172.18.0.3", "157.240.22.1"))
+
+
+def test_full_buckets_are_pruned():
+    backend = RateLimitBackend(prune_interval=0)
+    limiter = UserRateLimiter(backend=backend, limit="5/second")
+
+    async def run():
+        await limiter.check("web", "idle")
+        await asyncio.sleep(1.05)  # a full refill
+        await limiter.check("web", "active")
+        return set(backend._buckets)
+
+    assert asyncio.run(run()) == {UserRateLimiter.key("web", "active")}
+
+
+if __name__ == "__main__":
+    test_parse_rate()
+    test_limit_is_shared_across_workers()
+    test_bucket_refills()
+    test_backend_failure_allows_message()
+    test_client_address_and_allowlist()
+    test_default_settings_trust_compose_proxy_and_allow_meta()
+    test_full_buckets_are_pruned()
+    print("rate limit tests passed")
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+import httpx
+from app.services.datastore.datastore import LightRAGClient
+from app.services.datastore.semantic_cache import KBVersion, SemanticCache, normalize_query
+
+logging.basicConfig(level=logging.INFO)
+
+# toy embedding: questions about returns point one way, shipping another
+VECTORS = {
+    "return": [1.0, 0.05, 0.0],
+    "shipping": [0.0, 1.0, 0.1],
+}
+
+async def fake_embed(text: str):
+    for word, vector in VECTORS.items():
+        if word in text:
+            return vector
+    return [0.0, 0.0, 1.0]
+
+
+class CounterVersion(KBVersion):
+    def __init__(self):
+        self.value = 0
+
+    async def current(self):
+        return self.value
+
+    async def bump(self):
+        self.value += 1
+
+
+def make_cache(**kwargs):
+    return SemanticCache(embed=fake_embed, threshold=0.9, version_check_interval=0, **kwargs)
+
+
+def test_paraphrase_hits_cached_answer():
+    cache = make_cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "Returns are accepted within 30 days."
+
+    async def run():
+        first = await cache.get_or_compute("What is the return policy?", "hybrid", compute)
+        second = await cache.get_or_compute("how do I return an item", "hybrid", compute)
+        exact = await cache.get_or_compute("  what is the RETURN policy ", "hybrid", compute)
+        other = await cache.get_or_compute("shipping cost to Bali?", "hybrid", compute)
+        return first, second, exact, other
+
+    first, second, exact, other = asyncio.run(run())
+
+    assert first == second == exact
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["exact_hits"] == 1 and stats["misses"] == 2
+
+
+def test_modes_do_not_share_answers():
+    cache = make_cache()
+
+    async def run():
+        await cache.get_or_compute("return policy", "hybrid", lambda: asyncio.sleep(0, "hybrid answer"))
+        return await cache.get_or_compute("return policy", "naive", lambda: asyncio.sleep(0, "naive answer"))
+
+    assert asyncio.run(run()) == "naive answer"
+
+
+def test_entries_expire_after_ttl():
+    cache = make_cache(ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "answer"
+
+    async def run():
+        await cache.get_or_compute("return policy", "hybrid", compute)
+        for entry in cache._exact.values():
+            entry.created_at = time.time() - 61
+        await cache.get_or_compute("return policy", "hybrid", compute)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_shared_version_bump_clears_other_workers():
+    version = CounterVersion()
+    worker_a = make_cache(version=version)
+    worker_b = make_cache(version=version)
+
+    async def run():
+        await worker_b.get_or_compute("return policy", "hybrid", lambda: asyncio.sleep(0, "old"))
+        await worker_a.invalidate()  # e.g. a document was ingested through worker A
+        return await worker_b.get_or_compute("return policy", "hybrid", lambda: asyncio.sleep(0, "new"))
+
+    assert asyncio.run(run()) == "new"
+
+
+def test_answer_computed_across_invalidation_is_not_stored():
+    cache = make_cache()
+
+    async def compute():
+        cache.clear()  # KB edited while LightRAG was answering
+        return "possibly stale"
+
+    async def run():
+        await cache.get_or_compute("return policy", "hybrid", compute)
+
+    asyncio.run(run())
+    assert cache.stats()["entries"] == 0
+
+
+def test_embedding_failure_bypasses_cache():
+    async def broken_embed(text):
+        raise ConnectionError("ollama down")
+
+    cache = SemanticCache(embed=broken_embed)
+    result = asyncio.run(cache.get_or_compute("return policy", "hybrid", lambda: asyncio.sleep(0, "answer")))
+
+    assert result == "answer"
+    assert cache.stats()["entries"] == 0
+
+
+def test_normalize_query():
+    assert normalize_query("  Return   Policy?! ") == "return policy"
+
+
+def test_answers_are_not_cached_while_lightrag_is_indexing():
+    pipeline = {"busy": False}
+    answers = iter(["old answer", "partial answer", "new answer", "unused"])
+    queries = []
+
+    def handler(request):
+        if request.url.path == "/documents/pipeline_status":
+            return httpx.Response(200, json=pipeline)
+        if request.url.path == "/documents/text":
+            pipeline["busy"] = True
+            return httpx.Response(200, json={"status": "success", "track_id": "t1"})
+        queries.append(request.url.path)
+        return httpx.Response(200, json={"response": next(answers)})
+
+    client = LightRAGClient(base_url="http://lightrag", answer_cache=make_cache(), pipeline_check_interval=0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        question = "what is the return policy"
+        before = await client.query(question)
+        await client.insert_text("Returns are accepted within 60 days.")
+        during = await client.query(question)
+        pipeline["busy"] = False
+        after = await client.query(question)
+        cached = await client.query(question)
+        await client.aclose()
+        return before, during, after, cached
+
+    assert asyncio.run(run()) == ("old answer", "partial answer", "new answer", "new answer")
+    assert len(queries) == 3
+
+
+if __name__ == "__main__":
+    test_paraphrase_hits_cached_answer()
+    test_modes_do_not_share_answers()
+    test_entries_expire_after_ttl()
+    test_shared_version_bump_clears_other_workers()
+    test_answer_computed_across_invalidation_is_not_stored()
+    test_embedding_failure_bypasses_cache()
+    test_normalize_query()
+    test_answers_are_not_cached_while_lightrag_is_indexing()
+    print("semantic cache tests passed")
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from app.services.shopify.cache import StaleWhileRevalidateCache, FileCacheBackend
+from app.services.shopify.models import PolicyItem
+
+logging.basicConfig(level=logging.INFO)
+
+
+def build_cache(ttl=60.0, max_stale=60.0, backend=None):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return PolicyItem(title=f"Refund v{len(calls)}")
+
+    cache = StaleWhileRevalidateCache(
+        key="policies", model=PolicyItem, loader=loader,
+        ttl=ttl, max_stale=max_stale, backend=backend,
+    )
+    return cache, calls
+
+
+def test_fresh_value_served_from_memory():
+    cache, calls = build_cache()
+
+    async def run():
+        await cache.get()
+        return await cache.get()
+
+    assert asyncio.run(run()).title == "Refund v1"
+    assert len(calls) == 1
+
+
+def test_stale_value_served_while_refreshing():
+    cache, calls = build_cache(ttl=0.0)
+
+    async def run():
+        first = await cache.get()
+        stale = await cache.get()
+        await cache._refresh_task
+        return first, stale
+
+    first, stale = asyncio.run(run())
+    assert stale.title == first.title == "Refund v1"
+    assert len(calls) == 2
+    assert cache._value.title == "Refund v2"
+
+
+def test_file_backend_shares_warm_copy(tmp_path):
+    backend = FileCacheBackend(str(tmp_path / "cache.json"))
+    warm, _ = build_cache(backend=backend)
+    cold, cold_calls = build_cache(backend=backend)
+
+    async def run():
+        await warm.get()
+        return await cold.get()
+
+    assert asyncio.run(run()).title == "Refund v1"
+    assert cold_calls == []
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from app.utils.singleflight import SingleFlight, normalize_key
+
+logging.basicConfig(level=logging.INFO)
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    group = SingleFlight("test")
+    upstream = []
+
+    async def fetch():
+        upstream.append(1)
+        await asyncio.sleep(0.01)
+        return "refund within 30 days"
+
+    async def run():
+        keys = [normalize_key("refund policy"), normalize_key("  Refund   POLICY ")] * 5
+        return await asyncio.gather(*(group.do(k, fetch) for k in keys))
+
+    results = asyncio.run(run())
+
+    assert set(results) == {"refund within 30 days"}
+    assert len(upstream) == 1
+    assert group.stats()["dedup_ratio"] == 0.9
+
+
+def test_errors_are_shared_and_not_cached():
+    group = SingleFlight("test-errors")
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("lightrag down")
+
+    async def run():
+        return await asyncio.gather(*(group.do("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert len(attempts) == 1
+
+    asyncio.run(run())
+    assert len(attempts) == 2
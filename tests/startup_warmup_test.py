@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from app.api.startup import StartupWarmup
+
+logging.basicConfig(level=logging.INFO)
+
+
+def test_steps_run_in_parallel_and_respect_dependencies():
+    order = []
+
+    def step(name, delay):
+        async def run():
+            await asyncio.sleep(delay)
+            order.append(name)
+        return run
+
+    warmup = StartupWarmup(timeout=1.0)
+    warmup.add("postgres", step("postgres", 0.05))
+    warmup.add("memory", step("memory", 0.1))
+    warmup.add("llm", step("llm", 0.1))
+    warmup.add("checkpointer", step("checkpointer", 0.02), after=["postgres"])
+    warmup.add("agent_graph", step("agent_graph", 0.01), after=["checkpointer", "memory", "llm"])
+
+    cold_start = asyncio.run(warmup.run())
+
+    assert cold_start < 0.2  # sequential would take 0.28s
+    assert order.index("checkpointer") > order.index("postgres")
+    assert order[-1] == "agent_graph"
+    assert warmup.ready
+
+
+def test_failed_component_is_reported_and_can_recover():
+    healthy = {"postgres": False}
+
+    async def check_postgres():
+        if not healthy["postgres"]:
+            raise ConnectionError("postgres down at 10.0.0.5:5432")
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    warmup = StartupWarmup(timeout=0.05)
+    warmup.add("postgres", check_postgres, check=check_postgres)
+    warmup.add("lightrag", hang, critical=False)
+
+    async def run():
+        await warmup.run()
+        before = warmup.report()
+        healthy["postgres"] = True
+        await warmup.check()
+        return before, warmup.report()
+
+    before, after = asyncio.run(run())
+
+    assert not before["ready"]
+    assert before["components"]["postgres"]["detail"].startswith("ConnectionError")
+    assert "10.0.0.5" not in before["components"]["postgres"]["detail"]
+    assert "timed out" in before["components"]["lightrag"]["detail"]
+    assert after["ready"]  # lightrag is not critical
+
+
+def test_critical_component_failing_at_boot_recovers_through_its_check():
+    attempts = []
+
+    async def build_graph():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("llm provider unreachable")
+
+    warmup = StartupWarmup(timeout=1.0)
+    warmup.add("agent_graph", build_graph, check=build_graph)
+
+    async def run():
+        await warmup.run()
+        before = warmup.ready
+        await warmup.check()
+        return before, warmup.ready
+
+    before, after = asyncio.run(run())
+
+    assert not before and after
+
+
+if __name__ == "__main__":
+    test_steps_run_in_parallel_and_respect_dependencies()
+    test_failed_component_is_reported_and_can_recover()
+    test_critical_component_failing_at_boot_recovers_through_its_check()
+    print("startup warmup tests passed")
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from langchain_core.messages import AIMessage, AIMessageChunk
+from app.agents.middleware.sanitize_middleware import ThinkStreamFilter
+from app.agents.runner import stream_agent
+from app.api.streaming import _with_heartbeat
+from app.channels.core.models import ChannelType, InternalMessage, InternalResponse
+from app.channels.web.adapter import WebAdapter
+from app.channels.web.session import WebSessionError, WebSessions
+
+logging.basicConfig(level=logging.INFO)
+
+
+class FakeGraph:
+    def __init__(self, events):
+        self.events = events
+
+    async def astream_events(self, inputs, config, version):
+        for event in self.events:
+            yield event
+
+
+def model_token(text, run_id="m1", node="model"):
+    return {
+        "event": "on_chat_model_stream",
+        "run_id": run_id,
+        "metadata": {"langgraph_node": node},
+        "data": {"chunk": AIMessageChunk(content=text)},
+    }
+
+
+def collect(graph):
+    message = InternalMessage(user_id="u1", channel=ChannelType.WEB, text="hoodie stock?")
+
+    async def run():
+        return [event async for event in stream_agent(graph, message)]
+
+    return asyncio.run(run())
+
+
+def test_stream_emits_tools_tokens_and_final_answer():
+    graph = FakeGraph([
+        {"event": "on_tool_start", "name": "search_product", "run_id": "t1", "data": {}},
+        {"event": "on_tool_end", "name": "search_product", "run_id": "t1", "data": {}},
+        model_token("Ready ", node="tools"),  # LLM call inside a tool: not streamed
+        model_token("<thi"),
+        model_token("nk>checking</think>Yes, "),
+        model_token("in stock."),
+        {"event": "on_chat_model_end", "run_id": "m1", "data": {}},
+        {
+            "event": "on_chain_end",
+            "run_id": "root",
+            "parent_ids": [],
+            "data": {"output": {"messages": [AIMessage(content="Yes, in stock.")]}},
+        },
+    ])
+
+    events = collect(graph)
+
+    assert [e["event"] for e in events[:2]] == ["tool_start", "tool_end"]
+    tokens = "".join(e["data"]["text"] for e in events if e["event"] == "token")
+    assert tokens == "Yes, in stock."
+    assert events[-1]["event"] == "done"
+    assert events[-1]["data"].text == "Yes, in stock."
+    assert events[-1]["data"].metadata["thread_id"] == "u1"
+
+
+def test_stream_reports_errors_as_event():
+    class BrokenGraph:
+        async def astream_events(self, inputs, config, version):
+            yield model_token("partial")
+            raise RuntimeError("provider down")
+
+    events = collect(BrokenGraph())
+
+    assert events[0]["event"] == "token"
+    assert events[-1]["event"] == "error"
+    assert "provider down" in events[-1]["data"].metadata["error"]
+
+
+def test_think_filter_handles_split_tags():
+    f = ThinkStreamFilter()
+    out = "".join(f.feed(part) for part in ["a<", "think>hidden</th", "ink>b <t", "ag>"]) + f.flush()
+    assert out == "ab <tag>"
+
+
+def test_sse_heartbeat_while_idle():
+    async def slow_events():
+        await asyncio.sleep(0.05)
+        yield {"event": "token", "data": {"text": "hi"}}
+
+    async def run():
+        return [chunk async for chunk in _with_heartbeat(slow_events(), interval=0.01)]
+
+    chunks = asyncio.run(run())
+
+    assert chunks[0] == ": ping\n\n"
+    assert chunks[-1] == 'event: token\ndata: {"text": "hi"}\n\n'
+
+
+def test_web_adapter_pushes_to_open_connections():
+    adapter = WebAdapter(sessions=WebSessions("secret"))
+    message = InternalMessage(user_id="u1", channel=ChannelType.WEB, text="hi")
+
+    async def run():
+        async with adapter.subscribe("u1") as outbox:
+            result = await adapter.send_message(InternalResponse(text="hello", metadata={"user_id": message.user_id}))
+            return result, outbox.get_nowait()
+
+    result, event = asyncio.run(run())
+
+    assert result == {"status": "pushed", "delivered": 1}
+    assert event["event"] == "message" and event["data"]["text"] == "hello"
+    assert adapter.push("u1", {"event": "message"}) == 0
+
+
+def test_web_user_comes_from_the_session_token():
+    sessions = WebSessions("secret")
+    adapter = WebAdapter(sessions=sessions)
+    token = sessions.issue("customer-42")
+
+    message = adapter.from_request({"session_token": token, "user_id": "someone-else", "text": "hi"})
+    assert message.user_id == "customer-42"
+
+    forged = token.rsplit(".", 1)[0] + "." + "0" * 64
+    for bad in (None, "", forged, WebSessions("other").issue("customer-42"), WebSessions("secret", ttl=-1).issue()):
+        try:
+            adapter.from_request({"session_token": bad, "text": "hi"})
+        except WebSessionError:
+            continue
+        raise AssertionError(f"accepted {bad!r}")
+
+    assert sessions.verify(sessions.issue()).startswith("web-")
+
+
+def test_web_adapter_without_sessions_never_pushes():
+    adapter = WebAdapter()
+
+    async def run():
+        async with adapter.subscribe("u1") as outbox:
+            result = await adapter.send_message(InternalResponse(text="hello", metadata={"user_id": "u1"}))
+            return result, outbox.empty()
+
+    assert asyncio.run(run()) == ({"status": "no_connection", "delivered": 0}, True)
+
+
+def test_web_socket_survives_malformed_messages():
+    from fastapi.testclient import TestClient
+    from app.api import deps
+    from app.api.main import adapters, app
+
+    adapter = adapters[ChannelType.WEB]
+    sessions, adapter.sessions = adapter.sessions, WebSessions("secret")
+    app.dependency_overrides[deps.get_agent_graph] = lambda: FakeGraph([])
+    try:
+        token = adapter.sessions.issue("u1")
+        with TestClient(app).websocket_connect(f"/v1/chat/web/ws?token={token}") as ws:
+            ws.send_text("not json")
+            assert ws.receive_json() == {"event": "error", "data": {"detail": "Invalid message format"}}
+            ws.send_json(["hoodie"])
+            assert ws.receive_json()["event"] == "error"
+            ws.send_json({"text": 42})
+            assert ws.receive_json()["event"] == "error"
+            ws.send_json({"message_id": "m1"})
+            assert ws.receive_json()["event"] == "error"
+    finally:
+        adapter.sessions = sessions
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    test_stream_emits_tools_tokens_and_final_answer()
+    test_stream_reports_errors_as_event()
+    test_think_filter_handles_split_tags()
+    test_sse_heartbeat_while_idle()
+    test_web_adapter_pushes_to_open_connections()
+    test_web_user_comes_from_the_session_token()
+    test_web_adapter_without_sessions_never_pushes()
+    test_web_socket_survives_malformed_messages()
+    print("stream agent tests passed")
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from app.agents.checkpoints import CheckpointPruner
+from app.agents.middleware.thread_compaction_middleware import ThreadCompactionMiddleware, compaction_stats
+from app.channels.core.mailbox import ThreadLock
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"pertanyaan {i} " + "kata " * 40))
+        messages.append(AIMessage(content=f"jawaban {i} " + "kata " * 40))
+    return messages
+
+
+def test_long_history_is_summarized_and_pruned():
+    model = FakeListChatModel(responses=["Pelanggan menanyakan status pesanan #123."])
+    middleware = ThreadCompactionMiddleware(model, trigger_tokens=500, keep_messages=4)
+    messages = make_history(20)
+
+    update = asyncio.run(middleware.abefore_model({"messages": messages}, None))
+
+    assert isinstance(update["messages"][0], RemoveMessage)
+    kept = update["messages"][1:]
+    assert "pesanan #123" in kept[0].content
+    assert kept[1:] == messages[-4:]
+    stats = compaction_stats()
+    assert stats["compactions"] >= 1 and stats["tokens_saved"] > 0
+
+
+def test_short_history_is_left_alone():
+    model = FakeListChatModel(responses=["unused"])
+    middleware = ThreadCompactionMiddleware(model, trigger_tokens=5000, keep_messages=4)
+
+    assert asyncio.run(middleware.abefore_model({"messages": make_history(2)}, None)) is None
+
+
+def test_summary_failure_keeps_full_history():
+    class BrokenModel(FakeListChatModel):
+        async def _agenerate(self, *args, **kwargs):
+            raise RuntimeError("provider down")
+
+        def _generate(self, *args, **kwargs):
+            raise RuntimeError("provider down")
+
+    middleware = ThreadCompactionMiddleware(BrokenModel(responses=["x"]), trigger_tokens=100, keep_messages=2)
+
+    assert asyncio.run(middleware.abefore_model({"messages": make_history(10)}, None)) is None
+
+
+def test_pruner_keeps_failed_threads_marked():
+    async def pool_down():
+        raise ConnectionError("postgres down")
+
+    pruner = CheckpointPruner(pool_factory=pool_down, lock=ThreadLock(), batch_size=2)
+    for thread in ("a", "b", "c"):
+        pruner.mark(thread)
+
+    processed = asyncio.run(pruner.prune_marked())
+
+    assert processed == 2
+    assert pruner.stats()["marked_threads"] == 3
+
+
+if __name__ == "__main__":
+    test_long_history_is_summarized_and_pruned()
+    test_short_history_is_left_alone()
+    test_summary_failure_keeps_full_history()
+    test_pruner_keeps_failed_threads_marked()
+    print("thread compaction tests passed")
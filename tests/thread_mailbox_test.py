@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from app.channels.core.mailbox import PostgresThreadLock, ThreadLock, ThreadLockTimeout, ThreadMailbox, merge_messages
+from app.channels.core.models import ChannelType, InternalMessage
+from app.channels.core.queue import InboundWorkerPool, MemoryInboundQueue, PostgresInboundQueue
+
+logging.basicConfig(level=logging.INFO)
+
+
+def make_message(text, user_id="628123", message_id=None):
+    return InternalMessage(user_id=user_id, channel=ChannelType.WHATSAPP, text=text, message_id=message_id)
+
+
+def test_burst_is_merged_into_one_run():
+    queue = MemoryInboundQueue()
+    mailbox = ThreadMailbox(ThreadLock(), window=0.05, max_wait=1.0)
+    runs = []
+
+    async def handler(message):
+        runs.append(message.text)
+
+    pool = InboundWorkerPool(queue, handler, concurrency=3, poll_interval=0.01, mailbox=mailbox)
+
+    async def run():
+        pool.start()
+        for text in ["halo", "mau tanya", "hoodie hitam ada?"]:
+            await queue.enqueue(make_message(text))
+            await asyncio.sleep(0.02)
+        while pool.stats()["processed"] < 3:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert runs == ["halo\nmau tanya\nhoodie hitam ada?"]
+    assert mailbox.stats()["avg_batch_size"] == 3
+
+
+def test_one_run_per_thread_at_a_time():
+    lock = ThreadLock()
+    active = {"a": 0}
+    peak = []
+
+    async def agent_run(thread):
+        async with lock.hold(thread):
+            active[thread] += 1
+            peak.append(active[thread])
+            await asyncio.sleep(0.01)
+            active[thread] -= 1
+
+    async def run():
+        await asyncio.gather(*(agent_run("a") for _ in range(5)))
+
+    asyncio.run(run())
+
+    assert max(peak) == 1
+    assert lock._locks == {}
+
+
+def test_max_wait_caps_debounce():
+    queue = MemoryInboundQueue()
+    mailbox = ThreadMailbox(ThreadLock(), window=0.05, max_wait=0.1)
+    runs = []
+
+    async def handler(message):
+        runs.append(message.text)
+
+    pool = InboundWorkerPool(queue, handler, concurrency=1, poll_interval=0.01, mailbox=mailbox)
+
+    async def run():
+        pool.start()
+        for i in range(8):
+            await queue.enqueue(make_message(f"m{i}"))
+            await asyncio.sleep(0.03)
+        while pool.stats()["processed"] < 8:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert len(runs) > 1
+    assert "\n".join(runs).split("\n") == [f"m{i}" for i in range(8)]
+
+
+def test_postgres_jobs_are_aged_on_the_local_clock():
+    # the database only reports each job's age, whatever its own clock says
+    rows = [
+        (2, make_message("b").model_dump_json(), 0, 0.5, None, 0),
+        (1, make_message("a").model_dump_json(), 0, 5.0, None, 0),
+    ]
+    jobs = PostgresInboundQueue._to_jobs(rows)
+
+    assert [job.id for job in jobs] == [1, 2]
+    assert abs(time.time() - jobs[1].created_at - 0.5) < 0.1
+
+    class NoMoreJobs:
+        async def claim_thread(self, thread):
+            return []
+
+    mailbox = ThreadMailbox(ThreadLock(), window=0.7, max_wait=6.0)
+    start = time.monotonic()
+    asyncio.run(mailbox._collect(NoMoreJobs(), jobs[1:], "628123"))
+
+    # waits out the rest of the window since the message arrived, not a whole one
+    assert 0.1 < time.monotonic() - start < 0.5
+
+
+class FakeAdvisoryPool:
+    """Session advisory locks shared by every "worker" using this pool."""
+
+    def __init__(self):
+        self.owners = {}
+        self.in_use = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        conn = FakeAdvisoryConn(self)
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+
+
+class FakeAdvisoryConn:
+    def __init__(self, pool):
+        self.pool = pool
+        self.result = None
+
+    async def execute(self, sql, params):
+        (lock_id,) = params
+        if "pg_try_advisory_lock" in sql:
+            free = self.pool.owners.get(lock_id) in (None, self)
+            if free:
+                self.pool.owners[lock_id] = self
+            self.result = (free,)
+        elif "pg_advisory_unlock" in sql:
+            del self.pool.owners[lock_id]
+        return self
+
+    async def fetchone(self):
+        return self.result
+
+
+def test_lock_wait_gives_up_after_timeout():
+    lock = ThreadLock(acquire_timeout=0.05)
+
+    async def run():
+        async with lock.hold("a"):
+            try:
+                async with lock.hold("a"):
+                    pass
+            except ThreadLockTimeout:
+                return True
+        return False
+
+    assert asyncio.run(run())
+    assert lock._locks == {}
+
+
+def test_postgres_lock_polls_across_workers_and_caps_held_locks():
+    pool = FakeAdvisoryPool()
+
+    async def pool_factory():
+        return pool
+
+    worker_a = PostgresThreadLock(pool_factory, acquire_timeout=1.0, max_held=2, poll_interval=0.01)
+    worker_b = PostgresThreadLock(pool_factory, acquire_timeout=0.05, max_held=2, poll_interval=0.01)
+    running = {"now": 0, "peak": 0}
+
+    async def agent_run(thread):
+        async with worker_a.hold(thread):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.02)
+            running["now"] -= 1
+
+    async def run():
+        async with worker_a.hold("a"):
+            try:
+                async with worker_b.hold("a"):
+                    pass
+            except ThreadLockTimeout:
+                blocked = True
+            else:
+                blocked = False
+        async with worker_b.hold("a", timeout=0):
+            pass
+        await asyncio.gather(*(agent_run(f"t{i}") for i in range(6)))
+        return blocked
+
+    blocked = asyncio.run(run())
+
+    assert blocked
+    assert running["peak"] == 2 and pool.peak <= 2
+    assert pool.owners == {} and pool.in_use == 0
+
+
+def test_merge_keeps_order_and_ids():
+    merged = merge_messages([make_message("a", message_id="1"), make_message("b", message_id="2")])
+    assert merged.text == "a\nb"
+    assert merged.message_id == "2"
+    assert merged.metadata["batched_message_ids"] == ["1", "2"]
+
+
+if __name__ == "__main__":
+    test_burst_is_merged_into_one_run()
+    test_one_run_per_thread_at_a_time()
+    test_max_wait_caps_debounce()
+    test_postgres_jobs_are_aged_on_the_local_clock()
+    test_lock_wait_gives_up_after_timeout()
+    test_postgres_lock_polls_across_workers_and_caps_held_locks()
+    test_merge_keeps_order_and_ids()
+    print("thread mailbox tests passed")